@@ -0,0 +1,270 @@
+"""
+用户标签亲和度增量汇总。
+
+后台任务按 log_id 水位增量读取 `user_logs`，通过文章 URL 到 Mongo（热集合与归档集合）查出标签与来源，
+把行为折算为 (user, tag, source) 亲和度并按半衰期做指数时间衰减，写入 `user_tag_affinity`。
+推荐读取时只按用户主键范围扫描，成本与标签数成正比，与原始日志总量无关。
+
+写后缓冲并发刷写时 log_id 可能乱序提交，因此只汇总早于 AFFINITY_LAG_SECONDS 的日志，且遇到第一条
+过新的日志即停止推进水位。时间统一取数据库的 CURRENT_TIMESTAMP，与 `log_time` 的时区保持一致。
+
+原始日志只在已汇总（log_id 不超过水位）且超过保留期后，按主键小批量删除，避免长事务锁表。
+
+用法：
+    python affinity.py            # 常驻，每 AFFINITY_INTERVAL 秒汇总一次并清理过期日志
+    python affinity.py --once     # 只执行一轮
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from config import (
+    AFFINITY_BATCH_SIZE,
+    AFFINITY_HALF_LIFE_DAYS,
+    AFFINITY_INTERVAL,
+    AFFINITY_LAG_SECONDS,
+    USER_LOG_RETENTION_DAYS,
+)
+from database import get_mongo_database, mysql_connection
+from metrics import record_cache
+from retention import ARCHIVE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "user_tag_affinity"
+ACTION_WEIGHTS = {"like": 3.0, "click": 1.0, "dislike": -2.0}
+HALF_LIFE_SECONDS = AFFINITY_HALF_LIFE_DAYS * 24 * 3600
+
+# 旧分数先按距上次更新的时长衰减再叠加本批增量；MySQL 按书写顺序求值，score 须写在 updated_at 前
+_UPSERT_AFFINITY_SQL = text(
+    """
+    INSERT INTO user_tag_affinity (user_id, tag, source, score, updated_at)
+    VALUES (:user_id, :tag, :source, :score, :now)
+    ON DUPLICATE KEY UPDATE
+        score = score
+            * POW(0.5, TIMESTAMPDIFF(SECOND, updated_at, VALUES(updated_at)) / :half_life)
+            + VALUES(score),
+        updated_at = VALUES(updated_at)
+    """
+)
+_SAVE_WATERMARK_SQL = text(
+    """
+    INSERT INTO rollup_state (job, last_log_id) VALUES (:job, :last_log_id)
+    ON DUPLICATE KEY UPDATE last_log_id = VALUES(last_log_id)
+    """
+)
+
+
+_cached_version: Tuple[float, int] = (0.0, 0)
+_version_lock = threading.Lock()
+
+
+def _decay(age_seconds: float) -> float:
+    return 0.5 ** (max(age_seconds, 0.0) / HALF_LIFE_SECONDS)
+
+
+def _load_watermark(conn) -> int:
+    row = conn.execute(
+        text("SELECT last_log_id FROM rollup_state WHERE job = :job"), {"job": JOB_NAME}
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _db_now(conn):
+    # log_time 由数据库按会话时区写入，衰减与截止时间都以数据库时钟为准
+    return conn.execute(text("SELECT CURRENT_TIMESTAMP")).scalar()
+
+
+def _lookup_articles(urls: List[str]) -> Dict[str, Dict]:
+    """
+    按 URL 查文章标签与来源；热集合中没有的再查归档集合，点赞过的旧文章被归档后仍能计分。
+    """
+    db = get_mongo_database("tech_crawler")
+    projection = {"_id": 0, "url": 1, "tags": 1, "source": 1}
+    found = {doc["url"]: doc for doc in db["articles"].find({"url": {"$in": urls}}, projection)}
+    missing = [url for url in urls if url not in found]
+    if missing:
+        cursor = db[ARCHIVE_COLLECTION].find({"url": {"$in": missing}}, projection)
+        found.update((doc["url"], doc) for doc in cursor)
+    return found
+
+
+def _rollup_batch(batch_size: int, lag_seconds: float = AFFINITY_LAG_SECONDS) -> int:
+    """
+    汇总一批新日志；亲和度与水位在同一事务内提交，重复执行不会重复计分。
+
+    只取早于 `lag_seconds` 的连续前缀：更新的日志之前可能还有未提交的较小 log_id，水位不能越过它们。
+    """
+    with mysql_connection() as conn:
+        watermark = _load_watermark(conn)
+        now = _db_now(conn)
+        settled_before = now - timedelta(seconds=lag_seconds)
+        rows = conn.execute(
+            text(
+                """
+                SELECT log_id, user_id, article_url, action_type, log_time
+                FROM user_logs WHERE log_id > :watermark
+                ORDER BY log_id LIMIT :limit
+                """
+            ),
+            {"watermark": watermark, "limit": batch_size},
+        ).fetchall()
+        for idx, row in enumerate(rows):
+            if row.log_time is not None and row.log_time >= settled_before:
+                rows = rows[:idx]
+                break
+        if not rows:
+            return 0
+        articles = _lookup_articles(sorted({row.article_url for row in rows}))
+        unresolved = sum(1 for row in rows if row.article_url not in articles)
+        if unresolved:
+            logger.warning("亲和度汇总：%d 条日志的文章已不存在，跳过计分。", unresolved)
+        deltas: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        for row in rows:
+            article = articles.get(row.article_url)
+            if not article:
+                continue
+            weight = ACTION_WEIGHTS.get(row.action_type, 1.0)
+            log_time = row.log_time or now
+            contribution = weight * _decay((now - log_time).total_seconds())
+            for tag in article.get("tags") or []:
+                deltas[(row.user_id, tag, article.get("source") or "")] += contribution
+        if deltas:
+            conn.execute(
+                _UPSERT_AFFINITY_SQL,
+                [
+                    {
+                        "user_id": user_id,
+                        "tag": tag[:100],
+                        "source": source[:20],
+                        "score": score,
+                        "now": now,
+                        "half_life": HALF_LIFE_SECONDS,
+                    }
+                    for (user_id, tag, source), score in deltas.items()
+                ],
+            )
+        conn.execute(_SAVE_WATERMARK_SQL, {"job": JOB_NAME, "last_log_id": rows[-1].log_id})
+    return len(rows)
+
+
+def update_affinity(batch_size: int = AFFINITY_BATCH_SIZE) -> int:
+    """
+    从上次水位开始汇总全部新日志，返回处理的日志条数。
+    """
+    total = 0
+    while True:
+        processed = _rollup_batch(batch_size)
+        total += processed
+        if processed < batch_size:
+            break
+    if total:
+        logger.info("亲和度汇总完成，新处理 %d 条日志。", total)
+    return total
+
+
+def purge_raw_logs(retention_days: int = USER_LOG_RETENTION_DAYS, chunk_size: int = 5000) -> int:
+    """
+    删除已汇总且超过保留期的原始日志；按主键顺序小批量删除，每批独立提交。
+    """
+    deleted = 0
+    while True:
+        with mysql_connection() as conn:
+            cutoff = _db_now(conn) - timedelta(days=retention_days)
+            watermark = _load_watermark(conn)
+            result = conn.execute(
+                text(
+                    """
+                    DELETE FROM user_logs
+                    WHERE log_id <= :watermark AND log_time < :cutoff
+                    ORDER BY log_id LIMIT :chunk
+                    """
+                ),
+                {"watermark": watermark, "cutoff": cutoff, "chunk": chunk_size},
+            )
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            break
+    if deleted:
+        logger.info("已清理 %d 条过期行为日志。", deleted)
+    return deleted
+
+
+def load_user_affinity(user_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+    """
+    返回用户按衰减后分数排序的 (tag, score)，同一标签跨来源的分数合并，只保留正分。
+    """
+    with mysql_connection() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT tag, score, updated_at, CURRENT_TIMESTAMP AS db_now "
+                "FROM user_tag_affinity WHERE user_id = :user_id"
+            ),
+            {"user_id": user_id},
+        ).fetchall()
+    scores: Dict[str, float] = defaultdict(float)
+    for row in rows:
+        age = (row.db_now - row.updated_at).total_seconds() if row.updated_at else 0.0
+        scores[row.tag] += row.score * _decay(age)
+    ranked = sorted(
+        ((tag, score) for tag, score in scores.items() if score > 0),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return ranked[:limit]
+
+
+def get_affinity_version(max_age: float = 1.0) -> int:
+    """
+    返回汇总水位，作为亲和度的版本号参与推荐缓存键；`max_age` 秒内复用上次读取结果。
+    """
+    global _cached_version
+    now = time.monotonic()
+    fetched_at, version = _cached_version
+    if now - fetched_at < max_age:
+        record_cache("affinity_version", True)
+        return version
+    with _version_lock:
+        fetched_at, version = _cached_version
+        if now - fetched_at < max_age:
+            record_cache("affinity_version", True)
+            return version
+        record_cache("affinity_version", False)
+        try:
+            with mysql_connection() as conn:
+                version = _load_watermark(conn)
+        except Exception as exc:
+            logger.warning("读取亲和度版本失败: %s", exc)
+        _cached_version = (now, version)
+        return version
+
+
+def run_forever(interval: float = AFFINITY_INTERVAL):
+    while True:
+        try:
+            update_affinity()
+            purge_raw_logs()
+        except Exception as exc:
+            logger.error("亲和度汇总失败: %s", exc)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="用户标签亲和度增量汇总")
+    parser.add_argument("--once", action="store_true", help="只执行一轮汇总与清理")
+    parser.add_argument("--interval", type=float, default=AFFINITY_INTERVAL)
+    args = parser.parse_args()
+    if args.once:
+        update_affinity()
+        purge_raw_logs()
+    else:
+        run_forever(args.interval)
@@ -1,23 +1,44 @@
 """
 Streamlit 前端：提供用户管理、爬虫触发与推荐展示。
+
+- 爬虫在进程内后台线程运行（全进程同一时间只跑一轮），侧边栏按 STREAMLIT_PROGRESS_INTERVAL 秒轮询进度，
+  抓取期间页面仍可正常交互；
+- 用户列表经 `st.cache_data` 缓存，兴趣标签只在控件变化时写库，写入后显式清除缓存；
+- 推荐结果按「用户 + 兴趣组合 + 文章池版本 + 亲和度汇总水位」缓存，多次重跑与多个会话之间复用，新一轮抓取后自然失效；
+  降级结果（LLM 未配置/调用失败）不缓存。
 """
 from __future__ import annotations
 
 import json
 import logging
-from typing import Dict, List
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 import streamlit as st
 from sqlalchemy import text
 
-from crawler import run_crawlers
+from config import (
+    STREAMLIT_PROGRESS_INTERVAL,
+    STREAMLIT_RECOMMEND_CACHE_TTL,
+    STREAMLIT_USER_CACHE_TTL,
+)
+from affinity import get_affinity_version
 from database import mysql_connection
-from recommender import recommend_articles
+from log_buffer import log_user_action
+from pool_meta import get_pool_version
+from recommender import load_user_interests, recommend_articles
+from thumbnails import placeholder_seed, placeholder_svg
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 st.set_page_config(page_title="智能科技情报聚合", layout="wide")
 
+# 局部定时重跑：新版本为 st.fragment，旧版本为 st.experimental_fragment，都没有时退化为手动刷新
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
 
+@st.cache_data(ttl=STREAMLIT_USER_CACHE_TTL, show_spinner=False)
 def _fetch_users() -> List[Dict]:
     with mysql_connection() as conn:
         rows = conn.execute(
@@ -43,19 +64,129 @@ def _update_interests(user_id: str, interests: List[str]):
             text("UPDATE users SET interests = :interests WHERE user_id = :user_id"),
             {"user_id": user_id, "interests": json.dumps(interests, ensure_ascii=False)},
         )
+    _fetch_users.clear()
 
 
-def _insert_user_log(user_id: str, title: str, url: str, action: str = "like"):
-    with mysql_connection() as conn:
-        conn.execute(
-            text(
-                """
-                INSERT INTO user_logs (user_id, article_title, article_url, action_type)
-                VALUES (:user_id, :title, :url, :action)
-                """
-            ),
-            {"user_id": user_id, "title": title, "url": url, "action": action},
+def _on_interests_change(user_id: str, widget_key: str):
+    _update_interests(user_id, st.session_state[widget_key])
+    st.session_state[f"interests-updated-{user_id}"] = True
+
+
+class _DegradedRecommendation(Exception):
+    """
+    携带降级结果跳出缓存函数：st.cache_data 不缓存抛出异常的调用。
+    """
+
+    def __init__(self, items: List[Dict], diagnostic: str):
+        super().__init__(diagnostic)
+        self.items = items
+        self.diagnostic = diagnostic
+
+
+@st.cache_data(ttl=STREAMLIT_RECOMMEND_CACHE_TTL, max_entries=256, show_spinner=False)
+def _cached_recommendations(
+    user_id: str, interests: Tuple[str, ...], pool_version: int, affinity_version: int
+) -> List[Dict]:
+    items, diagnostic = recommend_articles(user_id, list(interests))
+    if diagnostic:
+        raise _DegradedRecommendation(items, diagnostic)
+    return items
+
+
+def _get_recommendations(
+    user_id: str, interests: Tuple[str, ...]
+) -> Tuple[List[Dict], Optional[str]]:
+    interests = interests or tuple(sorted(load_user_interests(user_id)))
+    try:
+        items = _cached_recommendations(
+            user_id, interests, get_pool_version(), get_affinity_version()
         )
+        return items, None
+    except _DegradedRecommendation as degraded:
+        return degraded.items, degraded.diagnostic
+
+
+class _CrawlJob:
+    """
+    后台爬虫线程的状态；通过 st.cache_resource 在所有会话间共享，保证同一时间只有一轮抓取。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.stage = ""
+        self.done = 0
+        self.total = 1
+        self.items = 0
+        self.error: Optional[str] = None
+        self.finished_at: Optional[datetime] = None
+
+    def start(self) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self.stage, self.done, self.total = "启动中", 0, 1
+            self.items, self.error = 0, None
+        threading.Thread(target=self._run, name="streamlit-crawl", daemon=True).start()
+        return True
+
+    def _progress(self, stage: str, done: int, total: int):
+        with self._lock:
+            self.stage, self.done, self.total = stage, done, max(total, 1)
+
+    def _run(self):
+        items, error = 0, None
+        try:
+            # 爬虫依赖较重，只在真正运行时导入
+            from crawler import run_crawlers
+
+            items = run_crawlers(progress=self._progress)
+        except Exception as exc:
+            logger.exception("后台爬虫失败")
+            error = str(exc)
+        with self._lock:
+            self.running = False
+            self.items, self.error = items, error
+            self.finished_at = datetime.now()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "stage": self.stage,
+                "fraction": min(self.done / self.total, 1.0),
+                "items": self.items,
+                "error": self.error,
+                "finished_at": self.finished_at,
+            }
+
+
+@st.cache_resource
+def _crawl_job() -> _CrawlJob:
+    return _CrawlJob()
+
+
+def _render_crawl_status():
+    status = _crawl_job().snapshot()
+    if status["running"]:
+        st.progress(status["fraction"], text=f"爬虫运行中：{status['stage']}")
+        if _fragment is None and st.button("刷新进度"):
+            st.rerun()
+    elif status["error"]:
+        st.error(f"爬虫运行失败：{status['error']}")
+    elif status["finished_at"]:
+        st.success(
+            f"爬虫已完成：{status['items']} 条（{status['finished_at']:%H:%M:%S}）"
+        )
+
+
+if _fragment is not None:
+    _render_crawl_status = _fragment(run_every=STREAMLIT_PROGRESS_INTERVAL)(_render_crawl_status)
+
+
+def _insert_user_log(user_id: str, title: str, url: str, action: str = "like"):
+    log_user_action(user_id, title, url, action)
 
 
 def _render_sidebar(users: List[Dict]) -> Dict:
@@ -72,13 +203,17 @@ def _render_sidebar(users: List[Dict]) -> Dict:
     available_tags = sorted(
         {tag for user in users for tag in user["interests"]} | set(user_data["interests"])
     )
+    interests_key = f"interests-{selected_user}"
+    # 只在控件变化时回调写库，普通重跑不会触发 UPDATE
     selected_interests = st.sidebar.multiselect(
         "兴趣标签",
         options=available_tags,
         default=user_data["interests"],
+        key=interests_key,
+        on_change=_on_interests_change,
+        args=(selected_user, interests_key),
     )
-    if set(selected_interests) != set(user_data["interests"]):
-        _update_interests(selected_user, selected_interests)
+    if st.session_state.pop(f"interests-updated-{selected_user}", False):
         st.sidebar.success("兴趣标签已更新")
     with st.sidebar.form(key=f"add-tag-form-{selected_user}"):
         new_tag = st.text_input("新增标签")
@@ -91,35 +226,36 @@ def _render_sidebar(users: List[Dict]) -> Dict:
             else:
                 updated = selected_interests + [normalized]
                 _update_interests(selected_user, updated)
+                # 控件的会话状态优先于 default，清掉后才能显示新标签
+                st.session_state.pop(interests_key, None)
                 st.session_state[tag_added_key] = normalized
                 st.rerun()
 
     st.sidebar.subheader("数据控制")
     if st.sidebar.button("Run Crawler"):
-        with st.spinner("爬虫运行中..."):
-            run_crawlers()
-        st.sidebar.success("爬虫已运行完成")
+        if _crawl_job().start():
+            st.sidebar.info("爬虫已在后台启动")
+        else:
+            st.sidebar.info("已有一轮爬虫在运行")
+    with st.sidebar:
+        _render_crawl_status()
 
-    return user_data
+    return {**user_data, "interests": list(selected_interests)}
 
 
-def _render_recommendations(user_id: str):
+def _render_recommendations(user_id: str, interests: List[str]):
     st.title("AI 技术资讯推荐")
-    if "current_user" not in st.session_state:
-        st.session_state.current_user = user_id
-    if st.session_state.current_user != user_id:
-        st.session_state.current_user = user_id
-        st.session_state.pop("recommendations", None)
-        st.session_state.pop("recommendations_info", None)
+    request_key = (user_id, tuple(sorted(interests)))
 
     if st.button("Refresh Recommendation"):
-        with st.spinner("AI 正在生成推荐..."):
-            items, diagnostic = recommend_articles(user_id)
-        st.session_state["recommendations"] = items
-        st.session_state["recommendations_info"] = diagnostic
+        st.session_state["recommend_key"] = request_key
 
-    recommendations = st.session_state.get("recommendations", [])
-    diagnostic = st.session_state.get("recommendations_info")
+    # 已请求过当前「用户 + 兴趣组合」时，重跑直接命中缓存；切换用户或兴趣后需重新点击
+    recommendations: List[Dict] = []
+    diagnostic: Optional[str] = None
+    if st.session_state.get("recommend_key") == request_key:
+        with st.spinner("AI 正在生成推荐..."):
+            recommendations, diagnostic = _get_recommendations(*request_key)
     if not recommendations:
         if diagnostic:
             st.warning(diagnostic)
@@ -131,7 +267,10 @@ def _render_recommendations(user_id: str):
     for idx, article in enumerate(recommendations):
         with st.container():
             if article.get("top_image"):
-                st.image(article["top_image"], use_column_width=True)
+                # 占位图由本地生成，Streamlit 中直接内联 SVG
+                seed = placeholder_seed(article["top_image"])
+                image = placeholder_svg(seed) if seed is not None else article["top_image"]
+                st.image(image, width="stretch")
             st.markdown(f"### {article.get('title')}")
             summary = article.get("summary") or "暂无摘要"
             st.markdown(f"> {summary}")
@@ -155,7 +294,7 @@ def main():
         st.error("请先在 MySQL 中创建至少一个用户。")
         return
     user_data = _render_sidebar(users)
-    _render_recommendations(user_data["user_id"])
+    _render_recommendations(user_data["user_id"], user_data["interests"])
 
 
 if __name__ == "__main__":
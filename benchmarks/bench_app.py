@@ -0,0 +1,140 @@
+"""
+Streamlit 前端基准：用 `streamlit.testing.v1.AppTest` 在进程内运行 app.py，统计重跑耗时与数据层访问次数。
+
+替身与 benchmarks/loadtest.py 相同（SQLite 替代 MySQL、mongomock 或 --mongo-uri、本地假 LLM），依次：
+- 首次运行与 --reruns 次普通重跑：用户列表只查询一次（st.cache_data），不产生 UPDATE users；
+- 点击「Refresh Recommendation」：调用一次推荐 LLM 并渲染卡片；之后的重跑命中缓存，不再调用 LLM；
+- 修改兴趣标签：只写一次库，用户缓存随之失效。
+任一检查不满足或脚本抛出异常时返回非零退出码。「Run Crawler」会访问外网，不在此处点击。
+
+用法：
+    python benchmarks/bench_app.py --users 3 --articles 500 --reruns 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _count_statements(engine) -> Counter:
+    from sqlalchemy import event
+
+    counts: Counter = Counter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        normalized = " ".join(statement.split()).upper()
+        if normalized.startswith("SELECT") and " FROM USERS" in normalized:
+            counts["select_users"] += 1
+        elif normalized.startswith("UPDATE USERS"):
+            counts["update_users"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counts
+
+
+def _llm_calls(operation: str) -> int:
+    from metrics import LLM_REQUEST_SECONDS
+
+    return LLM_REQUEST_SECONDS.snapshot(operation=operation)["count"]
+
+
+def _run(at, timings: List[float]):
+    started = time.perf_counter()
+    at.run()
+    timings.append((time.perf_counter() - started) * 1000)
+    if at.exception:
+        raise RuntimeError(f"app.py 运行异常: {at.exception[0].message}")
+
+
+def _button(at, label: str):
+    return next(button for button in at.button if button.label == label)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="假 LLM 单次响应延迟（秒）")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次运行超时（秒）")
+    args = parser.parse_args(argv)
+
+    from loadtest import configure_environment, install_standins, seed, start_fake_llm
+
+    workdir = tempfile.mkdtemp(prefix="bench-app-")
+    llm = start_fake_llm(args.llm_latency)
+    configure_environment(workdir, llm.server_port)
+    install_standins(workdir, args.mongo_uri)
+    users = seed(args.users, args.articles, random.Random(42))
+
+    from streamlit.testing.v1 import AppTest
+
+    from database import get_mysql_engine
+
+    statements = _count_statements(get_mysql_engine())
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=args.timeout)
+
+    first: List[float] = []
+    _run(at, first)
+    reruns: List[float] = []
+    for _ in range(args.reruns):
+        _run(at, reruns)
+    idle = dict(statements)
+
+    calls_before = _llm_calls("recommend")
+    cold: List[float] = []
+    _button(at, "Refresh Recommendation").click()
+    _run(at, cold)
+    cards = sum(1 for block in at.markdown if block.value.startswith("### "))
+    cold_calls = _llm_calls("recommend") - calls_before
+    warm: List[float] = []
+    for _ in range(args.reruns):
+        _run(at, warm)
+    warm_calls = _llm_calls("recommend") - calls_before - cold_calls
+
+    selected = users[0]["interests"]
+    update_before = statements["update_users"]
+    at.sidebar.multiselect[0].set_value(selected[:1] if len(selected) > 1 else [])
+    _run(at, [])
+    _run(at, [])
+
+    report: Dict = {
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "first_run_ms": round(first[0], 1),
+        "rerun_p50_ms": round(statistics.median(reruns), 1),
+        "recommend_cold_ms": round(cold[0], 1),
+        "recommend_rerun_p50_ms": round(statistics.median(warm), 1),
+        "cards": cards,
+        "statements": dict(statements),
+        "llm_calls": {"recommend_cold": cold_calls, "recommend_reruns": warm_calls},
+    }
+    report["checks"] = {
+        "users_loaded_once": idle.get("select_users") == 1,
+        "no_writes_on_rerun": idle.get("update_users", 0) == 0,
+        "recommendations_rendered": cards > 0,
+        "recommend_llm_once": cold_calls == 1,
+        "reruns_hit_cache": warm_calls == 0,
+        "interest_change_writes_once": statements["update_users"] - update_before == 1,
+        "users_reloaded_after_write": statements["select_users"] == 2,
+    }
+    report["ok"] = all(report["checks"].values())
+    llm.shutdown()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+分布式爬虫基准：本地回放服务器模拟 GitHub Trending / HN API / 文章页，对比 1..N 个 worker
+清空同一轮抓取队列的耗时，并统计回放服务器上同一地址被重复抓取的次数。
+
+回放服务器按路径返回确定性的页面（榜单 HTML、HN JSON、带 og:image 的文章页），每个请求固定
+延迟 --latency 秒，模拟真实网络往返。出现重复抓取时返回非零退出码。
+
+- 传入 --mongo-uri：每个 worker 是独立的 `crawler.py --worker` 进程，共享该 mongod；基准库结束时删除。
+- 不传：worker 为同一进程内的线程，队列落在 mongomock 上。只能说明租约协议下的并发收益与去重，
+  不代表多进程 / 多机部署的吞吐；多进程结果尚未在 mongod 上测量。
+
+用法：
+    python benchmarks/bench_crawl_workers.py --workers 1 2 4 8
+    python benchmarks/bench_crawl_workers.py --mongo-uri mongodb://127.0.0.1:27017 --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def start_replay_server(repos_per_page: int, hn_items: int, latency: float) -> ThreadingHTTPServer:
+    hits: Counter = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] += 1
+            time.sleep(latency)
+            base = f"http://127.0.0.1:{self.server.server_address[1]}"
+            path = self.path
+            if path == "/trending" or path.startswith("/trending/"):
+                label = path.rsplit("/", 1)[-1] if path != "/trending" else "all"
+                rows = "".join(
+                    f'<article class="Box-row"><h2><a href="/bench/{label}-{i}">bench / {label}-{i}'
+                    f"</a></h2><p>Replayed repository {label} {i}</p></article>"
+                    for i in range(repos_per_page)
+                )
+                self._send("text/html", f"<html><body>{rows}</body></html>")
+            elif path == "/v0/topstories.json":
+                self._send("application/json", json.dumps(list(range(1, hn_items + 1))))
+            elif match := re.fullmatch(r"/v0/item/(\d+)\.json", path):
+                story_id = int(match.group(1))
+                self._send(
+                    "application/json",
+                    json.dumps(
+                        {
+                            "id": story_id,
+                            "title": f"Replayed story {story_id}",
+                            "url": f"{base}/story/{story_id}",
+                            "time": 1700000000 + story_id,
+                        }
+                    ),
+                )
+            elif path.startswith("/bench/") or path.startswith("/story/"):
+                slug = path.rsplit("/", 1)[-1]
+                self._send(
+                    "text/html",
+                    f'<html><head><meta property="og:image" content="{base}/img/{slug}.png">'
+                    "</head></html>",
+                )
+            else:
+                self.send_response(404)
+                self.end_headers()
+
+        def _send(self, content_type: str, body: str):
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.hits = hits
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _drain(queue, run_id: str, workers: int, timeout: float, started: float) -> float:
+    """
+    等待本轮任务清空，返回自 `started`（入队前）起的耗时。
+    """
+    while not queue.is_drained(run_id):
+        if time.perf_counter() - started > timeout:
+            raise RuntimeError(f"{workers} 个 worker 在 {timeout}s 内未清空队列")
+        time.sleep(0.02)
+    return time.perf_counter() - started
+
+
+def _summary(workers: int, seconds: float, stats: Dict, server: ThreadingHTTPServer) -> Dict:
+    from database import get_mongo_database
+
+    articles = get_mongo_database("tech_crawler")["articles"]
+    return {
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "jobs": stats,
+        "requests": sum(server.hits.values()),
+        "duplicate_fetches": sum(count - 1 for count in server.hits.values() if count > 1),
+        "articles": articles.count_documents({}),
+        "images_resolved": articles.count_documents({"top_image": {"$regex": "^http"}}),
+    }
+
+
+def run_round_threads(workers: int, server: ThreadingHTTPServer, args) -> Dict:
+    from crawl_queue import CrawlQueue, run_worker
+    from crawler import JOB_HANDLERS, enqueue_crawl_run
+    from database import get_mongo_database
+
+    db = get_mongo_database("tech_crawler")
+    for name in ("articles", "crawl_jobs"):
+        db[name].delete_many({})
+    server.hits.clear()
+    queue = CrawlQueue()
+    started = time.perf_counter()
+    run_id = enqueue_crawl_run(queue, sources=("github", "hackernews"), hn_limit=args.hn_items)
+    threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(JOB_HANDLERS,),
+            kwargs={"queue": CrawlQueue(), "idle_exit": 0.2, "poll_interval": 0.02},
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    elapsed = _drain(queue, run_id, workers, args.timeout, started)
+    for thread in threads:
+        thread.join()
+    return _summary(workers, elapsed, queue.stats(run_id), server)
+
+
+def run_round(
+    workers: int, server: ThreadingHTTPServer, env: Dict[str, str], args
+) -> Dict:
+    from crawl_queue import CrawlQueue
+    from crawler import enqueue_crawl_run
+    from database import get_mongo_client
+
+    get_mongo_client().drop_database("tech_crawler")
+    server.hits.clear()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "crawler.py"), "--worker"],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        time.sleep(args.warmup)  # 等 worker 完成导入并开始轮询，计时只覆盖抓取本身
+        queue = CrawlQueue()
+        started = time.perf_counter()
+        run_id = enqueue_crawl_run(queue, sources=("github", "hackernews"), hn_limit=args.hn_items)
+        elapsed = _drain(queue, run_id, workers, args.timeout, started)
+        stats = queue.stats(run_id)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+    return _summary(workers, elapsed, stats, server)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repos-per-page", type=int, default=10)
+    parser.add_argument("--hn-items", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    server = start_replay_server(args.repos_per_page, args.hn_items, args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    overrides = {
+        "MONGO_URI": args.mongo_uri,
+        "GITHUB_BASE_URL": base,
+        "HACKER_NEWS_API": f"{base}/v0",
+        "CRAWLER_PROXY": "",
+        "CRAWL_REQUEST_DELAY": "0",
+        "CRAWL_POLL_INTERVAL": "0.05",
+        "PROFILE_CRAWL": "0",
+        "PROFILE_SAMPLE_RATE": "0",
+    }
+    if not args.mongo_uri:
+        overrides.pop("MONGO_URI")
+    # 父进程与 worker 必须使用同一套地址，先写入环境再导入项目模块
+    os.environ.update(overrides)
+    env = {**os.environ, **overrides}
+
+    if args.mongo_uri:
+        rounds = [run_round(count, server, env, args) for count in args.workers]
+    else:
+        from loadtest import install_standins
+
+        install_standins(tempfile.mkdtemp(prefix="crawl-workers-"), None)
+        logging.getLogger().setLevel(logging.WARNING)
+        rounds = [run_round_threads(count, server, args) for count in args.workers]
+    baseline = rounds[0]["seconds"] * rounds[0]["workers"]
+    for entry in rounds:
+        entry["speedup"] = round(baseline / entry["seconds"], 2)
+        entry["efficiency"] = round(entry["speedup"] / entry["workers"], 2)
+    server.shutdown()
+    report = {"mode": "processes+mongod" if args.mongo_uri else "threads+mongomock", "rounds": rounds}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if all(entry["duplicate_fetches"] == 0 for entry in rounds) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
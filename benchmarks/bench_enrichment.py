@@ -0,0 +1,222 @@
+"""
+文章富化基准：对比抓取时批量富化前后，推荐请求中的 LLM 调用次数、提示词长度与延迟，以及兴趣标签召回覆盖率。
+
+本地假 LLM（OpenAI 兼容）按输出条数模拟生成耗时（--ms-per-item），并按关键词为富化请求挑选主题标签。
+数据为 HN 风格的薄上下文文章：摘要为空、只有来源标签。流程：
+- 富化前：按兴趣标签执行 --requests 次推荐，统计请求时 LLM 调用/提示词字符数/耗时；
+- 执行一次 `enrich_articles`，统计富化调用次数与耗时；
+- 富化后：重复同样的推荐请求。
+富化后仍有请求时 LLM 调用或覆盖率未提升时返回非零退出码。
+
+用法：
+    pip install mongomock
+    python benchmarks/bench_enrichment.py --articles 200 --requests 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_ITEM_RE = re.compile(r"^ID: (\d+)\n标题: (.*)$", re.MULTILINE)
+_KEYWORDS = {
+    "python": "Python",
+    "java ": "Java",
+    "javascript": "Javascript",
+    "react": "前端",
+    "css": "前端",
+    "llm": "AI",
+    "gpt": "AI",
+    "postgres": "后端",
+    "kubernetes": "后端",
+    "android": "Android",
+}
+_TITLES = (
+    "Show HN: a sampling profiler for Python services",
+    "Running LLM agents in production",
+    "Why we moved from Postgres to ...",
+    "React server components, one year later",
+    "Kubernetes operators the hard way",
+    "Modern CSS layout without frameworks",
+    "GPT tokenizers explained",
+    "Jetpack Compose on Android at scale",
+)
+
+
+def start_fake_llm(ms_per_item: float) -> ThreadingHTTPServer:
+    calls: Counter = Counter()
+    prompt_chars: Counter = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            items = _ITEM_RE.findall(prompt)
+            operation = "enrich" if "ai_summary" in prompt else "recommend"
+            calls[operation] += 1
+            prompt_chars[operation] += len(prompt)
+            if operation == "enrich":
+                entries = [
+                    {
+                        "index": int(idx),
+                        "ai_summary": f"一句话概括：{title[:40]}",
+                        "ai_tags": sorted(
+                            {tag for key, tag in _KEYWORDS.items() if key in title.lower() + " "}
+                        ),
+                        "ai_comment": "基准辣评：看完省下一杯咖啡。",
+                    }
+                    for idx, title in items
+                ]
+            else:
+                entries = [
+                    {"index": int(idx), "ai_comment": "请求时辣评。", "tag_match": "热门推荐"}
+                    for idx, _ in items
+                ]
+            time.sleep(ms_per_item * max(len(items), 1) / 1000)
+            content = json.dumps(entries, ensure_ascii=False)
+            payload = json.dumps(
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 2,
+                        "completion_tokens": len(content) // 2,
+                        "total_tokens": (len(prompt) + len(content)) // 2,
+                    },
+                },
+                ensure_ascii=False,
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.calls = calls
+    server.prompt_chars = prompt_chars
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_requests(llm: ThreadingHTTPServer, interests: List[str], requests: int) -> Dict:
+    from recommender import recommend_articles
+
+    calls_before = llm.calls["recommend"]
+    chars_before = llm.prompt_chars["recommend"]
+    latencies = []
+    tag_hits = 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        items, _ = recommend_articles("bench_user", interests)
+        latencies.append((time.perf_counter() - started) * 1000)
+        tag_hits += sum(1 for item in items if item["tag_match"] in interests)
+    calls = llm.calls["recommend"] - calls_before
+    return {
+        "llm_calls": calls,
+        "prompt_chars_per_call": (llm.prompt_chars["recommend"] - chars_before) // max(calls, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "interest_hits_per_request": round(tag_hits / requests, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--interests", nargs="+", default=["Python", "AI"])
+    parser.add_argument("--ms-per-item", type=float, default=150.0)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args(argv)
+
+    llm = start_fake_llm(args.ms_per_item)
+    workdir = tempfile.mkdtemp(prefix="enrich-")
+    os.environ["LLM_API_KEY"] = "bench"
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{llm.server_address[1]}/v1"
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+    from loadtest import install_standins
+
+    install_standins(workdir, args.mongo_uri)
+
+    from crawler import _upsert_articles
+    from database import get_mongo_database
+    from enrichment import enrich_articles
+    from models import Article
+    from sources import TOPIC_TAGS
+
+    articles = [
+        Article(
+            url=f"https://news.example.com/item/{idx}",
+            title=f"{_TITLES[idx % len(_TITLES)]} #{idx}",
+            source="hackernews",
+            tags=("Hacker News",),
+        )
+        for idx in range(args.articles)
+    ]
+    inserted = _upsert_articles(articles)
+    collection = get_mongo_database("tech_crawler")["articles"]
+
+    def coverage() -> float:
+        matched = collection.count_documents({"tags": {"$in": list(TOPIC_TAGS)}})
+        return round(matched / args.articles, 3)
+
+    before = run_requests(llm, args.interests, args.requests)
+    before["topic_tag_coverage"] = coverage()
+
+    started = time.perf_counter()
+    enriched = enrich_articles(inserted)
+    enrich_seconds = time.perf_counter() - started
+
+    after = run_requests(llm, args.interests, args.requests)
+    after["topic_tag_coverage"] = coverage()
+    llm.shutdown()
+
+    report = {
+        "articles": args.articles,
+        "before": before,
+        "enrichment": {
+            "enriched": enriched,
+            "llm_calls": llm.calls["enrich"],
+            "seconds": round(enrich_seconds, 2),
+        },
+        "after": after,
+    }
+    report["ok"] = (
+        enriched == args.articles
+        and after["llm_calls"] == 0
+        and after["topic_tag_coverage"] > before["topic_tag_coverage"]
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+新文章推送基准：在进程内启动 Web 服务，打开数百个按兴趣订阅的 SSE 空闲连接，测量空闲开销与推送延迟。
+
+流程：
+- 建立 --connections 个连接（兴趣标签轮流取自 --tags），空闲 --idle-seconds 秒，统计每连接线程/内存增量与空闲 CPU 占用；
+- 经爬虫的 `_upsert_articles` 写入 --articles 篇新文章，统计发布到各连接收到事件的 p50/p95 延迟；
+- 校验：每个连接恰好收到与其兴趣匹配的新文章；对已有文章的重复写入不产生事件；
+  携带 Last-Event-ID 重连可补发断线期间的事件；断点已失效时收到 reload 而不是部分补发。任一校验失败或空闲 CPU 超过预算时返回非零退出码。
+
+默认使用 mongomock（不支持 capped 集合与尾随游标，退化为按 EVENTS_POLL_INTERVAL 轮询）；
+传入 --mongo-uri 时使用真实 mongod 的尾随游标，会清空其中 tech_crawler 库的文章与事件集合，请指向测试实例。
+
+用法：
+    pip install mongomock
+    python benchmarks/bench_events.py --connections 300 --articles 50 --idle-seconds 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import selectors
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_EVENT_RE = re.compile(r"id: (\S+)\nevent: article\ndata: (.*)\n")
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+class SSEClients:
+    """
+    单线程 selector 驱动的原始 socket 客户端，避免压测端本身为每个连接开线程。
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.selector = selectors.DefaultSelector()
+        self.received: Dict[int, Dict[str, float]] = {}
+        self.last_ids: Dict[int, str] = {}
+        self.reloads: set = set()
+        self._buffers: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def open(self, idx: int, tags: str, last_event_id: Optional[str] = None) -> socket.socket:
+        sock = socket.create_connection(("127.0.0.1", self.port))
+        headers = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id else ""
+        sock.sendall(
+            f"GET /api/events?tags={quote(tags)} HTTP/1.1\r\nHost: bench\r\n"
+            f"Accept: text/event-stream\r\n{headers}\r\n".encode()
+        )
+        sock.setblocking(False)
+        self.received.setdefault(idx, {})
+        self._buffers[idx] = ""
+        self.selector.register(sock, selectors.EVENT_READ, idx)
+        return sock
+
+    def close(self, sock: socket.socket):
+        self.selector.unregister(sock)
+        sock.close()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        for key in list(self.selector.get_map().values()):
+            key.fileobj.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, _ in self.selector.select(timeout=0.1):
+                try:
+                    chunk = key.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    self.selector.unregister(key.fileobj)
+                    continue
+                now = time.perf_counter()
+                idx = key.data
+                buffer = self._buffers[idx] + chunk.decode("utf-8", "replace")
+                end = buffer.rfind("\n\n")
+                if end < 0:
+                    self._buffers[idx] = buffer
+                    continue
+                for event_id, data in _EVENT_RE.findall(buffer[: end + 2]):
+                    self.received[idx].setdefault(json.loads(data)["url"], now)
+                    self.last_ids[idx] = event_id
+                if "event: reload\n" in buffer[: end + 2]:
+                    self.reloads.add(idx)
+                self._buffers[idx] = buffer[end + 2 :]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=300)
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--tags", nargs="+", default=["Python", "AI", "前端", "后端", "Hacker News"])
+    parser.add_argument("--idle-seconds", type=float, default=10.0)
+    parser.add_argument("--max-idle-cpu-pct", type=float, default=5.0)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("EVENTS_POLL_INTERVAL", "0.1")
+    os.environ["EVENTS_MAX_CONNECTIONS"] = str(args.connections + 10)
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+    import database
+
+    if args.mongo_uri:
+        client = database.get_mongo_client(args.mongo_uri)
+    else:
+        import mongomock
+
+        client = database.set_mongo_client(mongomock.MongoClient())
+    client["tech_crawler"].drop_collection("articles")
+    client["tech_crawler"].drop_collection("article_events")
+
+    from werkzeug.serving import make_server
+
+    from crawler import _upsert_articles
+    from events import ensure_event_collection, get_event_hub
+    from models import Article
+    from server import app
+
+    ensure_event_collection()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    clients = SSEClients(httpd.server_port)
+    clients.start()
+
+    threads_before, rss_before = threading.active_count(), _rss_kb()
+    sockets = []
+    for idx in range(args.connections):
+        tag = args.tags[idx % len(args.tags)]
+        sockets.append(clients.open(idx, tag))
+    deadline = time.monotonic() + 10
+    while get_event_hub().connections() < args.connections and time.monotonic() < deadline:
+        time.sleep(0.05)
+    connected = get_event_hub().connections()
+    threads_after, rss_after = threading.active_count(), _rss_kb()
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    time.sleep(args.idle_seconds)
+    idle_cpu_pct = 100 * (time.process_time() - cpu_started) / (time.perf_counter() - wall_started)
+
+    articles = [
+        Article(
+            url=f"https://bench.example.com/events/{idx}",
+            title=f"Bench article {idx}",
+            summary="pushed over SSE",
+            source="bench",
+            tags=(args.tags[idx % len(args.tags)],),
+        )
+        for idx in range(args.articles)
+    ]
+    published_at: Dict[str, float] = {}
+    for article in articles:
+        published_at[article.url] = time.perf_counter()
+        _upsert_articles([article])
+        time.sleep(0.01)
+    # 已存在的文章再次写入只是更新，不应产生事件
+    _upsert_articles(articles[: min(10, len(articles))])
+    time.sleep(max(1.0, float(os.environ["EVENTS_POLL_INTERVAL"]) * 5))
+
+    latencies: List[float] = []
+    filter_ok = True
+    for idx in range(args.connections):
+        tag = args.tags[idx % len(args.tags)]
+        expected = {article.url for article in articles if tag in article.tags}
+        got = clients.received[idx]
+        filter_ok = filter_ok and set(got) == expected
+        latencies.extend((got[url] - published_at[url]) * 1000 for url in expected & set(got))
+    total_events = client["tech_crawler"]["article_events"].count_documents(
+        {"article": {"$exists": True}}
+    )
+
+    # 断线期间发布的文章在携带 Last-Event-ID 重连后补发
+    clients.close(sockets[0])
+    resume_from = clients.last_ids[0]
+    missed = Article(
+        url="https://bench.example.com/events/missed",
+        title="Missed while offline",
+        source="bench",
+        tags=(args.tags[0],),
+    )
+    _upsert_articles([missed])
+    clients.received[0] = {}
+    clients.open(0, args.tags[0], last_event_id=resume_from)
+    deadline = time.monotonic() + 5
+    while missed.url not in clients.received[0] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # 断点已被 capped 集合覆盖（此处用不存在的 id 模拟）时不做部分补发，改为通知整体刷新
+    stale_idx = args.connections
+    clients.open(stale_idx, args.tags[0], last_event_id="0" * 24)
+    deadline = time.monotonic() + 5
+    while stale_idx not in clients.reloads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    clients.stop()
+    httpd.shutdown()
+
+    checks = {
+        "all_connected": connected == args.connections,
+        "filtered_delivery": filter_ok,
+        "no_events_for_updates": total_events == args.articles,
+        "last_event_id_replay": missed.url in clients.received[0],
+        "stale_id_reload": stale_idx in clients.reloads and not clients.received[stale_idx],
+        "idle_cpu_within_budget": idle_cpu_pct <= args.max_idle_cpu_pct,
+    }
+    latencies.sort()
+    report = {
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "connections": connected,
+        "threads_per_connection": round((threads_after - threads_before) / max(connected, 1), 2),
+        "rss_kb_per_connection": round((rss_after - rss_before) / max(connected, 1), 1),
+        "idle_cpu_pct": round(idle_cpu_pct, 2),
+        "deliveries": len(latencies),
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 2) if latencies else None,
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        },
+        "checks": checks,
+    }
+    report["ok"] = all(checks.values())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+HTTP 缓存/压缩基准：模拟浏览器页面加载，对比关闭与开启 HTTP 缓存层时的传输字节数与加载耗时。
+
+每轮「页面加载」依次请求 `/`、页面引用的本地静态资源与 `/api/daily_flash`。客户端按浏览器的方式工作：
+声明 gzip/br，immutable 静态资源命中后不再请求，JSON 接口携带 If-None-Match。两侧用同一个客户端：
+- before：`HTTP_CACHE_ENABLED=0` 的服务（无压缩、无 ETag、无静态资源指纹，即改造前的 HTTP 行为）；
+- after：默认配置的服务。
+
+默认在两个子进程中各启动一个服务，替身与 benchmarks/loadtest.py 相同（SQLite、mongomock、本地假 LLM）；
+也可用 --before-url/--after-url 指向已运行的服务（如检出基线提交后启动的旧版本）。
+
+用法：
+    python benchmarks/bench_http.py --loads 20
+    python benchmarks/bench_http.py --before-url http://127.0.0.1:8502 --after-url http://127.0.0.1:8501
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_ASSET_RE = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+class Client:
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.etags: Dict[str, str] = {}
+        self.immutable: Dict[str, bool] = {}
+        self.bytes_received = 0
+        self.requests = 0
+
+    def get(self, path: str) -> Tuple[int, bytes]:
+        """
+        返回状态码与解压后的响应体；字节统计按线上（压缩后）大小计。
+        """
+        if self.immutable.get(path):
+            return 200, b""
+        headers = {"Accept-Encoding": "br, gzip"}
+        if path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+            self.requests += 1
+            # 只统计响应体字节；http.client 不会自动解压，得到的就是线上字节数
+            self.bytes_received += len(body)
+            etag = resp.getheader("ETag")
+            if etag:
+                self.etags[path] = etag
+            if "immutable" in (resp.getheader("Cache-Control") or ""):
+                self.immutable[path] = True
+            return resp.status, _decode(body, resp.getheader("Content-Encoding"))
+        finally:
+            conn.close()
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(body)
+    return body
+
+
+def _load_page(client: Client) -> float:
+    started = time.perf_counter()
+    status, body = client.get("/")
+    if status != 200:
+        raise RuntimeError(f"首页请求失败: HTTP {status}")
+    html = body.decode("utf-8", errors="ignore")
+    for asset in sorted(set(_ASSET_RE.findall(html))):
+        client.get(asset.replace("&amp;", "&"))
+    client.get("/api/daily_flash")
+    return time.perf_counter() - started
+
+
+def run(base_url: str, loads: int) -> Dict:
+    client = Client(base_url)
+    timings: List[float] = [_load_page(client) for _ in range(loads)]
+    return {
+        "base_url": base_url,
+        "loads": loads,
+        "requests": client.requests,
+        "bytes_total": client.bytes_received,
+        "bytes_per_load": round(client.bytes_received / max(loads, 1)),
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "first_load_ms": round(timings[0] * 1000, 2),
+    }
+
+
+def serve(articles: int, llm_latency: float):
+    """
+    子进程入口：按当前环境变量（HTTP_CACHE_ENABLED）启动带替身的服务，把端口写到 stdout 后常驻。
+    """
+    from loadtest import configure_environment, install_standins, seed, start_app, start_fake_llm
+
+    workdir = tempfile.mkdtemp(prefix="bench-http-")
+    llm = start_fake_llm(llm_latency)
+    configure_environment(workdir, llm.server_port)
+    install_standins(workdir, None)
+    seed(1, articles, random.Random(42))
+    _, port = start_app()
+    print(port, flush=True)
+    sys.stdin.read()  # 父进程关闭管道后退出
+
+
+def _spawn(cache_enabled: bool, articles: int, llm_latency: float) -> Tuple[subprocess.Popen, str]:
+    env = dict(os.environ, HTTP_CACHE_ENABLED="1" if cache_enabled else "0")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve",
+         "--articles", str(articles), "--llm-latency", str(llm_latency)],
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    line = proc.stdout.readline().strip()
+    if not line.isdigit():
+        proc.kill()
+        raise RuntimeError("基准服务启动失败")
+    return proc, f"http://127.0.0.1:{line}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--before-url", default=None, help="已运行的对照服务（缓存层关闭或基线版本）")
+    parser.add_argument("--after-url", default=None, help="已运行的待测服务")
+    parser.add_argument("--loads", type=int, default=20)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="假 LLM 单次响应延迟（秒）")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.articles, args.llm_latency)
+        return 0
+
+    procs = []
+    try:
+        urls = {}
+        for name, url, cache_enabled in (
+            ("before", args.before_url, False),
+            ("after", args.after_url, True),
+        ):
+            if url is None:
+                proc, url = _spawn(cache_enabled, args.articles, args.llm_latency)
+                procs.append(proc)
+            urls[name] = url
+        before = run(urls["before"], args.loads)
+        after = run(urls["after"], args.loads)
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait(timeout=30)
+    report = {
+        "before": before,
+        "after": after,
+        "bytes_saved_pct": round(
+            100 * (1 - after["bytes_total"] / max(before["bytes_total"], 1)), 1
+        ),
+        "p50_saved_pct": round(100 * (1 - after["p50_ms"] / max(before["p50_ms"], 1e-9)), 1),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
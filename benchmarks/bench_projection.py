@@ -0,0 +1,201 @@
+"""
+字段投影 + Article 记录基准：对比推荐查询取整文档为 dict 与投影后解码为 Article 的开销。
+
+对同一批候选（--pool 条，模拟大候选池）分别统计：
+- wire_bytes：返回文档的 BSON 字节数之和（即 mongod → 客户端的线上负载）；
+- alloc_blocks / peak_kb：取数 + 解码期间 tracemalloc 统计的内存块分配数与峰值；
+- retained_kb：候选列表常驻期间占用的内存。
+
+mongomock 会在内部复制整个结果集，解码期间这些副本与 Article 并存，峰值不能代表真实驱动。
+因此另做一组 driver_model 测量：把同一结果预先编码为按驱动方式分批的 BSON 回包（首批 101 条，
+之后默认一次取满 16MB，或按 DECODE_BATCH_SIZE 分批），再逐批 `bson.decode_all` 解码，
+对比整文档 dict、默认分批解码为 Article、限定批大小解码为 Article 三者的峰值。
+
+默认使用 mongomock；传入 --mongo-uri 时在本地 mongod 的独立库上运行，结束后删除。
+
+用法：
+    pip install mongomock
+    python benchmarks/bench_projection.py --pool 20000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Mapping, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson  # noqa: E402
+
+from models import ARTICLE_PROJECTION, DECODE_BATCH_SIZE, decode_articles  # noqa: E402
+
+FIRST_BATCH = 101
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+from sources import SOURCE_TAGS  # noqa: E402
+
+
+def _seed(collection, total: int):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    docs = []
+    for idx in range(total):
+        docs.append(
+            {
+                "title": f"基准文章 {idx}：{rng.choice(SOURCE_TAGS)} 实战",
+                "url": f"https://example.com/bench/{idx}",
+                "summary": "用于投影基准的文章摘要。" * rng.randint(2, 12),
+                "source": rng.choice(("juejin", "github", "hackernews")),
+                "tags": rng.sample(SOURCE_TAGS, k=rng.randint(1, 3)),
+                "top_image": f"https://example.com/img/{idx}.png",
+                "publish_date": (now - timedelta(minutes=idx)).isoformat(),
+                "updated_at": now - timedelta(seconds=idx),
+            }
+        )
+    collection.insert_many(docs)
+    collection.create_index([("updated_at", -1)])
+
+
+def _fetch_full(collection, pool: int) -> List:
+    return list(collection.find().sort("updated_at", -1).limit(pool))
+
+
+def _fetch_projected(collection, pool: int) -> List:
+    return decode_articles(_cursor(collection, pool, ARTICLE_PROJECTION))
+
+
+def _cursor(collection, pool: int, projection: Optional[Mapping]):
+    projection = dict(projection) if projection is not None else None
+    return collection.find({}, projection).sort("updated_at", -1).limit(pool)
+
+
+def _wire_bytes(collection, pool: int, projection: Optional[Mapping]) -> int:
+    return sum(len(bson.encode(doc)) for doc in _cursor(collection, pool, projection))
+
+
+def _driver_batches(
+    collection, pool: int, projection: Optional[Mapping], batch_size: Optional[int]
+) -> List[bytes]:
+    """
+    按驱动的分批方式把结果编码为 BSON 回包：首批 FIRST_BATCH 条，之后每批 batch_size 条；
+    batch_size 为 None 时按 16MB 上限攒批（驱动默认行为）。
+    """
+    docs = [bson.encode(doc) for doc in _cursor(collection, pool, projection)]
+    batches, start = [], 0
+    while start < len(docs):
+        if not batches:
+            end = min(start + FIRST_BATCH, len(docs))
+        elif batch_size is not None:
+            end = min(start + batch_size, len(docs))
+        else:
+            end, size = start, 0
+            while end < len(docs) and size + len(docs[end]) <= MAX_BATCH_BYTES:
+                size += len(docs[end])
+                end += 1
+        batches.append(b"".join(docs[start:end]))
+        start = end
+    return batches
+
+
+def _iter_batches(batches: List[bytes]):
+    for raw in batches:
+        # 与驱动一致：整批回包一次解码为 dict 列表，迭代完这一批才释放
+        yield from bson.decode_all(raw)
+
+
+def _measure(fetch: Callable[[], List]) -> Dict[str, float]:
+    fetch()  # 预热游标/索引
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fetch()
+    after = tracemalloc.take_snapshot()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff
+        for stat in after.compare_to(before, "filename")
+        if stat.count_diff > 0
+    )
+    report = {
+        "items": len(result),
+        "alloc_blocks": blocks,
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(retained / 1024, 1),
+    }
+    del result
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pool", type=int, default=20000, help="候选池大小（同时为写入文章数）")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--db", default="tech_crawler_bench")
+    args = parser.parse_args(argv)
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.mongo_uri)
+        client.drop_database(args.db)
+    else:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    collection = client[args.db]["articles"]
+    try:
+        _seed(collection, args.pool)
+        full = _measure(lambda: _fetch_full(collection, args.pool))
+        projected = _measure(lambda: _fetch_projected(collection, args.pool))
+        full["wire_bytes"] = _wire_bytes(collection, args.pool, None)
+        projected["wire_bytes"] = _wire_bytes(collection, args.pool, ARTICLE_PROJECTION)
+        full_batches = _driver_batches(collection, args.pool, None, None)
+        default_batches = _driver_batches(collection, args.pool, ARTICLE_PROJECTION, None)
+        bounded_batches = _driver_batches(
+            collection, args.pool, ARTICLE_PROJECTION, DECODE_BATCH_SIZE
+        )
+        driver_model = {
+            "full_dict": _measure(lambda: list(_iter_batches(full_batches))),
+            "projected_article_default_batches": _measure(
+                lambda: decode_articles(_iter_batches(default_batches))
+            ),
+            "projected_article_bounded_batches": _measure(
+                lambda: decode_articles(_iter_batches(bounded_batches))
+            ),
+        }
+    finally:
+        if args.mongo_uri:
+            client.drop_database(args.db)
+
+    def saved(key: str) -> float:
+        return round(100 * (1 - projected[key] / max(full[key], 1)), 1)
+
+    report = {
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "full_dict": full,
+        "projected_article": projected,
+        "saved_pct": {
+            key: saved(key) for key in ("wire_bytes", "alloc_blocks", "peak_kb", "retained_kb")
+        },
+        "driver_model": driver_model,
+        "driver_model_peak_saved_pct": {
+            name: round(
+                100 * (1 - stats["peak_kb"] / max(driver_model["full_dict"]["peak_kb"], 1)), 1
+            )
+            for name, stats in driver_model.items()
+            if name != "full_dict"
+        },
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+全文检索基准：在合成文章池上构建 BM25 索引，统计建索引耗时与各类查询的 p50/p95/p99。
+
+文章标题/摘要从中英文混合词表按 Zipf 分布抽词，标签与来源取自真实配置；查询覆盖
+高频词、低频词、多词、中文短语，以及叠加来源/标签过滤的情况。p95 超过预算时返回非零退出码。
+
+用法：
+    python benchmarks/bench_search.py --articles 100000 --queries 2000 --max-p95-ms 10
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Article  # noqa: E402
+from search import SearchIndex  # noqa: E402
+from sources import SOURCE_TAGS  # noqa: E402
+
+SOURCES = ("juejin", "github", "hackernews")
+_EN_WORDS = (
+    "rust python async runtime kernel compiler database index cache vector search "
+    "llm agent prompt inference gpu cuda kubernetes docker serverless edge wasm react "
+    "vue typescript golang java spring linux network protocol storage stream queue "
+    "benchmark latency throughput memory allocator garbage collector parser tokenizer"
+).split()
+_CJK_WORDS = (
+    "异步 运行时 编译器 数据库 索引 缓存 向量 检索 大模型 智能体 推理 显卡 容器 云原生 前端 "
+    "框架 性能 优化 内存 并发 网络 协议 存储 队列 实战 源码 解析 架构 设计 入门 进阶"
+).split()
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = list(_EN_WORDS) + list(_CJK_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)))
+    return words
+
+
+def _zipf_picker(rng: random.Random, vocab: List[str]):
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocab))))
+    return lambda k: rng.choices(vocab, cum_weights=cum_weights, k=k)
+
+
+def build_corpus(total: int, seed: int = 42) -> List[Article]:
+    rng = random.Random(seed)
+    pick = _zipf_picker(rng, _vocabulary(rng, 20000))
+    articles = []
+    for idx in range(total):
+        articles.append(
+            Article(
+                url=f"https://example.com/search/{idx}",
+                title=" ".join(pick(rng.randint(4, 10))),
+                summary=" ".join(pick(rng.randint(15, 60))),
+                source=rng.choice(SOURCES),
+                tags=tuple(rng.sample(SOURCE_TAGS, k=rng.randint(1, 2))),
+            )
+        )
+    return articles
+
+
+def build_queries(count: int, seed: int = 7) -> List[Tuple[str, Dict]]:
+    rng = random.Random(seed)
+    vocab = _vocabulary(random.Random(42), 20000)
+    shapes = [
+        lambda: (rng.choice(_EN_WORDS[:8]), {}),
+        lambda: (rng.choice(vocab[2000:]), {}),
+        lambda: (" ".join(rng.sample(_EN_WORDS, 3)), {}),
+        lambda: (rng.choice(_CJK_WORDS) + rng.choice(_CJK_WORDS), {}),
+        lambda: (rng.choice(_EN_WORDS), {"source": rng.choice(SOURCES)}),
+        lambda: (rng.choice(_CJK_WORDS), {"tags": [rng.choice(SOURCE_TAGS)]}),
+    ]
+    return [rng.choice(shapes)() for _ in range(count)]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--max-p95-ms", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.articles)
+    index = SearchIndex()
+    started = time.perf_counter()
+    for article in corpus:
+        index.upsert(article)
+    build_seconds = time.perf_counter() - started
+
+    queries = build_queries(args.queries)
+    index.search("warmup", limit=args.limit)  # 首次查询会计算长度归一化因子
+    timings: List[float] = []
+    hits = 0
+    for query, filters in queries:
+        started = time.perf_counter()
+        results = index.search(query, limit=args.limit, **filters)
+        timings.append(time.perf_counter() - started)
+        hits += bool(results)
+    timings.sort()
+    p95_ms = _percentile(timings, 95) * 1000
+    report = {
+        "articles": args.articles,
+        "build_seconds": round(build_seconds, 2),
+        "queries": len(queries),
+        "queries_with_hits": hits,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(p95_ms, 3),
+        "p99_ms": round(_percentile(timings, 99) * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+        "budget": {"p95_ms": args.max_p95_ms},
+    }
+    report["ok"] = p95_ms <= args.max_p95_ms
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+文章池快照基准：对比经爬虫写入路径逐条灌数与快照批量导入的吞吐，并校验导出/导入往返无损。
+
+流程：
+- 经 `_upsert_articles` 写入 --articles 篇合成文章（部分带富化字段），作为逐条灌数的基线；
+- `export_snapshot` 导出为分片 gzip JSONL，统计耗时与压缩后字节数；
+- 清空集合后分别以「延迟建索引」与「保留索引」两种方式 `import_snapshot`，统计吞吐；
+- 再次导入同一快照，确认按 url 幂等（只更新、不新增）。
+导入后文档或索引与导出前不一致、重复导入产生新文档、或导入吞吐不高于逐条灌数时返回非零退出码。
+
+默认使用 mongomock；传入 --mongo-uri 时使用真实 mongod（延迟建索引的收益以此为准），会清空其中的
+tech_crawler 库，请指向测试实例。
+
+用法：
+    pip install mongomock
+    python benchmarks/bench_snapshot.py --articles 20000 --chunk-size 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CHANGED_AT_FIELD  # noqa: E402
+
+
+def _dump(collection) -> List[Dict]:
+    # changed_at 是每次写入时由服务端刷新的增量标记，导入后必然变化，不参与往返比较
+    return list(collection.find({}, {"_id": 0, CHANGED_AT_FIELD: 0}).sort("url", 1))
+
+
+def _indexes(collection) -> Dict:
+    # mongomock 对经 IndexModel 创建的索引返回 dict_items 形式的 key，统一转为列表再比较
+    return {
+        name: {
+            **{key: value for key, value in info.items() if key not in ("v", "ns")},
+            "key": list(info["key"]),
+        }
+        for name, info in collection.index_information().items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--enriched-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+    workdir = tempfile.mkdtemp(prefix="snapshot-")
+
+    from loadtest import install_standins
+
+    install_standins(workdir, args.mongo_uri)
+
+    import db_init
+    from crawler import _upsert_articles
+    from database import get_mongo_database
+    from models import Article
+    from snapshot import export_snapshot, import_snapshot
+    from sources import SOURCE_TAGS, TOPIC_TAGS
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    articles = [
+        Article(
+            url=f"https://example.com/snapshot/{idx}",
+            title=f"快照文章 {idx}：{rng.choice(SOURCE_TAGS)} 实战",
+            summary="用于快照基准的文章摘要。" * rng.randint(1, 5),
+            source=rng.choice(("juejin", "github", "hackernews")),
+            tags=tuple(rng.sample(SOURCE_TAGS, k=rng.randint(1, 2))),
+            top_image=f"https://example.com/img/{idx}.png",
+            publish_date=(now - timedelta(minutes=idx)).isoformat(),
+        )
+        for idx in range(args.articles)
+    ]
+    started = time.perf_counter()
+    for start in range(0, len(articles), 500):
+        _upsert_articles(articles[start : start + 500])
+    seed_seconds = time.perf_counter() - started
+
+    db = get_mongo_database("tech_crawler")
+    collection = db["articles"]
+    for idx, article in enumerate(articles):
+        if rng.random() >= args.enriched_ratio:
+            continue
+        ai_tags = rng.sample(TOPIC_TAGS, k=2)
+        collection.update_one(
+            {"url": article.url},
+            {
+                "$set": {
+                    "ai_summary": f"一句话概括 {idx}",
+                    "ai_comment": "基准辣评。",
+                    "ai_tags": ai_tags,
+                    "enriched_at": now,
+                },
+                "$addToSet": {"tags": {"$each": ai_tags}},
+            },
+        )
+    expected_docs, expected_indexes = _dump(collection), _indexes(collection)
+
+    snapshot_dir = os.path.join(workdir, "snapshot")
+    started = time.perf_counter()
+    manifest = export_snapshot(snapshot_dir, args.chunk_size)
+    export_seconds = time.perf_counter() - started
+    snapshot_bytes = sum(chunk["bytes"] for chunk in manifest["chunks"])
+
+    imports = {}
+    for mode, defer in (("deferred_indexes", True), ("kept_indexes", False)):
+        db.drop_collection("articles")
+        db_init.init_mongo()
+        imports[mode] = import_snapshot(
+            snapshot_dir, batch_size=args.batch_size, workers=args.workers, defer_indexes=defer
+        )
+    roundtrip_docs, roundtrip_indexes = _dump(collection), _indexes(collection)
+    reimport = import_snapshot(snapshot_dir, batch_size=args.batch_size, workers=args.workers)
+
+    seed_rate = args.articles / seed_seconds
+    import_rate = imports["deferred_indexes"]["docs_per_second"]
+    checks = {
+        "roundtrip_documents_equal": roundtrip_docs == expected_docs,
+        "indexes_restored": roundtrip_indexes == expected_indexes
+        and _indexes(collection) == expected_indexes,
+        "reimport_idempotent": reimport["inserted"] == 0
+        and collection.count_documents({}) == args.articles,
+        "import_faster_than_seed": import_rate > seed_rate,
+    }
+    report = {
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "articles": args.articles,
+        "seed_via_crawler": {
+            "seconds": round(seed_seconds, 2),
+            "docs_per_second": round(seed_rate, 1),
+        },
+        "export": {
+            "seconds": round(export_seconds, 2),
+            "chunks": len(manifest["chunks"]),
+            "bytes": snapshot_bytes,
+            "bytes_per_doc": round(snapshot_bytes / max(args.articles, 1), 1),
+        },
+        "import": imports,
+        "reimport": reimport,
+        "speedup": round(import_rate / seed_rate, 2),
+        "checks": checks,
+    }
+    report["ok"] = all(checks.values())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Web 进程冷启动基准：基于 `python -X importtime` 统计 `import server` 的耗时与内存。
+
+在全新解释器中多次导入服务模块，取导入耗时中位数与峰值 RSS，
+同时检查爬虫/LLM 依赖是否被提前加载；任一指标超出预算时以非零状态码退出。
+
+用法：
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1000 --max-rss-mb 120
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Web 进程不应在启动时加载的重量级依赖
+FORBIDDEN_MODULES = ("selenium", "webdriver_manager", "bs4", "requests", "openai")
+
+_RSS_SNIPPET = (
+    "import resource, sys; import {module}; "
+    "sys.stdout.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))"
+)
+
+
+def _parse_importtime(stderr: str, module: str) -> Tuple[float, Set[str]]:
+    """
+    解析 importtime 输出，返回目标模块的累计耗时（毫秒）与全部已加载模块名。
+    """
+    cumulative_us = 0
+    loaded: Set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        loaded.add(name)
+        if name == module:
+            cumulative_us = int(parts[1].strip())
+    return cumulative_us / 1000, loaded
+
+
+def measure_once(module: str) -> Dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_ms, loaded = _parse_importtime(proc.stderr, module)
+    rss = subprocess.run(
+        [sys.executable, "-c", _RSS_SNIPPET.format(module=module)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Linux 下 ru_maxrss 单位为 KB
+    rss_mb = int(rss.stdout.strip() or 0) / 1024
+    leaked = sorted(name for name in loaded if name.split(".")[0] in FORBIDDEN_MODULES)
+    return {"import_ms": import_ms, "rss_mb": rss_mb, "forbidden": leaked}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1000.0)
+    parser.add_argument("--max-rss-mb", type=float, default=120.0)
+    args = parser.parse_args(argv)
+
+    samples = [measure_once(args.module) for _ in range(args.runs)]
+    forbidden = sorted({name for sample in samples for name in sample["forbidden"]})
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_ms_p50": round(statistics.median(s["import_ms"] for s in samples), 2),
+        "import_ms_max": round(max(s["import_ms"] for s in samples), 2),
+        "rss_mb_max": round(max(s["rss_mb"] for s in samples), 2),
+        "forbidden_modules": forbidden,
+        "budget": {"import_ms": args.max_import_ms, "rss_mb": args.max_rss_mb},
+    }
+    report["ok"] = (
+        report["import_ms_p50"] <= args.max_import_ms
+        and report["rss_mb_max"] <= args.max_rss_mb
+        and not forbidden
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+图片代理基准：启动本地源站提供多 MB 大图，经 `/img/thumb` 代理对比回源前后的字节数与耗时，并校验缓存行为。
+
+校验项：
+- 首次请求回源一次，之后命中磁盘缓存，源站计数不再增加；携带 ETag 的重复请求返回 304；
+- 16 个并发请求同一张新图只回源一次，结束后回源锁表清空；
+- 不在文章池 top_image 中的地址不回源、直接返回占位图；
+- 源站 404 / 非图片时返回本地 SVG 占位图且只短暂缓存，失败期内重复请求不再回源；
+  picsum 旧地址 301 到本地占位图；
+- 关闭 IMAGE_PROXY_ALLOW_PRIVATE 时拒绝回环地址且不建立连接；缓存超过上限后按 LRU 淘汰到上限以内。
+任一校验失败时返回非零退出码。安装 Pillow 后会实际缩放为卡片尺寸，否则原图透传。
+
+文章池使用 mongomock（需 `pip install mongomock`）。
+
+用法：
+    python benchmarks/bench_thumbnails.py --width 2400 --height 1200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_png(width: int, height: int) -> bytes:
+    """
+    用标准库生成带噪声的 RGB PNG（噪声使压缩率接近真实照片）。
+    """
+    row_bytes = width * 3
+    noise = os.urandom(row_bytes * height)
+    raw = b"".join(
+        b"\x00" + noise[row * row_bytes : (row + 1) * row_bytes] for row in range(height)
+    )
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def start_origin(image: bytes, latency: float) -> ThreadingHTTPServer:
+    hits: Counter = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] += 1
+            time.sleep(latency)
+            if self.path.startswith("/big.png"):
+                self._send(200, "image/png", image)
+            elif self.path == "/page.html":
+                self._send(200, "text/html", b"<html></html>")
+            else:
+                self._send(404, "text/plain", b"not found")
+
+        def _send(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.hits = hits
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=2400)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--origin-latency", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="thumbs-")
+    os.environ["IMAGE_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["IMAGE_PROXY_ALLOW_PRIVATE"] = "1"
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+    from loadtest import install_standins
+
+    install_standins(workdir, None)
+
+    import thumbnails
+    from database import get_mongo_database
+    from server import app
+
+    image = make_png(args.width, args.height)
+    origin = start_origin(image, args.origin_latency)
+    base = f"http://127.0.0.1:{origin.server_address[1]}"
+    article_images = ("big.png", "big.png?variant=2", "missing.png", "page.html", "big.png?v=3")
+    get_mongo_database("tech_crawler")["articles"].insert_many(
+        {"url": f"https://example.com/thumbs/{idx}", "top_image": f"{base}/{path}"}
+        for idx, path in enumerate(article_images)
+    )
+    client = app.test_client()
+    checks = {}
+
+    def timed_get(path: str, headers=None):
+        started = time.perf_counter()
+        resp = client.get(path, headers=headers or {})
+        return resp, (time.perf_counter() - started) * 1000
+
+    thumb_path = f"/img/thumb?url={base}/big.png&w=400"
+    cold, cold_ms = timed_get(thumb_path)
+    warm, warm_ms = timed_get(thumb_path)
+    revalidated, _ = timed_get(thumb_path, {"If-None-Match": warm.headers.get("ETag", "")})
+    checks["cold_ok"] = cold.status_code == 200 and cold.mimetype.startswith("image/")
+    checks["origin_fetched_once"] = origin.hits["/big.png"] == 1
+    checks["immutable_cache_header"] = "immutable" in (warm.headers.get("Cache-Control") or "")
+    checks["etag_304"] = revalidated.status_code == 304
+
+    concurrent_path = f"/img/thumb?url={base}/big.png%3Fvariant%3D2&w=400"
+    threads = [
+        threading.Thread(target=lambda: app.test_client().get(concurrent_path)) for _ in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    checks["concurrent_single_fetch"] = origin.hits["/big.png?variant=2"] == 1
+    checks["inflight_released"] = not thumbnails._inflight
+
+    unknown = client.get(f"/img/thumb?url={base}/big.png%3Fvariant%3Dunknown")
+    checks["unknown_url_rejected"] = (
+        unknown.mimetype == "image/svg+xml" and origin.hits["/big.png?variant=unknown"] == 0
+    )
+
+    missing = client.get(f"/img/thumb?url={base}/missing.png")
+    missing_again = client.get(f"/img/thumb?url={base}/missing.png")
+    not_image = client.get(f"/img/thumb?url={base}/page.html")
+    checks["missing_falls_back"] = (
+        missing.mimetype == "image/svg+xml" and "max-age=300" in missing.headers["Cache-Control"]
+    )
+    checks["failure_cached"] = (
+        missing_again.mimetype == "image/svg+xml" and origin.hits["/missing.png"] == 1
+    )
+    checks["non_image_rejected"] = not_image.mimetype == "image/svg+xml"
+    legacy = client.get("/img/thumb?url=https://picsum.photos/seed/rust/800/400")
+    checks["picsum_redirects_local"] = legacy.status_code == 301 and legacy.headers[
+        "Location"
+    ].endswith("/img/placeholder/rust.svg")
+    placeholder = client.get("/img/placeholder/rust.svg")
+    checks["placeholder_svg"] = placeholder.status_code == 200 and b"<svg" in placeholder.data
+
+    thumbnails.IMAGE_PROXY_ALLOW_PRIVATE = False
+    try:
+        blocked = client.get(f"/img/thumb?url={base}/big.png%3Fv%3D3")
+        checks["private_host_blocked"] = (
+            blocked.mimetype == "image/svg+xml" and origin.hits["/big.png?v=3"] == 0
+        )
+    finally:
+        thumbnails.IMAGE_PROXY_ALLOW_PRIVATE = True
+
+    small = thumbnails.ThumbnailCache(os.path.join(workdir, "small"), max_bytes=50_000)
+    for idx in range(20):
+        small.put(f"{idx:040x}", os.urandom(10_000), "image/jpeg")
+        time.sleep(0.01)
+    checks["lru_bounded"] = small.usage() <= 50_000 and small.get(f"{19:040x}") is not None
+    checks["lru_evicts_oldest"] = small.get(f"{0:040x}") is None
+
+    origin.shutdown()
+    report = {
+        "pillow": thumbnails._pillow() is not None,
+        "origin_bytes": len(image),
+        "thumb_bytes": len(cold.data),
+        "bytes_saved_pct": round(100 * (1 - len(cold.data) / len(image)), 1),
+        "cold_ms": round(cold_ms, 2),
+        "warm_ms": round(warm_ms, 2),
+        "origin_hits": dict(origin.hits),
+        "checks": checks,
+    }
+    report["ok"] = all(checks.values())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
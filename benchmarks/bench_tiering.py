@@ -0,0 +1,173 @@
+"""
+冷热分层查询基准：对比文章总量 10k 与 1M 时，推荐查询在归档前后（全量集合 vs 热集合）的延迟。
+
+每个规模下重建 tech_crawler 库（索引由 db_init.init_mongo 创建），写入跨度 ARTICLE_SPAN_DAYS 天的文章：
+- untiered：归档前，全部文章在热集合中，按 recommender.py 的三种查询形状各执行 --repeat 次；
+- archive：执行真实的 `retention.archive_cold_articles`（collection 模式），统计耗时与归档条数；
+- tiered：归档后在同一集合上重复测量。
+归档条数与种子数据不符、热集合残留冷文章或归档集合条数不符时返回非零退出码。
+
+延迟与索引大小需要真实 mongod 才有参考意义，传入 --mongo-uri 时会清空其中的 tech_crawler 库，
+请指向测试实例；不传时使用 mongomock，只校验归档流程本身（尚无 mongod 实测数据）。
+
+用法：
+    python benchmarks/bench_tiering.py --mongo-uri mongodb://127.0.0.1:27017 --sizes 10000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ARTICLE_SPAN_DAYS = 365
+SOURCES = ("juejin", "github", "hackernews")
+TAGS = [f"tag{i}" for i in range(200)]
+
+
+def _seed(collection, total: int, batch: int = 10000) -> int:
+    """
+    写入 total 篇 updated_at 均匀分布在 ARTICLE_SPAN_DAYS 天内的文章，返回落在热窗口外的条数。
+    """
+    from config import ARTICLE_HOT_DAYS
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    cold = 0
+    docs: List[Dict] = []
+    for i in range(total):
+        age_days = rng.uniform(0, ARTICLE_SPAN_DAYS)
+        # 留出半天余量，避免恰好跨过截止时间的文章让校验不稳定
+        if abs(age_days - ARTICLE_HOT_DAYS) < 0.5:
+            age_days += 1
+        cold += age_days >= ARTICLE_HOT_DAYS
+        docs.append(
+            {
+                "url": f"https://bench.local/article/{i}",
+                "title": f"Benchmark article {i}",
+                "source": SOURCES[i % len(SOURCES)],
+                "tags": rng.sample(TAGS, 3),
+                "top_image": "",
+                "updated_at": now - timedelta(days=age_days),
+            }
+        )
+        if len(docs) >= batch:
+            collection.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        collection.insert_many(docs, ordered=False)
+    return cold
+
+
+def _query_shapes(collection) -> Dict[str, Callable[[], None]]:
+    rng = random.Random(7)
+
+    def by_tags():
+        tags = rng.sample(TAGS, 3)
+        list(collection.find({"tags": {"$in": tags}}).sort("updated_at", -1).limit(10))
+
+    def hot():
+        list(collection.find().sort("updated_at", -1).limit(10))
+
+    def mixed():
+        for source in SOURCES:
+            list(collection.find({"source": source}).sort("updated_at", -1).limit(5))
+
+    return {"by_tags": by_tags, "hot": hot, "mixed": mixed}
+
+
+def _measure(collection, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, query in _query_shapes(collection).items():
+        query()  # 预热缓存
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        results[name] = {
+            "p50_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+        }
+    return results
+
+
+def _index_mb(db, name: str) -> Optional[float]:
+    try:
+        stats = db.command("collStats", name)
+    except Exception:
+        return None  # mongomock 不支持 collStats
+    return round(stats["totalIndexSize"] / 1024 / 1024, 2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+    from loadtest import install_standins
+
+    install_standins(tempfile.mkdtemp(prefix="tiering-"), args.mongo_uri)
+
+    import db_init
+    from config import ARTICLE_HOT_DAYS
+    from database import get_mongo_database
+    from retention import ARCHIVE_COLLECTION, archive_cold_articles
+
+    db = get_mongo_database("tech_crawler")
+    hot, archive = db["articles"], db[ARCHIVE_COLLECTION]
+    report = {"mongo": "mongod" if args.mongo_uri else "mongomock", "hot_days": ARTICLE_HOT_DAYS}
+    results = []
+    ok = True
+    for size in args.sizes:
+        db.drop_collection("articles")
+        db.drop_collection(ARCHIVE_COLLECTION)
+        db_init.init_mongo()
+        cold = _seed(hot, size)
+        entry = {
+            "total_articles": size,
+            "untiered_docs": hot.count_documents({}),
+            "untiered": _measure(hot, args.repeat),
+            "untiered_index_mb": _index_mb(db, "articles"),
+        }
+        started = time.perf_counter()
+        archived = archive_cold_articles(hot_days=ARTICLE_HOT_DAYS, mode="collection")
+        entry["archive"] = {
+            "archived": archived,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        cutoff = datetime.utcnow() - timedelta(days=ARTICLE_HOT_DAYS)
+        entry["tiered_docs"] = hot.count_documents({})
+        entry["tiered"] = _measure(hot, args.repeat)
+        entry["tiered_index_mb"] = _index_mb(db, "articles")
+        entry["checks"] = {
+            "archived_all_cold": archived == cold,
+            "hot_has_no_cold": hot.count_documents({"updated_at": {"$lt": cutoff}}) == 0,
+            "archive_complete": archive.count_documents({}) == cold,
+            "hot_keeps_recent": entry["tiered_docs"] == size - cold,
+            "no_archive_marks_left": hot.count_documents({"archived_at": {"$exists": True}}) == 0,
+        }
+        ok = ok and all(entry["checks"].values())
+        results.append(entry)
+        print(json.dumps(entry, ensure_ascii=False), file=sys.stderr)
+    report["results"] = results
+    report["ok"] = ok
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,469 @@
+"""
+Flask API 端到端压测。
+
+在进程内启动 `server.app`，MySQL 替换为 SQLite 文件库、Mongo 替换为 mongomock（或 `--mongo-uri`
+指定的本地 mongod），LLM 指向本地假 OpenAI 兼容服务（延迟可配）；灌入 N 个用户与 M 篇文章
+（或 `--snapshot` 指定的文章池快照）后，
+以目标并发驱动 `/`、`/api/daily_flash`、`/api/recommend`、`/api/log_action`，
+输出各路由吞吐与 p50/p95/p99（JSON，可与上一次结果对比）。
+任一路由出现错误（HTTP >= 400 或连接失败）时，报告中 `ok` 为 false 并列出出错路由，退出码非零：
+带错误的结果不能作为对比基线。
+
+用法：
+    python benchmarks/loadtest.py --users 50 --articles 2000 --concurrency 32 --duration 30 \\
+        --llm-latency 0.8 --output data/loadtest.json
+    python benchmarks/loadtest.py --duration 30 --compare data/loadtest.json
+    python benchmarks/loadtest.py --snapshot data/snapshots/20240101 --duration 30
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_MIX = "index=1,daily_flash=2,recommend=3,log_action=4"
+_ID_RE = re.compile(r"^ID: (\d+)$", re.MULTILINE)
+
+
+# ---------------------------------------------------------------------------
+# 假 LLM：OpenAI 兼容的 /chat/completions
+# ---------------------------------------------------------------------------
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        time.sleep(self.latency)
+        ids = _ID_RE.findall(prompt)
+        if ids:
+            content = json.dumps(
+                [
+                    {"index": int(idx), "ai_comment": "压测辣评：跑得比我快。", "tag_match": "热门推荐"}
+                    for idx in ids
+                ],
+                ensure_ascii=False,
+            )
+        else:
+            content = "大家早！这是压测早报 ☕️"
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-loadtest",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 2,
+                    "completion_tokens": len(content) // 2,
+                    "total_tokens": (len(prompt) + len(content)) // 2,
+                },
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_llm(latency: float) -> ThreadingHTTPServer:
+    handler = type("ConfiguredFakeLLM", (FakeLLMHandler,), {"latency": latency})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+# ---------------------------------------------------------------------------
+# 本地替身与数据灌入
+# ---------------------------------------------------------------------------
+def configure_environment(workdir: str, llm_port: int):
+    """
+    必须在导入任何项目模块之前调用：config.py 在导入时读取环境变量。
+    """
+    os.environ["LLM_API_KEY"] = "loadtest"
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    os.environ["USER_LOG_SPILL_PATH"] = os.path.join(workdir, "user_logs.spill.jsonl")
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+
+def patch_mongomock_bulk_write():
+    """
+    mongomock 4.3 的 `bulk_write` 与 pymongo >= 4.9 不兼容（UpdateOne 多了 sort 参数，
+    抛出 `add_update() got an unexpected keyword argument 'sort'`）。检测到时改为逐条执行，
+    返回同样的 BulkWriteResult 计数；只作用于基准中的 mongomock 替身，真实 mongod 不受影响。
+    """
+    import mongomock
+    from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+    from pymongo.results import BulkWriteResult
+
+    probe = mongomock.MongoClient()["probe"]["probe"]
+    try:
+        probe.bulk_write([UpdateOne({"_id": 1}, {"$set": {"probe": 1}}, upsert=True)])
+        return
+    except TypeError:
+        pass
+
+    def bulk_write(self, requests, ordered=True, *args, **kwargs):
+        counts = {
+            "nInserted": 0,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": [],
+        }
+        for idx, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                self.insert_one(request._doc)
+                counts["nInserted"] += 1
+                continue
+            if isinstance(request, (DeleteOne, DeleteMany)):
+                delete = self.delete_one if isinstance(request, DeleteOne) else self.delete_many
+                counts["nRemoved"] += delete(request._filter).deleted_count
+                continue
+            if isinstance(request, ReplaceOne):
+                write = self.replace_one
+            elif isinstance(request, UpdateOne):
+                write = self.update_one
+            elif isinstance(request, UpdateMany):
+                write = self.update_many
+            else:
+                raise TypeError(f"不支持的批量写操作: {request!r}")
+            result = write(request._filter, request._doc, upsert=request._upsert)
+            counts["nMatched"] += result.matched_count
+            counts["nModified"] += result.modified_count
+            if result.upserted_id is not None:
+                counts["nUpserted"] += 1
+                counts["upserted"].append({"index": idx, "_id": result.upserted_id})
+        return BulkWriteResult(counts, True)
+
+    mongomock.Collection.bulk_write = bulk_write
+
+
+def patch_mongomock_find_and_modify():
+    """
+    mongomock 的 find_one_and_update 先 find_one 再按 `_id` 单独更新，多线程下两个调用方可能领取到
+    同一个文档（mongod 上该操作是原子的）。这里用进程级锁串行化，避免爬虫队列的租约在替身上被重复领取。
+    """
+    import mongomock
+
+    if getattr(mongomock.Collection, "_find_and_modify_locked", False):
+        return
+    lock = threading.Lock()
+    original = mongomock.Collection._find_and_modify
+
+    def _find_and_modify(self, *args, **kwargs):
+        with lock:
+            return original(self, *args, **kwargs)
+
+    mongomock.Collection._find_and_modify = _find_and_modify
+    mongomock.Collection._find_and_modify_locked = True
+
+
+def install_standins(workdir: str, mongo_uri: Optional[str]):
+    from sqlalchemy import create_engine
+
+    import database
+    import db_init
+
+    engine = create_engine(
+        f"sqlite:///{os.path.join(workdir, 'mysql.db')}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    database.set_mysql_engine(engine)
+    if mongo_uri:
+        client = database.get_mongo_client(mongo_uri)
+        client.drop_database("tech_crawler")
+    else:
+        import mongomock
+
+        patch_mongomock_bulk_write()
+        patch_mongomock_find_and_modify()
+        database.set_mongo_client(mongomock.MongoClient())
+    db_init.init_mysql()
+    db_init.init_mongo()
+
+
+def seed(
+    users: int, articles: int, rng: random.Random, snapshot_dir: Optional[str] = None
+) -> List[Dict]:
+    from sqlalchemy import text
+
+    from crawler import _upsert_articles
+    from database import mysql_connection
+    from models import Article
+    from sources import SOURCE_TAGS
+
+    seeded_users = []
+    for idx in range(users):
+        interests = rng.sample(SOURCE_TAGS, k=rng.randint(1, 3))
+        seeded_users.append(
+            {"user_id": f"load_{idx:05d}", "username": f"压测用户{idx}", "interests": interests}
+        )
+    with mysql_connection() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (user_id, username, interests) "
+                "VALUES (:user_id, :username, :interests)"
+            ),
+            [
+                {**user, "interests": json.dumps(user["interests"], ensure_ascii=False)}
+                for user in seeded_users
+            ],
+        )
+
+    if snapshot_dir:
+        # 用真实抓取导出的快照替代合成文章；时间平移到当前，保证都落在热窗口内
+        from snapshot import import_snapshot
+
+        import_snapshot(snapshot_dir, defer_indexes=True, rebase_now=True)
+        return seeded_users
+
+    sources = ("juejin", "github", "hackernews")
+    now = datetime.utcnow()
+    docs = []
+    for idx in range(articles):
+        docs.append(
+            Article(
+                title=f"压测文章 {idx}：{rng.choice(SOURCE_TAGS)} 实战",
+                url=f"https://example.com/loadtest/{idx}",
+                summary="用于压测的文章摘要。" * rng.randint(1, 5),
+                source=rng.choice(sources),
+                tags=tuple(rng.sample(SOURCE_TAGS, k=rng.randint(1, 2))),
+                top_image=f"https://example.com/img/{idx}.png",
+                publish_date=(now - timedelta(minutes=idx)).isoformat(),
+            )
+        )
+    for start in range(0, len(docs), 500):
+        _upsert_articles(docs[start : start + 500])
+    return seeded_users
+
+
+def start_app() -> Tuple[object, int]:
+    from werkzeug.serving import make_server
+
+    from server import app
+
+    # 逐条访问日志会显著拖慢服务线程并污染输出
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, httpd.server_port
+
+
+# ---------------------------------------------------------------------------
+# 施压与统计
+# ---------------------------------------------------------------------------
+def _parse_mix(spec: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), int(weight or 1)))
+    return mix
+
+
+def _build_request(route: str, users: List[Dict], rng: random.Random):
+    user = rng.choice(users)
+    if route == "index":
+        return "GET", "/", None
+    if route == "daily_flash":
+        return "GET", "/api/daily_flash", None
+    if route == "recommend":
+        return "POST", "/api/recommend", {"user_id": user["user_id"], "interests": user["interests"]}
+    if route == "log_action":
+        idx = rng.randrange(1_000_000)
+        return "POST", "/api/log_action", {
+            "user_id": user["user_id"],
+            "url": f"https://example.com/loadtest/{idx}",
+            "title": f"压测文章 {idx}",
+            "action": "like",
+        }
+    raise ValueError(f"未知路由: {route}")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def drive(
+    port: int,
+    users: List[Dict],
+    mix: List[Tuple[str, int]],
+    concurrency: int,
+    duration: float,
+    seed_value: int,
+) -> Dict:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(seed_value + worker_id)
+        local_latency: Dict[str, List[float]] = defaultdict(list)
+        local_errors: Dict[str, int] = defaultdict(int)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while time.perf_counter() < deadline:
+            route = rng.choices(names, weights)[0]
+            method, path, body = _build_request(route, users, rng)
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                ok = False
+            local_latency[route].append(time.perf_counter() - started)
+            if not ok:
+                local_errors[route] += 1
+        conn.close()
+        with lock:
+            for route, values in local_latency.items():
+                latencies[route].extend(values)
+            for route, count in local_errors.items():
+                errors[route] += count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route in names:
+        values = sorted(latencies.get(route, []))
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors.get(route, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+            "p50_ms": round(1000 * _percentile(values, 50), 2),
+            "p95_ms": round(1000 * _percentile(values, 95), 2),
+            "p99_ms": round(1000 * _percentile(values, 99), 2),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 2),
+        "routes": routes,
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> Dict:
+    """
+    对比两次结果，输出各路由 rps 与 p50/p95/p99 的变化百分比（正数表示增加）。
+    """
+    diff = {}
+    for route, stats in current["results"]["routes"].items():
+        base = baseline.get("results", {}).get("routes", {}).get(route)
+        if not base:
+            continue
+        diff[route] = {
+            key: round(100 * (stats[key] - base[key]) / base[key], 1) if base[key] else None
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return diff
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="施压时长（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="假 LLM 单次响应延迟（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="路由权重，如 recommend=3,log_action=4")
+    parser.add_argument("--mongo-uri", default=None, help="使用本地 mongod 替代 mongomock")
+    parser.add_argument("--snapshot", default=None, help="从快照目录导入文章，替代 --articles 合成数据")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="结果 JSON 输出路径")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    llm = start_fake_llm(args.llm_latency)
+    configure_environment(workdir, llm.server_port)
+    install_standins(workdir, args.mongo_uri)
+    users = seed(args.users, args.articles, random.Random(args.seed), args.snapshot)
+    httpd, port = start_app()
+
+    report = {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "users", "articles", "snapshot", "concurrency", "duration", "llm_latency", "mix"
+            )
+        },
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+        "results": drive(port, users, _parse_mix(args.mix), args.concurrency, args.duration, args.seed),
+    }
+    failed = {
+        route: stats["errors"]
+        for route, stats in report["results"]["routes"].items()
+        if stats["errors"]
+    }
+    report["ok"] = not failed
+    if failed:
+        report["failed_routes"] = failed
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            report["delta_pct"] = compare(report, json.load(fh))
+
+    httpd.shutdown()
+    llm.shutdown()
+    from log_buffer import get_user_log_buffer
+
+    get_user_log_buffer().flush()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(output + "\n")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,3 +33,112 @@ USER_AGENT = os.getenv(
     ),
 )
 
+
+# User Log Buffer Config
+USER_LOG_BATCH_SIZE = int(os.getenv("USER_LOG_BATCH_SIZE", "200"))
+USER_LOG_FLUSH_INTERVAL = float(os.getenv("USER_LOG_FLUSH_INTERVAL", "1.0"))
+USER_LOG_QUEUE_SIZE = int(os.getenv("USER_LOG_QUEUE_SIZE", "10000"))
+USER_LOG_SPILL_PATH = os.getenv(
+    "USER_LOG_SPILL_PATH", os.path.join("data", "user_logs.spill.jsonl")
+)
+# 落盘文件由同机所有 Web 进程共享（文件锁互斥）；后台线程按此间隔检查并回放，包括崩溃进程遗留的文件
+USER_LOG_REPLAY_INTERVAL = float(os.getenv("USER_LOG_REPLAY_INTERVAL", "30"))
+
+# HTTP Cache Config
+# 置 0 时关闭压缩、ETag 与静态资源指纹，等价于改造前的 HTTP 行为（供 benchmarks/bench_http.py 对照）
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1") == "1"
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "512"))
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+# Metrics Config
+# /metrics 的访问令牌（Bearer）；留空时只允许本机回环地址访问。经反向代理部署时须配置令牌
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Profiler Config
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_CRAWL = os.getenv("PROFILE_CRAWL", "0") == "1"
+
+# User Affinity Config
+AFFINITY_HALF_LIFE_DAYS = float(os.getenv("AFFINITY_HALF_LIFE_DAYS", "14"))
+AFFINITY_BATCH_SIZE = int(os.getenv("AFFINITY_BATCH_SIZE", "1000"))
+AFFINITY_INTERVAL = float(os.getenv("AFFINITY_INTERVAL", "60"))
+# 只汇总早于该秒数的日志，给并发刷写中乱序提交的 log_id 留出时间
+AFFINITY_LAG_SECONDS = float(os.getenv("AFFINITY_LAG_SECONDS", "60"))
+USER_LOG_RETENTION_DAYS = int(os.getenv("USER_LOG_RETENTION_DAYS", "90"))
+
+# Article Retention Config
+ARTICLE_HOT_DAYS = int(os.getenv("ARTICLE_HOT_DAYS", "30"))
+ARTICLE_ARCHIVE_MODE = os.getenv("ARTICLE_ARCHIVE_MODE", "collection")  # collection | file
+ARTICLE_ARCHIVE_DIR = os.getenv("ARTICLE_ARCHIVE_DIR", os.path.join("data", "archive"))
+ARTICLE_ARCHIVE_BATCH = int(os.getenv("ARTICLE_ARCHIVE_BATCH", "1000"))
+
+# Search Config
+SEARCH_REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL", "1.0"))
+# TTL 索引删除不会通知应用，定期全量重建以剔除已过期文章
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", "3600"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+# 增量拉取时向前多取的秒数：并发写入中变更时间较早、提交较晚的文章不会被跳过（按 URL 去重）
+SEARCH_DELTA_OVERLAP = float(os.getenv("SEARCH_DELTA_OVERLAP", "10"))
+
+# Image Proxy Config
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join("data", "thumbs"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "5"))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_BYTES", str(15 * 1024 * 1024)))
+# 卡片头图为 400x180（见 style.css），800 供高分屏使用
+IMAGE_THUMB_WIDTHS = tuple(
+    int(width) for width in os.getenv("IMAGE_THUMB_WIDTHS", "400,800").split(",") if width
+)
+IMAGE_THUMB_RATIO = float(os.getenv("IMAGE_THUMB_RATIO", "0.45"))
+IMAGE_THUMB_QUALITY = int(os.getenv("IMAGE_THUMB_QUALITY", "80"))
+# 默认拒绝代理内网/回环地址，防止被用作 SSRF 跳板；本地测试源站时设为 1
+IMAGE_PROXY_ALLOW_PRIVATE = os.getenv("IMAGE_PROXY_ALLOW_PRIVATE", "0") == "1"
+# 回源失败（含非文章头图）的结果在进程内缓存的秒数，期间同一地址直接返回占位图
+IMAGE_FAILURE_TTL = float(os.getenv("IMAGE_FAILURE_TTL", "300"))
+
+# Crawler Config
+# 抓取 GitHub/HN 使用的 HTTP 代理，设为空字符串则直连
+CRAWLER_PROXY = os.getenv("CRAWLER_PROXY", "http://127.0.0.1:7897")
+GITHUB_BASE_URL = os.getenv("GITHUB_BASE_URL", "https://github.com").rstrip("/")
+HACKER_NEWS_API = os.getenv("HACKER_NEWS_API", "https://hacker-news.firebaseio.com/v0").rstrip("/")
+CRAWL_REQUEST_DELAY = float(os.getenv("CRAWL_REQUEST_DELAY", "1.0"))
+
+# Crawl Queue Config
+CRAWL_LEASE_SECONDS = float(os.getenv("CRAWL_LEASE_SECONDS", "60"))
+CRAWL_MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", "3"))
+CRAWL_POLL_INTERVAL = float(os.getenv("CRAWL_POLL_INTERVAL", "1.0"))
+CRAWL_HN_BATCH = int(os.getenv("CRAWL_HN_BATCH", "5"))
+CRAWL_IMAGE_BATCH = int(os.getenv("CRAWL_IMAGE_BATCH", "5"))
+# 已完成/失败的任务保留天数，到期由 Mongo TTL 索引按 finished_at 删除
+CRAWL_JOB_TTL_DAYS = int(os.getenv("CRAWL_JOB_TTL_DAYS", "7"))
+
+# Article Events Config
+# 新文章事件写入固定大小的 capped 集合，写满后自动覆盖最旧事件
+ARTICLE_EVENTS_CAP_BYTES = int(os.getenv("ARTICLE_EVENTS_CAP_BYTES", str(4 * 1024 * 1024)))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1.0"))
+EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "500"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_REPLAY_LIMIT = int(os.getenv("EVENTS_REPLAY_LIMIT", "50"))
+
+# Article Enrichment Config
+# 抓取后为新文章批量生成摘要/主题标签/点评；未配置 LLM 时自动跳过
+ENRICH_ENABLED = os.getenv("ENRICH_ENABLED", "1") == "1"
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "8"))
+ENRICH_MAX_TAGS = int(os.getenv("ENRICH_MAX_TAGS", "3"))
+
+# Streamlit Config
+STREAMLIT_USER_CACHE_TTL = int(os.getenv("STREAMLIT_USER_CACHE_TTL", "60"))
+STREAMLIT_RECOMMEND_CACHE_TTL = int(os.getenv("STREAMLIT_RECOMMEND_CACHE_TTL", "600"))
+STREAMLIT_PROGRESS_INTERVAL = float(os.getenv("STREAMLIT_PROGRESS_INTERVAL", "2"))
+
+# Article Snapshot Config
+# 快照导出按 SNAPSHOT_CHUNK_SIZE 篇切分为 gzip JSONL 分片；导入时每 SNAPSHOT_BATCH_SIZE 篇一次 bulk_write
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join("data", "snapshots"))
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "20000"))
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1000"))
+SNAPSHOT_IMPORT_WORKERS = int(os.getenv("SNAPSHOT_IMPORT_WORKERS", "4"))
@@ -0,0 +1,274 @@
+"""
+基于 Mongo 的爬虫任务队列：租约 + 心跳 + 重试 + 幂等完成。
+
+任务文档（集合 `crawl_jobs`）：
+- `_id`：由调用方给出的确定性键，重复入队只会保留第一份（$setOnInsert）；
+- `status`：pending → leased → done / failed；进入终态时写入 `finished_at`，
+  保留 CRAWL_JOB_TTL_DAYS 天后由 TTL 索引自动删除；
+- `available_at`：pending 任务的可执行时间（重试退避），leased 任务的租约到期时间。
+  两者共用一个字段，领取时只需一次 `status + available_at` 的索引范围查询：
+  租约过期的任务会被其他 worker 重新领取，不需要单独的回收流程。
+
+worker 只有在仍持有租约时才能把任务标为完成；失去租约的 worker 写入的结果会被忽略，
+任务处理函数本身也要求是幂等的（按 URL upsert），因此任务至多被有效执行一次。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from config import (
+    CRAWL_JOB_TTL_DAYS,
+    CRAWL_LEASE_SECONDS,
+    CRAWL_MAX_ATTEMPTS,
+    CRAWL_POLL_INTERVAL,
+)
+from database import get_mongo_database
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_COLLECTION = "crawl_jobs"
+FINISHED_TTL_INDEX = "ttl_finished_at"
+
+CRAWL_JOBS = REGISTRY.counter(
+    "crawl_jobs_total", "爬虫队列任务按类型与结果统计的次数。", ["kind", "result"]
+)
+CRAWL_JOB_SECONDS = REGISTRY.histogram(
+    "crawl_job_duration_seconds", "爬虫队列单个任务的处理耗时。", ["kind"]
+)
+
+JobHandler = Callable[[Dict, "CrawlQueue"], int]
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class CrawlQueue:
+    def __init__(
+        self,
+        lease_seconds: float = CRAWL_LEASE_SECONDS,
+        max_attempts: int = CRAWL_MAX_ATTEMPTS,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.collection = get_mongo_database("tech_crawler")[QUEUE_COLLECTION]
+
+    def ensure_indexes(self, ttl_days: int = CRAWL_JOB_TTL_DAYS):
+        self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        self.collection.create_index([("run_id", ASCENDING), ("status", ASCENDING)])
+        # 只有终态任务带 finished_at，pending/leased 任务不会被 TTL 删除
+        seconds = ttl_days * 24 * 3600
+        try:
+            self.collection.create_index(
+                "finished_at", name=FINISHED_TTL_INDEX, expireAfterSeconds=seconds
+            )
+        except OperationFailure:
+            # 保留天数变化时 create_index 会冲突，改用 collMod 原地修改
+            self.collection.database.command(
+                "collMod",
+                QUEUE_COLLECTION,
+                index={"name": FINISHED_TTL_INDEX, "expireAfterSeconds": seconds},
+            )
+
+    def enqueue(self, key: str, kind: str, payload: Dict, run_id: str = "") -> bool:
+        """
+        入队一个任务，返回是否为新任务；同一 `key` 重复入队不会产生第二份。
+        """
+        now = datetime.utcnow()
+        try:
+            result = self.collection.update_one(
+                {"_id": key},
+                {
+                    "$setOnInsert": {
+                        "kind": kind,
+                        "payload": payload,
+                        "run_id": run_id,
+                        "status": "pending",
+                        "attempts": 0,
+                        "available_at": now,
+                        "created_at": now,
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return result.upserted_id is not None
+
+    def enqueue_many(self, jobs: Iterable[Dict], run_id: str = "") -> int:
+        return sum(
+            self.enqueue(job["key"], job["kind"], job["payload"], run_id) for job in jobs
+        )
+
+    def lease(self, owner: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        now = datetime.utcnow()
+        self._fail_exhausted(now)
+        query: Dict = {
+            "status": {"$in": ["pending", "leased"]},
+            "available_at": {"$lte": now},
+            "attempts": {"$lt": self.max_attempts},
+        }
+        if kinds:
+            query["kind"] = {"$in": kinds}
+        return self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "leased",
+                    "lease_owner": owner,
+                    "available_at": now + timedelta(seconds=self.lease_seconds),
+                    "leased_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _fail_exhausted(self, now: datetime):
+        # 租约过期且重试次数用尽的任务不会再被领取，直接标记失败
+        self.collection.update_many(
+            {
+                "status": "leased",
+                "available_at": {"$lte": now},
+                "attempts": {"$gte": self.max_attempts},
+            },
+            {"$set": {"status": "failed", "last_error": "lease expired", "finished_at": now}},
+        )
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        """
+        续租；返回 False 表示租约已被他人接管。
+        """
+        result = self.collection.update_one(
+            {"_id": job_id, "status": "leased", "lease_owner": owner},
+            {
+                "$set": {
+                    "available_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                }
+            },
+        )
+        return result.modified_count == 1
+
+    def complete(self, job_id: str, owner: str, result_count: int = 0) -> bool:
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {"_id": job_id, "status": "leased", "lease_owner": owner},
+            {"$set": {"status": "done", "result_count": result_count, "finished_at": now}},
+        )
+        return result.modified_count == 1
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        """
+        记录失败；未用尽重试次数时按指数退避重新排队。
+        """
+        job = self.collection.find_one({"_id": job_id, "lease_owner": owner, "status": "leased"})
+        if job is None:
+            return False
+        now = datetime.utcnow()
+        if job.get("attempts", 0) >= self.max_attempts:
+            update = {"status": "failed", "last_error": error[:500], "finished_at": now}
+        else:
+            backoff = min(2 ** job.get("attempts", 0), 60)
+            update = {
+                "status": "pending",
+                "last_error": error[:500],
+                "available_at": now + timedelta(seconds=backoff),
+            }
+        result = self.collection.update_one(
+            {"_id": job_id, "lease_owner": owner, "status": "leased"}, {"$set": update}
+        )
+        return result.modified_count == 1
+
+    def stats(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        match = {"run_id": run_id} if run_id is not None else {}
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for row in self.collection.aggregate(
+            [{"$match": match}, {"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        ):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def is_drained(self, run_id: Optional[str] = None) -> bool:
+        stats = self.stats(run_id)
+        return stats["pending"] == 0 and stats["leased"] == 0
+
+
+class _Heartbeat:
+    def __init__(self, queue: CrawlQueue, job_id: str, owner: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="crawl-heartbeat", daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(self.job_id, self.owner):
+                self.lost = True
+                logger.warning("任务 %s 的租约已丢失", self.job_id)
+                return
+
+
+def run_worker(
+    handlers: Dict[str, JobHandler],
+    queue: Optional[CrawlQueue] = None,
+    owner: Optional[str] = None,
+    idle_exit: Optional[float] = None,
+    poll_interval: float = CRAWL_POLL_INTERVAL,
+) -> int:
+    """
+    循环领取并执行任务，返回成功完成的任务数。
+
+    `idle_exit` 不为 None 时，队列中已没有待执行/执行中任务且空闲超过该秒数后退出。
+    """
+    queue = queue or CrawlQueue()
+    owner = owner or worker_id()
+    completed = 0
+    idle_since: Optional[float] = None
+    while True:
+        job = queue.lease(owner, kinds=list(handlers))
+        if job is None:
+            if idle_exit is not None:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= idle_exit and queue.is_drained():
+                    return completed
+            time.sleep(poll_interval)
+            continue
+        idle_since = None
+        kind = job["kind"]
+        started = time.perf_counter()
+        try:
+            with _Heartbeat(queue, job["_id"], owner) as heartbeat:
+                result_count = handlers[kind](job["payload"], queue)
+        except Exception as exc:
+            logger.error("任务 %s 执行失败: %s", job["_id"], exc)
+            queue.fail(job["_id"], owner, f"{type(exc).__name__}: {exc}")
+            CRAWL_JOBS.inc(kind=kind, result="error")
+            continue
+        CRAWL_JOB_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        if heartbeat.lost or not queue.complete(job["_id"], owner, result_count):
+            CRAWL_JOBS.inc(kind=kind, result="lease_lost")
+            continue
+        CRAWL_JOBS.inc(kind=kind, result="done")
+        completed += 1
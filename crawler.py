@@ -1,44 +1,55 @@
 """
 混合动力爬虫：掘金(Selenium) + GitHub/HN(Requests)
+
+两种运行方式：
+- `python crawler.py`：单进程按顺序抓取全部资讯源（原有行为）；
+- `python crawler.py --enqueue` + 任意台机器上的 `python crawler.py --worker`：把一轮抓取拆成
+  掘金分类 / GitHub 榜单 / HN 条目批次 / 头图解析批次 / LLM 富化批次等细粒度任务放入 Mongo 租约队列，由多个 worker 分担。
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
 import logging
 import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence
 
 import requests
 from bs4 import BeautifulSoup
 
-# Selenium 相关模块
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-
-from config import USER_AGENT
+from config import (
+    CRAWL_HN_BATCH,
+    CRAWL_IMAGE_BATCH,
+    CRAWL_REQUEST_DELAY,
+    CRAWLER_PROXY,
+    ENRICH_BATCH_SIZE,
+    ENRICH_ENABLED,
+    GITHUB_BASE_URL,
+    USER_AGENT,
+)
+from crawl_queue import CrawlQueue, run_worker
 from database import get_mongo_database
+from enrichment import enrich_articles
+from events import publish_new_articles
+from llm import is_llm_configured
+from metrics import CRAWL_ITEMS, CRAWL_LAST_ITEMS, CRAWL_SOURCE_SECONDS
+from models import ARTICLE_PROJECTION, CHANGED_AT_FIELD, Article, decode_articles
+from pool_meta import bump_pool_version
+from profiler import maybe_profile_crawl
+from retention import archive_cold_articles
+from search import index_articles
+from sources import (
+    GITHUB_TRENDING_URLS,
+    HACKER_NEWS_TOP,
+    JUEJIN_URLS,
+    github_label_tag,
+    hacker_news_item_url,
+)
+from thumbnails import PLACEHOLDER_PREFIX, placeholder_path
 
 logger = logging.getLogger(__name__)
 
-# 掘金网页版分类地址
-JUEJIN_URLS = {
-    "后端": "https://juejin.cn/backend",
-    "前端": "https://juejin.cn/frontend",
-    "AI": "https://juejin.cn/ai",
-    "Android": "https://juejin.cn/android",
-}
-
-GITHUB_TRENDING_URLS = {
-    "all": "https://github.com/trending",
-    "python": "https://github.com/trending/python",
-    "java": "https://github.com/trending/java",
-    "javascript": "https://github.com/trending/javascript",
-}
-HACKER_NEWS_TOP = "https://hacker-news.firebaseio.com/v0/topstories.json"
-
 
 def _get_collection():
     return get_mongo_database("tech_crawler")["articles"]
@@ -48,26 +59,16 @@ def _session() -> requests.Session:
     session = requests.Session()
     session.headers.update({"User-Agent": USER_AGENT})
 
-    my_proxy_port = 7897
-
-    proxies = {
-        "http": f"http://127.0.0.1:{my_proxy_port}",
-        "https": f"http://127.0.0.1:{my_proxy_port}",
-    }
-
     # 挂载代理
-    session.proxies.update(proxies)
+    if CRAWLER_PROXY:
+        session.proxies.update({"http": CRAWLER_PROXY, "https": CRAWLER_PROXY})
 
     return session
 
 
-def _sanitize_seed(seed: str) -> str:
-    cleaned = "".join(ch if ch.isalnum() else "-" for ch in seed)
-    return cleaned or "tech"
-
-
 def _placeholder_image(seed: str) -> str:
-    return f"https://picsum.photos/seed/{_sanitize_seed(seed)}/800/400"
+    # 本地生成的 SVG 占位图，不再依赖外部图床
+    return placeholder_path(seed)
 
 
 def _resolve_top_image(url: Optional[str], session: requests.Session, seed: str) -> str:
@@ -92,8 +93,17 @@ def _resolve_top_image(url: Optional[str], session: requests.Session, seed: str)
 # ==========================================
 # 核心修改：使用 Selenium 爬取掘金
 # ==========================================
-def crawl_juejin_selenium(limit_per_category: int = 15) -> List[Dict]:
-    payloads: List[Dict] = []
+def crawl_juejin_selenium(
+    limit_per_category: int = 15, categories: Optional[Sequence[str]] = None
+) -> List[Article]:
+    # Selenium 相关模块较重，只在真正爬掘金时加载
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.common.by import By
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    payloads: List[Article] = []
 
     # 配置 Chrome 选项
     chrome_options = Options()
@@ -110,7 +120,8 @@ def crawl_juejin_selenium(limit_per_category: int = 15) -> List[Dict]:
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.set_page_load_timeout(15)
 
-        for category_name, url in JUEJIN_URLS.items():
+        for category_name in categories or list(JUEJIN_URLS):
+            url = JUEJIN_URLS[category_name]
             logger.info(f"正在打开掘金【{category_name}】页面: {url}")
             try:
                 driver.get(url)
@@ -156,15 +167,15 @@ def crawl_juejin_selenium(limit_per_category: int = 15) -> List[Dict]:
                         if not title or not link:
                             continue
 
-                        payloads.append({
-                            "title": title,
-                            "url": link,
-                            "summary": summary[:300],
-                            "source": "juejin",
-                            "tags": [category_name],
-                            "top_image": cover if cover else _placeholder_image(title),
-                            "publish_date": datetime.utcnow().isoformat()
-                        })
+                        payloads.append(Article(
+                            title=title,
+                            url=link,
+                            summary=summary[:300],
+                            source="juejin",
+                            tags=(category_name,),
+                            top_image=cover if cover else _placeholder_image(title),
+                            publish_date=datetime.utcnow().isoformat()
+                        ))
                         count += 1
 
                     except Exception as e:
@@ -183,10 +194,19 @@ def crawl_juejin_selenium(limit_per_category: int = 15) -> List[Dict]:
     return payloads
 
 
-def crawl_github_trending(session: requests.Session, per_page: int = 10) -> List[Dict]:
-    payloads: List[Dict] = []
-    for label, url in GITHUB_TRENDING_URLS.items():
-        time.sleep(1)
+def crawl_github_trending(
+    session: requests.Session,
+    per_page: int = 10,
+    labels: Optional[Sequence[str]] = None,
+    resolve_images: bool = True,
+) -> List[Article]:
+    """
+    `resolve_images=False` 时头图先用占位图，由队列中的头图解析任务稍后补齐。
+    """
+    payloads: List[Article] = []
+    for label in labels or list(GITHUB_TRENDING_URLS):
+        url = GITHUB_TRENDING_URLS[label]
+        time.sleep(CRAWL_REQUEST_DELAY)
         try:
             resp = session.get(url, timeout=10)
             resp.raise_for_status()
@@ -202,34 +222,45 @@ def crawl_github_trending(session: requests.Session, per_page: int = 10) -> List
                 continue
             repo_path = link.get("href", "").strip()
             title = link.get_text(strip=True)
-            repo_url = f"https://github.com{repo_path}"
+            repo_url = f"{GITHUB_BASE_URL}{repo_path}"
             description = desc.get_text(strip=True) if desc else ""
             tags = ["GitHub Trending"]
             if label != "all":
-                tags.append(label.capitalize())
+                tags.append(github_label_tag(label))
             payloads.append(
-                {
-                    "title": title,
-                    "url": repo_url,
-                    "summary": description,
-                    "source": "github",
-                    "tags": tags,
-                    "top_image": _resolve_top_image(repo_url, session, repo_path or title),
-                    "publish_date": datetime.utcnow().isoformat(),
-                }
+                Article(
+                    title=title,
+                    url=repo_url,
+                    summary=description,
+                    source="github",
+                    tags=tuple(tags),
+                    top_image=_resolve_top_image(repo_url, session, repo_path or title)
+                    if resolve_images
+                    else _placeholder_image(repo_path or title),
+                    publish_date=datetime.utcnow().isoformat(),
+                )
             )
     return payloads
 
 
-def crawl_hacker_news(session: requests.Session, limit: int = 20) -> List[Dict]:
-    payloads: List[Dict] = []
+def fetch_hacker_news_ids(session: requests.Session, limit: int = 20) -> List[int]:
     try:
-        ids = session.get(HACKER_NEWS_TOP, timeout=10).json()[:limit]
+        return session.get(HACKER_NEWS_TOP, timeout=10).json()[:limit]
     except Exception as exc:
         logger.error("获取 Hacker News ID 失败: %s", exc)
-        return payloads
+        return []
+
+
+def crawl_hacker_news(session: requests.Session, limit: int = 20) -> List[Article]:
+    return crawl_hacker_news_items(session, fetch_hacker_news_ids(session, limit))
+
+
+def crawl_hacker_news_items(
+    session: requests.Session, ids: Sequence[int], resolve_images: bool = True
+) -> List[Article]:
+    payloads: List[Article] = []
     for story_id in ids:
-        detail_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
+        detail_url = hacker_news_item_url(story_id)
         try:
             detail = session.get(detail_url, timeout=5).json()
         except Exception as exc:
@@ -239,31 +270,77 @@ def crawl_hacker_news(session: requests.Session, limit: int = 20) -> List[Dict]:
             continue
         story_url = detail["url"]
         payloads.append(
-            {
-                "title": detail.get("title", "Hacker News Story"),
-                "url": story_url,
-                "summary": "",
-                "source": "hackernews",
-                "tags": ["Hacker News"],
-                "top_image": _resolve_top_image(story_url, session, str(story_id)),
-                "publish_date": datetime.fromtimestamp(detail.get("time", 0)).isoformat()
+            Article(
+                title=detail.get("title", "Hacker News Story"),
+                url=story_url,
+                summary="",
+                source="hackernews",
+                tags=("Hacker News",),
+                top_image=_resolve_top_image(story_url, session, str(story_id))
+                if resolve_images
+                else _placeholder_image(str(story_id)),
+                publish_date=datetime.fromtimestamp(detail.get("time", 0)).isoformat()
                 if detail.get("time")
                 else None,
-            }
+            )
         )
     return payloads
 
 
-def _upsert_articles(payloads: List[Dict]):
+def _upsert_articles(payloads: List[Article], keep_existing_images: bool = False) -> List[Article]:
+    """
+    写入文章并返回其中新插入的部分。
+
+    `keep_existing_images=True` 时头图只在新文章上写入，已解析过的头图不会被占位图覆盖。
+    """
     if not payloads:
-        return
+        return []
     collection = _get_collection()
-    for doc in payloads:
-        doc["updated_at"] = datetime.utcnow()
-        collection.update_one({"url": doc["url"]}, {"$set": doc}, upsert=True)
+    stamped = []
+    inserted = []
+    for article in payloads:
+        article = article._replace(updated_at=datetime.utcnow())
+        query, update = article.to_upsert(keep_existing_images)
+        result = collection.update_one(query, update, upsert=True)
+        stamped.append(article)
+        if result.upserted_id is not None:
+            inserted.append(article)
+    bump_pool_version(len(payloads))
+    try:
+        index_articles(stamped)
+    except Exception as exc:
+        # 文章已入库；本进程索引下次刷新时会从 Mongo 补齐，不能让队列任务因此整体重试
+        logger.error("更新本进程搜索索引失败: %s", exc)
+    try:
+        publish_new_articles(inserted)
+    except Exception as exc:
+        # 推送只是锦上添花，失败不影响入库
+        logger.error("发布新文章事件失败: %s", exc)
+    return inserted
+
+
+def _run_source(source: str, crawl: Callable[[], List[Article]]) -> List[Article]:
+    with CRAWL_SOURCE_SECONDS.time(source=source):
+        items = crawl()
+    CRAWL_ITEMS.inc(len(items), source=source)
+    CRAWL_LAST_ITEMS.set(len(items), source=source)
+    return items
+
 
+# 进度回调：(阶段说明, 已完成阶段数, 总阶段数)
+ProgressCallback = Callable[[str, int, int], None]
+_CRAWL_STAGES = 6
 
-def run_crawlers():
+
+def run_crawlers(progress: Optional[ProgressCallback] = None) -> int:
+    """
+    单进程抓取全部资讯源，返回本轮抓取的文章数；`progress` 在每个阶段开始时被调用。
+    """
+    with maybe_profile_crawl():
+        return _run_all_sources(progress or (lambda stage, done, total: None))
+
+
+def _run_all_sources(progress: ProgressCallback) -> int:
     session = _session()
     sources = []
 
@@ -271,23 +348,225 @@ def run_crawlers():
 
     # 1. 启动 Selenium 爬掘金
     logger.info("正在启动 Selenium 爬取掘金 (可能需要几秒钟启动浏览器)...")
-    sources.extend(crawl_juejin_selenium())
+    progress("抓取掘金", 0, _CRAWL_STAGES)
+    sources.extend(_run_source("juejin", crawl_juejin_selenium))
 
     # 2. 启动 Requests 爬 GitHub
     logger.info("正在爬取 GitHub Trending...")
-    sources.extend(crawl_github_trending(session))
+    progress("抓取 GitHub Trending", 1, _CRAWL_STAGES)
+    sources.extend(_run_source("github", lambda: crawl_github_trending(session)))
 
     # 3. 启动 Requests 爬 Hacker News
     logger.info("正在爬取 Hacker News...")
-    sources.extend(crawl_hacker_news(session))
+    progress("抓取 Hacker News", 2, _CRAWL_STAGES)
+    sources.extend(_run_source("hackernews", lambda: crawl_hacker_news(session)))
 
     if not sources:
         logger.warning("❌ 本轮未抓取到任何数据！")
-        return
-    _upsert_articles(sources)
+        progress("未抓取到数据", _CRAWL_STAGES, _CRAWL_STAGES)
+        return 0
+    progress("写入文章库", 3, _CRAWL_STAGES)
+    inserted = _upsert_articles(sources)
     logger.info("✅ 爬虫任务全部结束，共处理 %d 条记录。", len(sources))
+    progress("AI 富化新文章", 4, _CRAWL_STAGES)
+    try:
+        enriched = enrich_articles(inserted)
+        if enriched:
+            logger.info("已富化 %d 篇新文章。", enriched)
+    except Exception as exc:
+        logger.error("文章富化失败: %s", exc)
+    progress("归档冷文章", 5, _CRAWL_STAGES)
+    try:
+        archive_cold_articles()
+    except Exception as exc:
+        logger.error("冷文章归档失败: %s", exc)
+    progress("完成", _CRAWL_STAGES, _CRAWL_STAGES)
+    return len(sources)
+
+
+# ==========================================
+# 分布式模式：Mongo 租约队列上的细粒度任务
+# ==========================================
+def _job_key(run_id: str, kind: str, *parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"{run_id}:{kind}:{digest[:12]}"
+
+
+def enqueue_crawl_run(
+    queue: Optional[CrawlQueue] = None,
+    run_id: Optional[str] = None,
+    sources: Sequence[str] = ("juejin", "github", "hackernews"),
+    hn_limit: int = 20,
+) -> str:
+    """
+    把一轮抓取拆成根任务入队，返回本轮 run_id；HN 条目与头图解析任务由根任务执行时再派生。
+    每轮另有一个冷文章归档任务，与单进程模式一样随抓取周期执行。
+    """
+    queue = queue or CrawlQueue()
+    queue.ensure_indexes()
+    run_id = run_id or datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    jobs = []
+    if "juejin" in sources:
+        jobs.extend(("juejin", {"category": name}) for name in JUEJIN_URLS)
+    if "github" in sources:
+        jobs.extend(("github", {"label": label}) for label in GITHUB_TRENDING_URLS)
+    if "hackernews" in sources:
+        jobs.append(("hn_top", {"limit": hn_limit}))
+    jobs.append(("archive", {}))
+    created = queue.enqueue_many(
+        (
+            {
+                "key": _job_key(run_id, kind, *payload.values()),
+                "kind": kind,
+                "payload": {**payload, "run_id": run_id},
+            }
+            for kind, payload in jobs
+        ),
+        run_id,
+    )
+    logger.info("已入队抓取任务 %s：%d 个根任务", run_id, created)
+    return run_id
+
+
+def _enqueue_image_jobs(queue: CrawlQueue, run_id: str, articles: List[Article]):
+    """
+    只为库中仍是占位图的文章派生头图解析任务，已解析过的文章不会被重复抓取。
+    """
+    pending = [
+        doc["url"]
+        for doc in _get_collection().find(
+            {"url": {"$in": [article.url for article in articles]}},
+            {"_id": 0, "url": 1, "top_image": 1},
+        )
+        if not doc.get("top_image") or doc["top_image"].startswith(PLACEHOLDER_PREFIX)
+    ]
+    for start in range(0, len(pending), CRAWL_IMAGE_BATCH):
+        batch = pending[start : start + CRAWL_IMAGE_BATCH]
+        queue.enqueue(
+            _job_key(run_id, "images", *batch),
+            "images",
+            {"run_id": run_id, "urls": batch},
+            run_id,
+        )
+
+
+def _enqueue_enrich_jobs(queue: CrawlQueue, run_id: str, inserted: List[Article]):
+    if not (ENRICH_ENABLED and is_llm_configured()):
+        return
+    urls = [article.url for article in inserted]
+    for start in range(0, len(urls), ENRICH_BATCH_SIZE):
+        batch = urls[start : start + ENRICH_BATCH_SIZE]
+        queue.enqueue(
+            _job_key(run_id, "enrich", *batch),
+            "enrich",
+            {"run_id": run_id, "urls": batch},
+            run_id,
+        )
+
+
+def _handle_juejin(payload: Dict, queue: CrawlQueue) -> int:
+    items = crawl_juejin_selenium(categories=[payload["category"]])
+    inserted = _upsert_articles(items)
+    CRAWL_ITEMS.inc(len(items), source="juejin")
+    _enqueue_enrich_jobs(queue, payload["run_id"], inserted)
+    return len(items)
+
+
+def _handle_github(payload: Dict, queue: CrawlQueue) -> int:
+    items = crawl_github_trending(_session(), labels=[payload["label"]], resolve_images=False)
+    inserted = _upsert_articles(items, keep_existing_images=True)
+    CRAWL_ITEMS.inc(len(items), source="github")
+    _enqueue_image_jobs(queue, payload["run_id"], items)
+    _enqueue_enrich_jobs(queue, payload["run_id"], inserted)
+    return len(items)
+
+
+def _handle_hn_top(payload: Dict, queue: CrawlQueue) -> int:
+    run_id = payload["run_id"]
+    ids = fetch_hacker_news_ids(_session(), payload.get("limit", 20))
+    for start in range(0, len(ids), CRAWL_HN_BATCH):
+        batch = ids[start : start + CRAWL_HN_BATCH]
+        queue.enqueue(
+            _job_key(run_id, "hn_items", *batch),
+            "hn_items",
+            {"run_id": run_id, "ids": batch},
+            run_id,
+        )
+    return len(ids)
+
+
+def _handle_hn_items(payload: Dict, queue: CrawlQueue) -> int:
+    items = crawl_hacker_news_items(_session(), payload["ids"], resolve_images=False)
+    inserted = _upsert_articles(items, keep_existing_images=True)
+    CRAWL_ITEMS.inc(len(items), source="hackernews")
+    _enqueue_image_jobs(queue, payload["run_id"], items)
+    _enqueue_enrich_jobs(queue, payload["run_id"], inserted)
+    return len(items)
+
+
+def _handle_images(payload: Dict, queue: CrawlQueue) -> int:
+    session = _session()
+    collection = _get_collection()
+    resolved = 0
+    for url in payload["urls"]:
+        image = _resolve_top_image(url, session, url)
+        # 解析失败时保留库中已有的占位图
+        if image.startswith(PLACEHOLDER_PREFIX):
+            continue
+        collection.update_one(
+            {"url": url},
+            {"$set": {"top_image": image}, "$currentDate": {CHANGED_AT_FIELD: True}},
+        )
+        resolved += 1
+    if resolved:
+        bump_pool_version(resolved)
+    return resolved
+
+
+def _handle_enrich(payload: Dict, queue: CrawlQueue) -> int:
+    articles = decode_articles(
+        _get_collection().find(
+            {"url": {"$in": payload["urls"]}}, dict(ARTICLE_PROJECTION)
+        )
+    )
+    return enrich_articles(articles)
+
+
+def _handle_archive(payload: Dict, queue: CrawlQueue) -> int:
+    return archive_cold_articles()
+
+
+JOB_HANDLERS = {
+    "juejin": _handle_juejin,
+    "github": _handle_github,
+    "hn_top": _handle_hn_top,
+    "hn_items": _handle_hn_items,
+    "images": _handle_images,
+    "enrich": _handle_enrich,
+    "archive": _handle_archive,
+}
+
+
+def run_crawl_worker(
+    kinds: Optional[Sequence[str]] = None, idle_exit: Optional[float] = None
+) -> int:
+    handlers = {kind: JOB_HANDLERS[kind] for kind in (kinds or JOB_HANDLERS)}
+    return run_worker(handlers, idle_exit=idle_exit)
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    run_crawlers()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="资讯爬虫")
+    parser.add_argument("--enqueue", action="store_true", help="把一轮抓取拆分为任务放入队列")
+    parser.add_argument("--worker", action="store_true", help="作为队列 worker 运行")
+    parser.add_argument(
+        "--kinds", nargs="*", choices=sorted(JOB_HANDLERS), help="只处理这些任务类型"
+    )
+    parser.add_argument("--idle-exit", type=float, default=None, help="队列清空并空闲该秒数后退出")
+    args = parser.parse_args()
+    if args.enqueue:
+        enqueue_crawl_run()
+    elif args.worker:
+        run_crawl_worker(args.kinds, args.idle_exit)
+    else:
+        run_crawlers()
\ No newline at end of file
@@ -41,6 +41,15 @@ def get_mysql_engine(**overrides) -> Engine:
     return _mysql_engine
 
 
+def set_mysql_engine(engine: Engine) -> Engine:
+    """
+    替换全局 MySQL Engine，一般用于压测/测试时接入本地替身（如 SQLite）。
+    """
+    global _mysql_engine
+    _mysql_engine = engine
+    return _mysql_engine
+
+
 @contextmanager
 def mysql_connection(**overrides) -> Generator:
     """
@@ -58,5 +67,14 @@ def get_mongo_client(uri: Optional[str] = None) -> MongoClient:
     return _mongo_client
 
 
+def set_mongo_client(client: MongoClient) -> MongoClient:
+    """
+    替换全局 MongoClient，一般用于压测/测试时接入本地替身（如 mongomock）。
+    """
+    global _mongo_client
+    _mongo_client = client
+    return _mongo_client
+
+
 def get_mongo_database(name: str = "tech_crawler"):
     return get_mongo_client()[name]
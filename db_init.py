@@ -3,19 +3,27 @@
 
 执行一次即可完成 MySQL 表和 MongoDB 索引创建。
 """
+from typing import Tuple
+
 from sqlalchemy import (
     Column,
+    Float,
     Integer,
     MetaData,
+    PrimaryKeyConstraint,
     String,
     Table,
     Text,
     TIMESTAMP,
     func,
     Index,
+    inspect,
 )
 
 from database import get_mongo_database, get_mysql_engine
+from events import ensure_event_collection
+from models import CHANGED_AT_FIELD
+from retention import ARCHIVE_COLLECTION, ensure_ttl_index
 
 
 def init_mysql():
@@ -42,16 +50,68 @@ def init_mysql():
         Column("log_time", TIMESTAMP, server_default=func.now()),
         mysql_charset="utf8mb4",
     )
-    Index("idx_user_logs_user_id", user_logs.c.user_id)
+    # (user_id, log_time) 覆盖按用户的时间范围查询；log_time 单列索引供按时间清理
+    Index("idx_user_logs_user_time", user_logs.c.user_id, user_logs.c.log_time)
+    Index("idx_user_logs_log_time", user_logs.c.log_time)
+
+    Table(
+        "user_tag_affinity",
+        metadata,
+        Column("user_id", String(50), nullable=False),
+        Column("tag", String(100), nullable=False),
+        Column("source", String(20), nullable=False),
+        Column("score", Float, nullable=False, server_default="0"),
+        Column("updated_at", TIMESTAMP, server_default=func.now()),
+        PrimaryKeyConstraint("user_id", "tag", "source"),
+        mysql_charset="utf8mb4",
+    )
+
+    Table(
+        "rollup_state",
+        metadata,
+        Column("job", String(50), primary_key=True),
+        Column("last_log_id", Integer, nullable=False, server_default="0"),
+        Column("updated_at", TIMESTAMP, server_default=func.now()),
+        mysql_charset="utf8mb4",
+    )
 
     engine = get_mysql_engine()
     metadata.create_all(engine, checkfirst=True)
+    # 旧版的 user_id 单列索引是 (user_id, log_time) 的前缀，已被复合索引取代
+    _ensure_indexes(engine, user_logs, obsolete=("idx_user_logs_user_id",))
+
+
+def _ensure_indexes(engine, table: Table, obsolete: Tuple[str, ...] = ()):
+    """
+    create_all 不会给已存在的表补索引，这里按名称补齐缺失的索引，并删除已被取代的旧索引。
+    """
+    existing = {index["name"]: index for index in inspect(engine).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(engine)
+    for name in obsolete:
+        if name in existing:
+            columns = existing[name]["column_names"]
+            Index(name, *(table.c[column] for column in columns)).drop(engine)
 
 
 def init_mongo():
     db = get_mongo_database("tech_crawler")
     collection = db["articles"]
     collection.create_index("url", unique=True)
+    # 推荐查询均为「过滤 + 按 updated_at 倒序」，复合索引避免内存排序
+    collection.create_index([("tags", 1), ("updated_at", -1)])
+    collection.create_index([("source", 1), ("updated_at", -1)])
+    # 图片代理只接受文章头图，回源前按 top_image 查找
+    collection.create_index("top_image")
+    # 搜索索引按服务端变更时间增量拉取；旧文章补写一次，避免增量查询退化为全量
+    collection.create_index(CHANGED_AT_FIELD)
+    collection.update_many(
+        {CHANGED_AT_FIELD: {"$exists": False}}, {"$currentDate": {CHANGED_AT_FIELD: True}}
+    )
+    ensure_ttl_index()
+    db[ARCHIVE_COLLECTION].create_index("url", unique=True)
+    ensure_event_collection()
 
 
 def main():
@@ -0,0 +1,185 @@
+"""
+抓取后的文章富化：把新入库文章按批交给 LLM，生成规范化短摘要、主题标签与可复用的点评并写回文档。
+
+- 每 ENRICH_BATCH_SIZE 篇合并为一次调用，一轮抓取只需少量请求，不占用用户请求的时延；
+- `ai_tags` 只能取自 TOPIC_TAGS 词表，并以 `$addToSet` 合并进 `tags`：HN 等原本只有来源标签的文章
+  也能被兴趣标签召回；
+- 推荐时直接复用 `ai_comment`，只有尚未富化的文章才需要在线生成点评。
+
+已富化（有 `enriched_at`）的文章不会重复调用；失败的批次可用 `python enrichment.py` 补跑。
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from config import ENRICH_BATCH_SIZE, ENRICH_ENABLED, ENRICH_MAX_TAGS
+from database import get_mongo_database
+from llm import call_llm, is_llm_configured, parse_json_response
+from metrics import REGISTRY
+from models import ARTICLE_PROJECTION, CHANGED_AT_FIELD, Article, decode_articles
+from pool_meta import bump_pool_version
+from search import index_articles
+from sources import TOPIC_TAGS
+
+logger = logging.getLogger(__name__)
+
+ENRICH_ARTICLES = REGISTRY.counter(
+    "article_enrich_total", "文章富化按结果统计的篇数。", ["result"]
+)
+
+_TOPIC_LOOKUP = {tag.lower(): tag for tag in TOPIC_TAGS}
+
+
+def _collection():
+    return get_mongo_database("tech_crawler")["articles"]
+
+
+def _build_enrich_prompt(batch: Sequence[Article]) -> str:
+    formatted = []
+    for idx, article in enumerate(batch, 1):
+        formatted.append(
+            f"ID: {idx}\n"
+            f"标题: {article.title}\n"
+            f"来源: {article.source or '未知'}\n"
+            f"原始简介: {article.summary[:300] or '无'}\n"
+            f"链接: {article.url}"
+        )
+    instructions = (
+        "请为下面每篇技术资讯生成三项内容：\n"
+        "- ai_summary：中文一句话概括内容，不超过 60 字；\n"
+        f"- ai_tags：只能从【{'、'.join(TOPIC_TAGS)}】中选 0~{ENRICH_MAX_TAGS} 个最相关的主题；\n"
+        "- ai_comment：毒舌、幽默的中文俏皮话点评，不超过 40 字。\n"
+        "严格输出 JSON 数组，示例："
+        "[{\"index\":1,\"ai_summary\":\"...\",\"ai_tags\":[\"AI\"],\"ai_comment\":\"...\"}]，"
+        "index 必须对应我提供的 ID。"
+    )
+    return f"{instructions}\n\n文章列表：\n" + "\n\n".join(formatted)
+
+
+def _normalize(entry: Dict) -> Optional[Dict]:
+    summary = str(entry.get("ai_summary") or "").strip()[:120]
+    comment = str(entry.get("ai_comment") or "").strip()[:80]
+    raw_tags = entry.get("ai_tags") or []
+    if isinstance(raw_tags, str):
+        raw_tags = [raw_tags]
+    tags: List[str] = []
+    for tag in raw_tags:
+        canonical = _TOPIC_LOOKUP.get(str(tag).strip().lower())
+        if canonical and canonical not in tags:
+            tags.append(canonical)
+    if not summary and not comment:
+        return None
+    return {"ai_summary": summary, "ai_tags": tags[:ENRICH_MAX_TAGS], "ai_comment": comment}
+
+
+def _enrich_batch(batch: Sequence[Article]) -> List[Tuple[Article, Dict]]:
+    raw = call_llm(
+        [
+            {
+                "role": "system",
+                "content": "你是一名懂技术又嘴贫的资讯编辑。只回复 JSON，并确保字段齐全。",
+            },
+            {"role": "user", "content": _build_enrich_prompt(batch)},
+        ],
+        max_tokens=150 * len(batch) + 100,
+        operation="enrich",
+    )
+    results: Dict[int, Dict] = {}
+    for entry in parse_json_response(raw):
+        if not isinstance(entry, dict):
+            continue
+        idx = entry.get("index")
+        if not isinstance(idx, int) or idx < 1 or idx > len(batch) or idx in results:
+            continue
+        fields = _normalize(entry)
+        if fields:
+            results[idx] = fields
+    return [(batch[idx - 1], fields) for idx, fields in sorted(results.items())]
+
+
+def _pending(articles: Sequence[Article]) -> List[Article]:
+    urls = list(dict.fromkeys(article.url for article in articles if article.url))
+    done = {
+        doc["url"]
+        for doc in _collection().find(
+            {"url": {"$in": urls}, "enriched_at": {"$exists": True}}, {"_id": 0, "url": 1}
+        )
+    }
+    pending: Dict[str, Article] = {}
+    for article in articles:
+        if article.url and article.url not in done:
+            pending.setdefault(article.url, article)
+    return list(pending.values())
+
+
+def enrich_articles(articles: Sequence[Article], batch_size: int = ENRICH_BATCH_SIZE) -> int:
+    """
+    富化尚未处理过的文章并写回，返回成功富化的篇数；关闭富化或 LLM 未配置时直接返回 0。
+    """
+    if not ENRICH_ENABLED or not articles or not is_llm_configured():
+        return 0
+    pending = _pending(articles)
+    enriched: List[Article] = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start : start + batch_size]
+        try:
+            results = _enrich_batch(batch)
+        except Exception as exc:
+            logger.error("文章富化失败（%d 篇）: %s", len(batch), exc)
+            ENRICH_ARTICLES.inc(len(batch), result="error")
+            continue
+        if len(results) < len(batch):
+            ENRICH_ARTICLES.inc(len(batch) - len(results), result="empty")
+        if not results:
+            continue
+        now = datetime.utcnow()
+        requests = []
+        for article, fields in results:
+            # 不改 updated_at：它决定 feed 排序与冷热归档，富化不应把旧文章顶到前面或重置归档时钟；
+            # 由服务端刷新 changed_at，Web 进程的搜索索引据此增量拉取
+            update: Dict = {
+                "$set": {**fields, "enriched_at": now},
+                "$currentDate": {CHANGED_AT_FIELD: True},
+            }
+            if fields["ai_tags"]:
+                update["$addToSet"] = {"tags": {"$each": fields["ai_tags"]}}
+            requests.append(UpdateOne({"url": article.url}, update))
+            enriched.append(
+                article._replace(
+                    tags=tuple(dict.fromkeys((*article.tags, *fields["ai_tags"]))),
+                    ai_summary=fields["ai_summary"],
+                    ai_comment=fields["ai_comment"],
+                )
+            )
+        _collection().bulk_write(requests, ordered=False)
+        ENRICH_ARTICLES.inc(len(results), result="enriched")
+    if enriched:
+        bump_pool_version(len(enriched))
+        index_articles(enriched)
+    return len(enriched)
+
+
+def enrich_backlog(limit: int = 200) -> int:
+    """
+    补跑最近入库但尚未富化的文章（如 LLM 曾经不可用）。
+    """
+    docs = (
+        _collection()
+        .find({"enriched_at": {"$exists": False}}, dict(ARTICLE_PROJECTION))
+        .sort("updated_at", -1)
+        .limit(limit)
+    )
+    return enrich_articles(decode_articles(docs))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="补跑文章富化")
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+    print(f"富化完成：{enrich_backlog(args.limit)} 篇")
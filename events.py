@@ -0,0 +1,289 @@
+"""
+新文章推送：爬虫写入 capped 集合 `article_events`，Web 进程尾随读取后经 SSE 推给浏览器。
+
+- 发布：`_upsert_articles` 只为真正新插入的文章（upsert 产生新 `_id`）各写一条事件，
+  集合大小固定为 ARTICLE_EVENTS_CAP_BYTES，写满后自动覆盖最旧事件，无需清理任务。
+- 分发：每个 Web 进程只有一个尾随线程持有 Mongo 游标（TAILABLE_AWAIT），新事件按标签过滤后
+  放入各连接自己的有界内存队列；空闲连接只是阻塞在队列上，不占用 Mongo 游标，也不轮询数据库。
+- 续传：事件 id 即 ObjectId，浏览器断线重连时携带 `Last-Event-ID`，从 capped 集合补发之后的事件；
+  断线期间的事件超过 EVENTS_REPLAY_LIMIT 条或已被覆盖时不做部分补发，改为发送 `reload` 事件让页面整体刷新。
+  连接消费过慢导致队列溢出时主动断开，由浏览器重连补发，不会阻塞其他连接。
+- capped 集合创建时写入一条哨兵文档：空的 capped 集合上尾随游标会立即失效，导致退化为按间隔轮询。
+
+每个 SSE 连接在 WSGI 服务器中独占一个线程（或协程），必须使用 gthread（`--threads` 不少于
+EVENTS_MAX_CONNECTIONS 加上普通请求并发）或 gevent 等异步 worker 部署；sync worker 会被推送连接占满。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from config import (
+    ARTICLE_EVENTS_CAP_BYTES,
+    EVENTS_HEARTBEAT_SECONDS,
+    EVENTS_POLL_INTERVAL,
+    EVENTS_QUEUE_SIZE,
+    EVENTS_REPLAY_LIMIT,
+)
+from database import get_mongo_database
+from metrics import REGISTRY
+from models import Article
+
+logger = logging.getLogger(__name__)
+
+EVENT_COLLECTION = "article_events"
+
+ARTICLE_EVENTS = REGISTRY.counter(
+    "article_events_total", "新文章事件的发布/推送/丢弃次数。", ["result"]
+)
+SSE_CONNECTIONS = REGISTRY.gauge("sse_connections", "当前打开的新文章推送连接数。")
+
+# 浏览器断线后的重连间隔
+_RETRY_MS = 3000
+
+_collection_ready = False
+
+
+def _event_collection():
+    return get_mongo_database("tech_crawler")[EVENT_COLLECTION]
+
+
+def ensure_event_collection():
+    """
+    创建 capped 事件集合并写入哨兵文档；只有成功后才标记就绪，瞬时失败会在下次发布时重试。
+    """
+    global _collection_ready
+    db = get_mongo_database("tech_crawler")
+    if EVENT_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(EVENT_COLLECTION, capped=True, size=ARTICLE_EVENTS_CAP_BYTES)
+        except CollectionInvalid:
+            # 其他进程已抢先创建
+            pass
+        except NotImplementedError:
+            # mongomock 等替身不支持 capped 选项，退化为普通集合，尾随线程改为轮询
+            logger.warning("当前 Mongo 不支持 capped 集合，事件集合不会自动滚动")
+    _ensure_sentinel()
+    _collection_ready = True
+
+
+def _ensure_sentinel():
+    # 多个进程可能同时写入哨兵，多出的哨兵与正常事件一样会被 capped 集合滚动覆盖
+    collection = _event_collection()
+    if collection.find_one({}, {"_id": 1}) is None:
+        collection.insert_one({"sentinel": True, "tags": [], "created_at": datetime.utcnow()})
+
+
+def publish_new_articles(articles: Sequence[Article]) -> int:
+    """
+    为新插入的文章写入事件，返回事件条数。
+    """
+    if not articles:
+        return 0
+    if not _collection_ready:
+        ensure_event_collection()
+    now = datetime.utcnow()
+    docs = []
+    for article in articles:
+        payload = article.to_doc()
+        payload.pop("updated_at", None)
+        docs.append({"article": payload, "tags": payload["tags"], "created_at": now})
+    _event_collection().insert_many(docs, ordered=False)
+    ARTICLE_EVENTS.inc(len(docs), result="published")
+    return len(docs)
+
+
+def replay_events(
+    last_event_id: str, tags: Iterable[str] = (), limit: int = EVENTS_REPLAY_LIMIT
+) -> Optional[List[Dict]]:
+    """
+    返回 `last_event_id` 之后的事件；无法完整补发时返回 None，调用方应让客户端整体刷新：
+    id 无效、对应事件已被 capped 集合覆盖（中间可能有缺口），或待补发的事件超过 `limit` 条。
+    """
+    try:
+        after = ObjectId(last_event_id)
+    except (InvalidId, TypeError):
+        return None
+    collection = _event_collection()
+    if collection.find_one({"_id": after}, {"_id": 1}) is None:
+        return None
+    query: Dict = {"_id": {"$gt": after}, "article": {"$exists": True}}
+    tags = list(tags)
+    if tags:
+        query["tags"] = {"$in": tags}
+    events = list(collection.find(query).sort("_id", ASCENDING).limit(limit + 1))
+    if len(events) > limit:
+        return None
+    return events
+
+
+def format_event(event: Dict) -> str:
+    data = json.dumps(event["article"], ensure_ascii=False)
+    return f"id: {event['_id']}\nevent: article\ndata: {data}\n\n"
+
+
+def format_reload(latest_id: Optional[ObjectId]) -> str:
+    """
+    通知客户端补发不完整、需要整体刷新列表；携带最新事件 id，之后的重连从这里续传。
+    """
+    event_id = f"id: {latest_id}\n" if latest_id else ""
+    return f"{event_id}event: reload\ndata: {{}}\n\n"
+
+
+class Subscription:
+    def __init__(self, tags: Iterable[str], maxsize: int):
+        self.tags = frozenset(tags)
+        self.overflowed = False
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize)
+
+    def matches(self, event: Dict) -> bool:
+        return not self.tags or not self.tags.isdisjoint(event.get("tags") or ())
+
+    def offer(self, event: Dict) -> bool:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            return False
+        return True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    进程内事件分发器：首个连接订阅时启动尾随线程，之后所有连接共享它。
+    """
+
+    def __init__(
+        self, poll_interval: float = EVENTS_POLL_INTERVAL, queue_size: int = EVENTS_QUEUE_SIZE
+    ):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, tags: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(tags, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            SSE_CONNECTIONS.set(len(self._subscribers))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-tail", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            SSE_CONNECTIONS.set(len(self._subscribers))
+
+    def connections(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def dispatch(self, event: Dict):
+        if "article" not in event:
+            # 哨兵文档
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.matches(event):
+                continue
+            if subscription.offer(event):
+                ARTICLE_EVENTS.inc(result="delivered")
+            else:
+                ARTICLE_EVENTS.inc(result="dropped")
+
+    def latest_id(self) -> Optional[ObjectId]:
+        latest = _event_collection().find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+        return latest["_id"] if latest else None
+
+    def _run(self):
+        last_id: Optional[ObjectId] = None
+        started = False
+        while True:
+            try:
+                if not started:
+                    # 只推送连接建立之后的事件，历史事件由 Last-Event-ID 补发
+                    last_id = self.latest_id()
+                    started = True
+                if last_id is None:
+                    # 集合尚未创建或为空（如被手动清空）时补建并写入哨兵，否则尾随游标会立即失效
+                    ensure_event_collection()
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = _event_collection().find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                # 不是 capped 集合（或游标位置已被覆盖）时游标立即失效，退回按间隔重新查询
+                while cursor.alive:
+                    for event in cursor:
+                        last_id = event["_id"]
+                        self.dispatch(event)
+            except PyMongoError as exc:
+                logger.warning("事件尾随读取失败: %s", exc)
+            time.sleep(self.poll_interval)
+
+
+_hub: Optional[EventHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub() -> EventHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = EventHub()
+    return _hub
+
+
+def stream_events(
+    tags: Iterable[str] = (),
+    last_event_id: Optional[str] = None,
+    hub: Optional[EventHub] = None,
+    heartbeat: float = EVENTS_HEARTBEAT_SECONDS,
+) -> Iterator[str]:
+    """
+    SSE 响应体生成器：先补发断线期间的事件，再持续推送新事件，空闲时定期发送注释行保活。
+    """
+    hub = hub or get_event_hub()
+    tags = list(tags)
+    # 先订阅再补发，两者之间到达的事件按 id 去重，不会遗漏
+    subscription = hub.subscribe(tags)
+    try:
+        yield f"retry: {_RETRY_MS}\n\n"
+        seen: Optional[ObjectId] = None
+        if last_event_id:
+            replayed = replay_events(last_event_id, tags)
+            if replayed is None:
+                yield format_reload(hub.latest_id())
+                ARTICLE_EVENTS.inc(result="reload")
+            else:
+                for event in replayed:
+                    seen = event["_id"]
+                    yield format_event(event)
+        while not subscription.overflowed:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            if seen is not None and event["_id"] <= seen:
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
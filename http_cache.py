@@ -0,0 +1,158 @@
+"""
+HTTP 层缓存与压缩。
+
+- 响应压缩：按 Accept-Encoding 选择 brotli（若已安装 `brotli`）或 gzip；
+- JSON 校验：基于文章池版本生成弱 ETag，命中 If-None-Match 时直接返回 304，跳过 Mongo/LLM；
+- 静态资源指纹：`url_for('static', ...)` 自动附加内容哈希 `?v=`，带指纹的请求返回一年期 immutable 缓存头。
+
+`HTTP_CACHE_ENABLED=0` 时以上全部关闭，便于对照测量。
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Flask, Response, jsonify, request
+
+from config import HTTP_CACHE_ENABLED, HTTP_COMPRESS_MIN_BYTES, STATIC_MAX_AGE
+from metrics import record_cache
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时仅提供 gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "image/svg+xml",
+}
+
+_fingerprints: Dict[str, Tuple[float, str]] = {}
+_fingerprint_lock = threading.Lock()
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()[:20]
+
+
+def conditional_json(
+    etag: str,
+    build: Callable[[], Dict],
+    cacheable: Callable[[Dict], bool] = lambda payload: True,
+) -> Response:
+    """
+    客户端持有相同 ETag 时返回 304 且不调用 `build`；否则生成 JSON 并附带 ETag。
+
+    `cacheable` 返回 False 的结果（如 LLM 降级文案）不下发 ETag，避免被客户端长期复用。
+    """
+    if not HTTP_CACHE_ENABLED:
+        return jsonify(build())
+    hit = request.if_none_match.contains_weak(etag)
+    record_cache("http_etag", hit)
+    if hit:
+        response = Response(status=304)
+    else:
+        payload = build()
+        response = jsonify(payload)
+        if not cacheable(payload):
+            response.headers["Cache-Control"] = "no-store"
+            return response
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def static_fingerprint(static_folder: str, filename: str) -> Optional[str]:
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+    with _fingerprint_lock:
+        _fingerprints[path] = (mtime, digest)
+    return digest
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _compress_response(response: Response) -> Response:
+    if (
+        response.status_code != 200
+        or (response.is_streamed and not response.direct_passthrough)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    # send_file 默认直通文件句柄，静态文件体积小，读入内存后一并压缩
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < HTTP_COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(_compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # 压缩后字节已变化，强 ETag 降级为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _apply_static_cache(response: Response) -> Response:
+    if request.endpoint == "static" and request.args.get("v"):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def init_app(app: Flask):
+    if not HTTP_CACHE_ENABLED:
+        return
+
+    def add_static_fingerprint(endpoint: str, values: Dict):
+        if endpoint != "static" or "filename" not in values or "v" in values:
+            return
+        version = static_fingerprint(app.static_folder, values["filename"])
+        if version:
+            values["v"] = version
+
+    def after_request(response: Response) -> Response:
+        return _compress_response(_apply_static_cache(response))
+
+    app.url_defaults(add_static_fingerprint)
+    app.after_request(after_request)
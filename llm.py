@@ -0,0 +1,72 @@
+"""
+LLM 客户端封装：懒加载 OpenAI SDK、统一记录耗时/token/错误指标、解析 JSON 数组回复。
+
+推荐（请求时）与文章富化（抓取时）共用这一层。
+"""
+from __future__ import annotations
+
+import json
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from config import LLM_API_KEY, LLM_BASE_URL, LLM_MODEL_NAME
+from metrics import LLM_ERRORS, LLM_REQUEST_SECONDS, LLM_TOKENS
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+_llm_client: Optional[OpenAI] = None
+
+
+def is_llm_configured() -> bool:
+    token = (LLM_API_KEY or "").strip()
+    return bool(token) and "你的_ModelScope_Token" not in token
+
+
+def get_llm_client() -> OpenAI:
+    global _llm_client
+    if _llm_client is None:
+        if not is_llm_configured():
+            raise RuntimeError("LLM_API_KEY 未设置或仍为占位符。")
+        # openai SDK 导入耗时明显，首次调用时再加载
+        from openai import OpenAI
+
+        _llm_client = OpenAI(base_url=LLM_BASE_URL, api_key=LLM_API_KEY)
+    return _llm_client
+
+
+def call_llm(messages: List[Dict], max_tokens: int = 600, operation: str = "chat") -> str:
+    try:
+        client = get_llm_client()
+        with LLM_REQUEST_SECONDS.time(operation=operation):
+            response = client.chat.completions.create(
+                model=LLM_MODEL_NAME,
+                stream=False,
+                messages=messages,
+                temperature=0.4,
+                max_tokens=max_tokens,
+                extra_body={"enable_thinking": False},
+            )
+    except Exception as exc:
+        LLM_ERRORS.inc(operation=operation, error=type(exc).__name__)
+        raise
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, operation=operation, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, operation=operation, kind="completion")
+    return response.choices[0].message.content or ""
+
+
+def parse_json_response(content: str) -> List[Dict]:
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, list) else []
+    except json.JSONDecodeError as exc:
+        logger.error("LLM JSON 解析失败: %s", exc)
+        return []
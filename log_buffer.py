@@ -0,0 +1,335 @@
+"""
+用户行为日志写后缓冲（write-behind）。
+
+请求线程只负责入队并立即返回；后台线程按条数或时间间隔把日志合并为多行 INSERT 写入 MySQL。
+MySQL 不可用时批次落盘到本地追加文件，恢复后自动回放；进程退出时会把剩余日志刷完。
+
+落盘文件由同机的多个 Web 进程共享：追加与认领都在文件锁下进行，同一时间只有一个进程回放。
+回放时先把落盘文件改名为 `.replaying` 再按 USER_LOG_BATCH_SIZE 分批写入，每批提交后记录文件偏移；
+进程在回放中途崩溃时，下一个进程（启动时或每 USER_LOG_REPLAY_INTERVAL 秒）从偏移处继续，最多重复一批。
+"""
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import (
+    USER_LOG_BATCH_SIZE,
+    USER_LOG_FLUSH_INTERVAL,
+    USER_LOG_QUEUE_SIZE,
+    USER_LOG_REPLAY_INTERVAL,
+    USER_LOG_SPILL_PATH,
+)
+from database import mysql_connection
+from metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # Windows 等平台没有 flock，退化为仅进程内互斥
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+USER_LOG_FLUSH_SECONDS = REGISTRY.histogram(
+    "user_log_flush_duration_seconds", "行为日志单批写入 MySQL 的耗时。"
+)
+USER_LOG_ROWS = REGISTRY.counter(
+    "user_log_rows_total",
+    # overflow 为队列已满、未入队即落盘的行；spilled 统计所有落盘行（含 overflow 与写库失败的批次）
+    "行为日志按去向统计的行数。",
+    ["result"],
+)
+USER_LOG_QUEUE_DEPTH = REGISTRY.gauge("user_log_queue_depth", "行为日志缓冲队列当前长度。")
+
+# PyMySQL 的 executemany 会把 INSERT ... VALUES 改写成单条多行插入
+_INSERT_SQL = text(
+    """
+    INSERT INTO user_logs (user_id, article_title, article_url, action_type)
+    VALUES (:user_id, :title, :url, :action)
+    """
+)
+
+_buffer: Optional["UserLogBuffer"] = None
+_buffer_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    基于 flock 的跨进程互斥；非阻塞模式下锁被占用时产出 False。进程退出（包括崩溃）时锁自动释放。
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as fh:
+        if fcntl is None:
+            yield True
+            return
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fh.fileno(), flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class UserLogBuffer:
+    def __init__(
+        self,
+        batch_size: int = USER_LOG_BATCH_SIZE,
+        flush_interval: float = USER_LOG_FLUSH_INTERVAL,
+        max_queue: int = USER_LOG_QUEUE_SIZE,
+        spill_path: str = USER_LOG_SPILL_PATH,
+        replay_interval: float = USER_LOG_REPLAY_INTERVAL,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.05, flush_interval)
+        self.replay_interval = max(self.flush_interval, replay_interval)
+        self.spill_path = spill_path
+        self.replaying_path = f"{spill_path}.replaying"
+        self._offset_path = f"{spill_path}.replaying.offset"
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = time.time()
+        self._stats = {
+            "enqueued_total": 0,
+            "overflow_rows_total": 0,
+            "flushed_rows_total": 0,
+            "flush_batches_total": 0,
+            "flush_errors_total": 0,
+            "spilled_rows_total": 0,
+            "replayed_rows_total": 0,
+            "flush_seconds_total": 0.0,
+            "flush_seconds_max": 0.0,
+            "last_flush_seconds": 0.0,
+        }
+
+    def start(self) -> "UserLogBuffer":
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="user-log-buffer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def enqueue(self, user_id: str, title: str, url: str, action: str = "like"):
+        row = {"user_id": user_id, "title": title, "url": url, "action": action}
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # 队列已满说明 MySQL 长时间跟不上，直接落盘，保证请求不被阻塞；这类行不计入 enqueued
+            self._incr("overflow_rows_total")
+            USER_LOG_ROWS.inc(result="overflow")
+            self._spill([row])
+            return
+        self._incr("enqueued_total")
+        USER_LOG_ROWS.inc(result="enqueued")
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        同步清空队列，返回成功写入 MySQL 的行数。
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.batch_size)
+                if not rows:
+                    break
+                if self._write_batch(rows):
+                    written += len(rows)
+                else:
+                    self._spill(rows)
+            if written:
+                self._replay_spill()
+        return written
+
+    def close(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        elapsed = max(time.time() - self._started_at, 1e-6)
+        batches = snapshot["flush_batches_total"]
+        snapshot["queue_depth"] = self._queue.qsize()
+        snapshot["rows_per_second"] = round(snapshot["flushed_rows_total"] / elapsed, 3)
+        snapshot["avg_flush_seconds"] = (
+            round(snapshot["flush_seconds_total"] / batches, 6) if batches else 0.0
+        )
+        return snapshot
+
+    def _run(self):
+        # 启动后立即检查一次：上次进程崩溃或重启遗留的落盘文件不依赖新流量触发回放
+        next_replay = 0.0
+        while not self._stopped.is_set():
+            try:
+                if time.monotonic() >= next_replay:
+                    next_replay = time.monotonic() + self.replay_interval
+                    self._replay_spill()
+            except Exception as exc:
+                logger.error("落盘日志回放异常: %s", exc)
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:  # 后台线程不能因单次异常退出
+                logger.error("用户日志刷写异常: %s", exc)
+
+    def _drain(self, max_rows: int) -> List[Dict]:
+        rows: List[Dict] = []
+        while len(rows) < max_rows:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write_batch(self, rows: List[Dict]) -> bool:
+        started = time.perf_counter()
+        try:
+            with mysql_connection() as conn:
+                conn.execute(_INSERT_SQL, rows)
+        except Exception as exc:
+            self._incr("flush_errors_total")
+            logger.warning("用户日志批量写入失败，转存本地文件: %s", exc)
+            return False
+        elapsed = time.perf_counter() - started
+        USER_LOG_FLUSH_SECONDS.observe(elapsed)
+        USER_LOG_ROWS.inc(len(rows), result="flushed")
+        with self._stats_lock:
+            self._stats["flushed_rows_total"] += len(rows)
+            self._stats["flush_batches_total"] += 1
+            self._stats["flush_seconds_total"] += elapsed
+            self._stats["last_flush_seconds"] = elapsed
+            self._stats["flush_seconds_max"] = max(self._stats["flush_seconds_max"], elapsed)
+        return True
+
+    def _spill(self, rows: List[Dict]):
+        with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+            with open(self.spill_path, "a", encoding="utf-8") as fh:
+                for row in rows:
+                    fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._incr("spilled_rows_total", len(rows))
+        USER_LOG_ROWS.inc(len(rows), result="spilled")
+
+    def _replay_spill(self) -> int:
+        """
+        MySQL 恢复后回放落盘日志，返回本次回放的行数；失败时保留文件与偏移，稍后从断点重试。
+
+        优先续传遗留的 `.replaying`（回放中途崩溃的进程留下），否则认领当前落盘文件。
+        """
+        if not os.path.exists(self.spill_path) and not os.path.exists(self.replaying_path):
+            return 0
+        with _file_lock(f"{self.spill_path}.replay.lock", blocking=False) as acquired:
+            if not acquired:
+                # 其他进程正在回放
+                return 0
+            if not os.path.exists(self.replaying_path):
+                with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+                    if not os.path.exists(self.spill_path):
+                        return 0
+                    os.replace(self.spill_path, self.replaying_path)
+            return self._replay_file()
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self._offset_path, encoding="utf-8") as fh:
+                return int(fh.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp_path = f"{self._offset_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(str(offset))
+        os.replace(tmp_path, self._offset_path)
+
+    def _read_rows(self, fh: IO[bytes]) -> Tuple[List[Dict], bool]:
+        rows: List[Dict] = []
+        while len(rows) < self.batch_size:
+            line = fh.readline()
+            if not line:
+                return rows, True
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.warning("跳过损坏的落盘日志行: %r", line[:80])
+        return rows, False
+
+    def _replay_file(self) -> int:
+        """
+        按批流式回放 `.replaying`，每批一个事务，提交后推进偏移；调用方需持有回放锁。
+        """
+        replayed = 0
+        with open(self.replaying_path, "rb") as fh:
+            fh.seek(self._read_offset())
+            while True:
+                rows, eof = self._read_rows(fh)
+                if rows:
+                    try:
+                        with mysql_connection() as conn:
+                            conn.execute(_INSERT_SQL, rows)
+                    except Exception as exc:
+                        logger.warning("落盘日志回放失败，稍后从断点重试: %s", exc)
+                        return replayed
+                    replayed += len(rows)
+                    self._incr("replayed_rows_total", len(rows))
+                    USER_LOG_ROWS.inc(len(rows), result="replayed")
+                self._write_offset(fh.tell())
+                if eof:
+                    break
+        os.remove(self.replaying_path)
+        os.remove(self._offset_path)
+        if replayed:
+            logger.info("已回放 %d 条落盘用户日志。", replayed)
+        return replayed
+
+    def _incr(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+
+def get_user_log_buffer() -> UserLogBuffer:
+    """
+    返回进程内单例缓冲，首次调用时启动后台线程并注册退出刷写。
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = UserLogBuffer().start()
+                USER_LOG_QUEUE_DEPTH.set_function(_buffer._queue.qsize)
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def log_user_action(user_id: str, title: str, url: str, action: str = "like"):
+    get_user_log_buffer().enqueue(user_id, title, url, action)
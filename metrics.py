@@ -0,0 +1,327 @@
+"""
+进程内指标：计数器、仪表与直方图，按 Prometheus 文本格式导出。
+
+每个指标按标签组合分桶保存，写入只做一次加锁的累加/二分查找，开销可以放在热路径上；
+`/metrics` 路由调用 `render()` 导出，测试中可直接通过 `value()`/`snapshot()` 读取。
+配置了 METRICS_TOKEN 时 `/metrics` 要求 `Authorization: Bearer <token>`，否则只接受本机回环地址的请求。
+"""
+from __future__ import annotations
+
+import abc
+import bisect
+import hmac
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from config import METRICS_TOKEN
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """
+        返回该指标的样本行（不含 HELP/TYPE），由各指标类型实现。
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """
+        抓取时才调用 `fn` 取值，适合队列深度、命中率等派生指标。
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        fn = self._functions.get(key)
+        return fn() if fn else self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # 每个标签组合保存 [各桶计数..., +Inf 计数] 与总和
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels) -> Dict:
+        key = self._key(labels)
+        with self._lock:
+            counts = list(self._counts.get(key) or [0] * (len(self.buckets) + 1))
+            total = self._sums.get(key, 0.0)
+        return {"count": sum(counts), "sum": total, "buckets": dict(zip(self.buckets, counts))}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(counts), self._sums[key]) for key, counts in self._counts.items()
+            )
+        lines: List[str] = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---- 热路径指标 ----
+CRAWL_SOURCE_SECONDS = REGISTRY.histogram(
+    "crawl_source_duration_seconds",
+    "单个资讯源一次抓取的耗时。",
+    ["source"],
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+CRAWL_ITEMS = REGISTRY.counter("crawl_items_total", "各资讯源累计抓取条数。", ["source"])
+CRAWL_LAST_ITEMS = REGISTRY.gauge("crawl_last_items", "各资讯源最近一次抓取条数。", ["source"])
+MONGO_QUERY_SECONDS = REGISTRY.histogram(
+    "mongo_query_duration_seconds", "推荐/早报链路中各 Mongo 查询的耗时。", ["query"]
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds", "LLM 调用耗时。", ["operation"]
+)
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM 消耗的 token 数。", ["operation", "kind"])
+LLM_ERRORS = REGISTRY.counter("llm_errors_total", "LLM 调用失败次数。", ["operation", "error"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Flask 路由处理耗时。", ["route", "method", "status"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "各缓存的查询次数（按命中/未命中）。", ["cache", "result"]
+)
+CACHE_HIT_RATIO = REGISTRY.gauge("cache_hit_ratio", "各缓存的累计命中率。", ["cache"])
+
+
+_tracked_caches: Set[str] = set()
+
+
+def record_cache(cache: str, hit: bool):
+    if cache not in _tracked_caches:
+        _tracked_caches.add(cache)
+        CACHE_HIT_RATIO.set_function(lambda: _hit_ratio(cache), cache=cache)
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _hit_ratio(cache: str) -> float:
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+    return hits / total if total else 0.0
+
+
+_LOOPBACK_ADDRS = {"127.0.0.1", "::1"}
+
+
+def _metrics_allowed(request) -> bool:
+    if METRICS_TOKEN:
+        scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(
+            token.strip().encode(), METRICS_TOKEN.encode()
+        )
+    return request.remote_addr in _LOOPBACK_ADDRS
+
+
+def instrument_flask(app: Flask):
+    """
+    记录每个路由的处理耗时，并注册 `/metrics` 导出端点。
+
+    需要在其他 after_request 钩子（压缩、缓存头等）之前注册：after_request 按注册的逆序执行，
+    先注册的最后运行，才能看到最终状态码；耗时在 teardown_request 中记录，包含压缩等后处理，
+    未处理异常导致的 500 也会被统计。
+    """
+    from flask import Response, request
+
+    def start_timer():
+        request.environ["metrics.started"] = time.perf_counter()
+
+    def record_status(response):
+        request.environ["metrics.status"] = response.status_code
+        return response
+
+    def observe(exc: Optional[BaseException]):
+        started = request.environ.get("metrics.started")
+        if started is None:
+            return
+        status = request.environ.get("metrics.status")
+        if exc is not None or status is None:
+            status = 500
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=route,
+            method=request.method,
+            status=str(status),
+        )
+
+    def metrics_endpoint():
+        if not _metrics_allowed(request):
+            return Response("forbidden\n", status=403, content_type="text/plain; charset=utf-8")
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    app.before_request(start_timer)
+    app.after_request(record_status)
+    app.teardown_request(observe)
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint, methods=["GET"])
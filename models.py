@@ -0,0 +1,110 @@
+"""
+文章记录类型与 Mongo 字段投影。
+
+`Article` 是不可变的 NamedTuple：没有实例 `__dict__`，单条内存约为等价 dict 的三分之一，
+爬虫产出、入库与推荐候选池都使用它；只在写 Mongo / 输出 JSON 的边界转换为 dict。
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+# 推荐/列表查询只取这些字段；`_id`、`publish_date` 等不在线上传输。
+# 投影常量只读：驱动（及 mongomock）会原地改写传入的投影，调用处须传 dict(...) 副本，并发查询互不干扰
+ARTICLE_FIELDS = (
+    "url",
+    "title",
+    "summary",
+    "source",
+    "tags",
+    "top_image",
+    "updated_at",
+    "ai_summary",
+    "ai_comment",
+)
+ARTICLE_PROJECTION: Mapping[str, int] = MappingProxyType(
+    {"_id": 0, **{field: 1 for field in ARTICLE_FIELDS}}
+)
+HEADLINE_PROJECTION: Mapping[str, int] = MappingProxyType({"_id": 0, "title": 1})
+# 每次写入文章时由 Mongo 服务端用 $currentDate 写入的变更时间，供搜索索引增量拉取；
+# 与各 worker 本地时钟生成的 updated_at 无关，不参与推荐排序与冷热归档
+CHANGED_AT_FIELD = "changed_at"
+# 归档任务删除前写入的标记（见 retention.py），文章被重新写入时清除，避免仍在热窗口的文章被 TTL 删除
+ARCHIVED_AT_FIELD = "archived_at"
+# 驱动按批把回包整体解码为 dict；解码为 Article 时限制每批条数，临时 dict 最多只有一批与结果并存
+DECODE_BATCH_SIZE = 500
+
+
+class Article(NamedTuple):
+    url: str
+    title: str
+    summary: str = ""
+    source: str = ""
+    tags: Tuple[str, ...] = ()
+    top_image: str = ""
+    publish_date: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    # 抓取后富化阶段由 LLM 生成，未富化时为空
+    ai_summary: str = ""
+    ai_comment: str = ""
+
+    @classmethod
+    def from_doc(cls, doc: Dict) -> "Article":
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, str):
+            try:
+                updated_at = datetime.fromisoformat(updated_at)
+            except ValueError:
+                updated_at = None
+        return cls(
+            url=doc.get("url") or "",
+            title=doc.get("title") or "",
+            summary=doc.get("summary") or "",
+            source=doc.get("source") or "",
+            tags=tuple(doc.get("tags") or ()),
+            top_image=doc.get("top_image") or "",
+            publish_date=doc.get("publish_date"),
+            updated_at=updated_at if isinstance(updated_at, datetime) else None,
+            ai_summary=doc.get("ai_summary") or "",
+            ai_comment=doc.get("ai_comment") or "",
+        )
+
+    def to_doc(self) -> Dict:
+        """
+        转为写入 Mongo 的文档；未设置的 publish_date / updated_at 与空的富化字段不覆盖库中已有值。
+        """
+        doc = self._asdict()
+        doc["tags"] = list(self.tags)
+        for optional in ("publish_date", "updated_at", "ai_summary", "ai_comment"):
+            if not doc[optional]:
+                del doc[optional]
+        return doc
+
+    def to_upsert(self, keep_existing_images: bool = False) -> Tuple[Dict, Dict]:
+        """
+        返回按 url 幂等写入的 (filter, update)；爬虫与快照导入共用同一写入语义。
+
+        标签用 `$addToSet` 合并，保留富化阶段补充的主题标签；`keep_existing_images=True` 时
+        头图只在新文章上写入，已解析过的头图不会被占位图覆盖。
+        """
+        doc = self.to_doc()
+        update: Dict = {
+            "$set": doc,
+            "$addToSet": {"tags": {"$each": doc.pop("tags")}},
+            "$currentDate": {CHANGED_AT_FIELD: True},
+            "$unset": {ARCHIVED_AT_FIELD: ""},
+        }
+        if keep_existing_images:
+            update["$setOnInsert"] = {"top_image": doc.pop("top_image")}
+        return {"url": doc["url"]}, update
+
+
+def decode_articles(docs: Iterable[Dict]) -> List[Article]:
+    """
+    逐条解码为 Article；传入尚未迭代的游标时把批大小设为 DECODE_BATCH_SIZE，峰值内存不随候选池翻倍。
+    """
+    set_batch_size = getattr(docs, "batch_size", None)
+    if callable(set_batch_size):
+        set_batch_size(DECODE_BATCH_SIZE)
+    return [Article.from_doc(doc) for doc in docs]
@@ -0,0 +1,86 @@
+"""
+文章池元数据：维护单调递增的池版本号。
+
+爬虫每次写入文章后递增版本；Web 端据此生成 ETag 等缓存校验值，读取结果在进程内短暂缓存。
+`removed_total` 记录归档/删除的累计条数，`rebuild_total` 记录快照导入等整池重写的次数；
+增量维护的派生数据（如搜索索引）发现二者之一变化时需要全量重建。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Tuple
+
+from pymongo import ReturnDocument
+
+from database import get_mongo_database
+from metrics import record_cache
+
+META_COLLECTION = "pool_meta"
+_POOL_DOC_ID = "articles"
+
+
+class PoolState(NamedTuple):
+    version: int
+    removed_total: int
+    rebuild_total: int = 0
+
+
+_cached: Tuple[float, PoolState] = (0.0, PoolState(0, 0))
+_cache_lock = threading.Lock()
+
+
+def _meta_collection():
+    return get_mongo_database("tech_crawler")[META_COLLECTION]
+
+
+def bump_pool_version(changed: int = 0, removed: int = 0, rebuild: bool = False) -> int:
+    doc = _meta_collection().find_one_and_update(
+        {"_id": _POOL_DOC_ID},
+        {
+            "$inc": {
+                "version": 1,
+                "changed_total": changed,
+                "removed_total": removed,
+                "rebuild_total": int(rebuild),
+            },
+            "$set": {"updated_at": datetime.utcnow()},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc.get("version", 0))
+
+
+def get_pool_state(max_age: float = 1.0) -> PoolState:
+    """
+    返回当前文章池版本与累计删除数；`max_age` 秒内复用上次读取结果，避免每个请求都访问 Mongo。
+    """
+    global _cached
+    now = time.monotonic()
+    fetched_at, state = _cached
+    if now - fetched_at < max_age:
+        record_cache("pool_version", True)
+        return state
+    with _cache_lock:
+        fetched_at, state = _cached
+        if now - fetched_at < max_age:
+            record_cache("pool_version", True)
+            return state
+        record_cache("pool_version", False)
+        doc = _meta_collection().find_one(
+            {"_id": _POOL_DOC_ID}, {"version": 1, "removed_total": 1, "rebuild_total": 1}
+        )
+        doc = doc or {}
+        state = PoolState(
+            int(doc.get("version", 0)),
+            int(doc.get("removed_total", 0)),
+            int(doc.get("rebuild_total", 0)),
+        )
+        _cached = (time.monotonic(), state)
+    return state
+
+
+def get_pool_version(max_age: float = 1.0) -> int:
+    return get_pool_state(max_age).version
@@ -0,0 +1,156 @@
+"""
+按需统计采样分析器。
+
+后台线程按固定间隔读取目标线程的调用栈并计数，结束后以 collapsed stacks 格式
+（`frame;frame;frame count`，可直接交给 flamegraph.pl / speedscope）写入 PROFILE_DIR，并按数量轮转。
+
+触发方式：
+- Web 请求：携带 `X-Profile: <PROFILE_ADMIN_TOKEN>` 请求头，或按 PROFILE_SAMPLE_RATE 随机采样；
+- 爬虫：设置 PROFILE_CRAWL=1 时分析整轮 `run_crawlers()`。
+两者均未开启时不注册任何钩子，请求路径上没有额外开销。
+"""
+from __future__ import annotations
+
+import glob
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from config import (
+    PROFILE_ADMIN_TOKEN,
+    PROFILE_CRAWL,
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_KEEP,
+    PROFILE_SAMPLE_RATE,
+)
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = max(0.001, interval)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+def _rotate(directory: str, keep: int):
+    files = sorted(glob.glob(os.path.join(directory, "*.folded")), key=os.path.getmtime)
+    for path in files[: max(0, len(files) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def profile(name: str, directory: str = PROFILE_DIR) -> Iterator[SamplingProfiler]:
+    """
+    分析 with 块内当前线程的执行，退出时写出 `<name>-<时间戳>-<pid>-<随机后缀>.folded`。
+    """
+    profiler = SamplingProfiler().start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        path = _write_profile(profiler, name, directory)
+        logger.info("性能分析已写出: %s（%d 个样本）", path, profiler.samples)
+
+
+def _write_profile(profiler: SamplingProfiler, name: str, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    safe_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    filename = f"{safe_name}-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}.folded"
+    path = os.path.join(directory, filename)
+    profiler.write_collapsed(path)
+    _rotate(directory, PROFILE_KEEP)
+    return path
+
+
+@contextmanager
+def maybe_profile_crawl() -> Iterator[None]:
+    if not PROFILE_CRAWL:
+        yield
+        return
+    with profile("crawl"):
+        yield
+
+
+def _request_wants_profile(header_value: Optional[str]) -> bool:
+    if PROFILE_ADMIN_TOKEN and header_value:
+        if hmac.compare_digest(header_value.encode(), PROFILE_ADMIN_TOKEN.encode()):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def init_flask(app: Flask):
+    """
+    未配置管理员令牌且采样率为 0 时直接返回，不注册任何钩子。
+    """
+    if not PROFILE_ADMIN_TOKEN and PROFILE_SAMPLE_RATE <= 0:
+        return
+    from flask import g, request
+
+    def start_profiler():
+        if _request_wants_profile(request.headers.get(PROFILE_HEADER)):
+            g.profiler = SamplingProfiler().start()
+
+    def stop_profiler(exc: Optional[BaseException]):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.stop()
+        name = f"request-{request.endpoint or 'unmatched'}"
+        path = _write_profile(profiler, name, PROFILE_DIR)
+        logger.info("请求性能分析已写出: %s（%d 个样本）", path, profiler.samples)
+
+    app.before_request(start_profiler)
+    app.teardown_request(stop_profiler)
@@ -1,5 +1,7 @@
 """
 AI 模块：每日科技早报 + 幽默辣评推荐。
+
+抓取时已富化的文章直接复用库中的 `ai_comment`，只有尚未富化的文章才在请求时交给 LLM 生成点评。
 """
 from __future__ import annotations
 
@@ -8,56 +10,32 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Sequence, Tuple
 
-from openai import OpenAI
 from pymongo.collection import Collection
 from sqlalchemy import text
 
-from config import LLM_API_KEY, LLM_BASE_URL, LLM_MODEL_NAME
+from affinity import load_user_affinity
 from database import get_mongo_database, mysql_connection
+from llm import call_llm, parse_json_response
+from metrics import MONGO_QUERY_SECONDS
+from models import ARTICLE_PROJECTION, HEADLINE_PROJECTION, Article, decode_articles
 
 logger = logging.getLogger(__name__)
-_llm_client: Optional[OpenAI] = None
+DAILY_FLASH_LLM_FALLBACK = "大家早！资讯火速赶来，但 AI 有点卡壳，稍后再试试 🔧"
 
 
 def _collection() -> Collection:
     return get_mongo_database("tech_crawler")["articles"]
 
 
-def _is_llm_configured() -> bool:
-    token = (LLM_API_KEY or "").strip()
-    return bool(token) and "你的_ModelScope_Token" not in token
-
-
-def get_llm_client() -> OpenAI:
-    global _llm_client
-    if _llm_client is None:
-        if not _is_llm_configured():
-            raise RuntimeError("LLM_API_KEY 未设置或仍为占位符。")
-        _llm_client = OpenAI(base_url=LLM_BASE_URL, api_key=LLM_API_KEY)
-    return _llm_client
-
-
-def _call_llm(messages: List[Dict], max_tokens: int = 600) -> str:
-    client = get_llm_client()
-    response = client.chat.completions.create(
-        model=LLM_MODEL_NAME,
-        stream=False,
-        messages=messages,
-        temperature=0.4,
-        max_tokens=max_tokens,
-        extra_body={"enable_thinking": False},
-    )
-    return response.choices[0].message.content or ""
-
-
 def generate_daily_flash(limit: int = 10) -> str:
     collection = _collection()
-    headlines = [
-        item.get("title", "科技速递")
-        for item in collection.find({"title": {"$ne": None}})
-        .sort("updated_at", -1)
-        .limit(limit)
-    ]
+    with MONGO_QUERY_SECONDS.time(query="daily_flash_headlines"):
+        headlines = [
+            item.get("title", "科技速递")
+            for item in collection.find({"title": {"$ne": None}}, dict(HEADLINE_PROJECTION))
+            .sort("updated_at", -1)
+            .limit(limit)
+        ]
     if not headlines:
         return "大家早！资讯库空空如也，赶紧运行爬虫补货吧 ☕️"
     prompt = (
@@ -67,7 +45,7 @@ def generate_daily_flash(limit: int = 10) -> str:
         "风格要轻松、口语化，用 Emoji，开头说“大家早！”。"
     )
     try:
-        content = _call_llm(
+        content = call_llm(
             [
                 {
                     "role": "system",
@@ -76,15 +54,19 @@ def generate_daily_flash(limit: int = 10) -> str:
                 {"role": "user", "content": prompt},
             ],
             max_tokens=300,
+            operation="daily_flash",
         ).strip()
         if content:
             return content
     except Exception as exc:
         logger.error("生成每日早报失败: %s", exc)
-    return "大家早！资讯火速赶来，但 AI 有点卡壳，稍后再试试 🔧"
+    return DAILY_FLASH_LLM_FALLBACK
 
 
-def _load_user_interests(user_id: str) -> List[str]:
+def load_user_interests(user_id: str) -> List[str]:
+    """
+    读取用户在库中保存的兴趣标签；请求未显式携带兴趣时以此为准，调用方也用它组成缓存键。
+    """
     with mysql_connection() as conn:
         row = conn.execute(
             text("SELECT interests FROM users WHERE user_id = :user_id"),
@@ -99,84 +81,77 @@ def _load_user_interests(user_id: str) -> List[str]:
         return []
 
 
-def _query_articles_by_tags(tags: Sequence[str], limit: int) -> List[Dict]:
-    collection = _collection()
-    cursor = collection.find({"tags": {"$in": list(tags)}}).sort("updated_at", -1).limit(
-        limit
+def _load_affinity_tags(user_id: str, limit: int = 5) -> List[str]:
+    try:
+        return [tag for tag, _ in load_user_affinity(user_id, limit)]
+    except Exception as exc:
+        logger.warning("读取用户亲和度失败: %s", exc)
+        return []
+
+
+def _find_articles(query: Dict, limit: int) -> List[Article]:
+    cursor = (
+        _collection().find(query, dict(ARTICLE_PROJECTION)).sort("updated_at", -1).limit(limit)
     )
-    return list(cursor)
+    return decode_articles(cursor)
 
 
-def _query_hot_articles(limit: int) -> List[Dict]:
-    return list(_collection().find().sort("updated_at", -1).limit(limit))
+def _query_articles_by_tags(tags: Sequence[str], limit: int) -> List[Article]:
+    with MONGO_QUERY_SECONDS.time(query="articles_by_tags"):
+        return _find_articles({"tags": {"$in": list(tags)}}, limit)
 
 
-def _query_mixed_candidates(limit: int) -> List[Dict]:
-    collection = _collection()
+def _query_hot_articles(limit: int) -> List[Article]:
+    with MONGO_QUERY_SECONDS.time(query="hot_articles"):
+        return _find_articles({}, limit)
+
+
+def _query_mixed_candidates(limit: int) -> List[Article]:
     per_source = 5
-    source_lists = {
-        "juejin": list(
-            collection.find({"source": "juejin"}).sort("updated_at", -1).limit(per_source)
-        ),
-        "github": list(
-            collection.find({"source": "github"}).sort("updated_at", -1).limit(per_source)
-        ),
-        "hackernews": list(
-            collection.find({"source": "hackernews"})
-            .sort("updated_at", -1)
-            .limit(per_source)
-        ),
-    }
-
-    def sort_key(doc: Dict):
-        ts = doc.get("updated_at")
-        if isinstance(ts, datetime):
-            return ts
-        if isinstance(ts, str):
-            try:
-                return datetime.fromisoformat(ts)
-            except ValueError:
-                pass
-        return datetime.min
-
-    mixed: List[Dict] = []
+    with MONGO_QUERY_SECONDS.time(query="mixed_candidates"):
+        source_lists = {
+            src: _find_articles({"source": src}, per_source)
+            for src in ("juejin", "github", "hackernews")
+        }
+
+    mixed: List[Article] = []
     for src in ["juejin", "github", "hackernews"]:
         pool = source_lists.get(src) or []
         if pool:
             mixed.append(pool.pop(0))
 
-    remaining: List[Dict] = []
+    remaining: List[Article] = []
     for pool in source_lists.values():
         remaining.extend(pool)
-    remaining.sort(key=sort_key, reverse=True)
+    remaining.sort(key=lambda article: article.updated_at or datetime.min, reverse=True)
 
-    for doc in remaining:
+    for article in remaining:
         if len(mixed) >= limit:
             break
-        mixed.append(doc)
+        mixed.append(article)
 
     if len(mixed) < limit:
         extra = _query_hot_articles(limit * 2)
-        seen_urls = {doc.get("url") for doc in mixed}
-        for doc in extra:
-            if doc.get("url") in seen_urls:
+        seen_urls = {article.url for article in mixed}
+        for article in extra:
+            if article.url in seen_urls:
                 continue
-            mixed.append(doc)
-            seen_urls.add(doc.get("url"))
+            mixed.append(article)
+            seen_urls.add(article.url)
             if len(mixed) >= limit:
                 break
     return mixed[:limit]
 
 
-def _build_late_prompt(candidates: List[Dict], user_tags: List[str]) -> str:
+def _build_late_prompt(candidates: List[Article], user_tags: List[str]) -> str:
     formatted = []
     for idx, article in enumerate(candidates, 1):
         formatted.append(
             f"ID: {idx}\n"
-            f"标题: {article.get('title')}\n"
-            f"简介: {article.get('summary', '') or '暂无简介'}\n"
-            f"标签: {', '.join(article.get('tags', [])) or '无'}\n"
-            f"链接: {article.get('url')}"
+            f"标题: {article.title}\n"
+            f"简介: {article.summary[:200] or '暂无简介'}\n"
+            f"标签: {', '.join(article.tags) or '无'}\n"
+            f"链接: {article.url}"
         )
     instructions = (
         "你是一个毒舌、幽默、调皮的技术大V。"
@@ -190,34 +165,23 @@ def _build_late_prompt(candidates: List[Dict], user_tags: List[str]) -> str:
     )
 
 
-def _parse_json_response(content: str) -> List[Dict]:
-    text = content.strip()
-    if text.startswith("```"):
-        text = text.strip("`")
-        if text.startswith("json"):
-            text = text[4:]
-    try:
-        data = json.loads(text)
-        return data if isinstance(data, list) else []
-    except json.JSONDecodeError as exc:
-        logger.error("LLM JSON 解析失败: %s", exc)
-        return []
-
-
 def recommend_articles(
     user_id: str, interests: Optional[List[str]] = None, limit: int = 9
 ) -> Tuple[List[Dict], Optional[str]]:
-    interests = interests or _load_user_interests(user_id)
-    articles: List[Dict] = []
+    interests = interests or load_user_interests(user_id)
+    # 显式兴趣优先，行为汇总出的亲和标签作为补充召回
+    query_tags = list(interests)
+    query_tags.extend(tag for tag in _load_affinity_tags(user_id) if tag not in query_tags)
+    articles: List[Article] = []
     seen_urls = set()
-    if interests:
-        tagged = _query_articles_by_tags(interests, limit)
+    if query_tags:
+        tagged = _query_articles_by_tags(query_tags, limit)
         articles.extend(tagged)
-        seen_urls.update({item.get("url") for item in tagged if item.get("url")})
+        seen_urls.update({item.url for item in tagged if item.url})
     if len(articles) < limit:
         mixed = _query_mixed_candidates(limit)
         for item in mixed:
-            url = item.get("url")
+            url = item.url
             if url and url in seen_urls:
                 continue
             articles.append(item)
@@ -229,59 +193,66 @@ def recommend_articles(
     if not articles:
         return [], "文章池为空，请运行爬虫。"
 
-    prompt = _build_late_prompt(articles, interests)
+    # 已富化的文章复用库中点评，只把其余文章交给 LLM；全部富化时不再发起请求
+    pending = [idx for idx, article in enumerate(articles, 1) if not article.ai_comment]
+    llm_output: List[Dict] = []
     diagnostic: Optional[str] = None
-    try:
-        raw = _call_llm(
-            [
-                {
-                    "role": "system",
-                    "content": (
-                        "你是一个毒舌、幽默、调皮的技术大V。只回复 JSON，并确保字段齐全。"
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ]
-        )
-        llm_output = _parse_json_response(raw)
-    except RuntimeError as exc:
-        logger.warning("LLM 未配置: %s", exc)
-        llm_output = []
-        diagnostic = "LLM_API_KEY 未配置，已回退至热门推荐。"
-    except Exception as exc:
-        logger.error("LLM 调用失败: %s", exc)
-        llm_output = []
-        diagnostic = "AI 辣评生成失败，暂时展示热门推荐。"
-
+    if pending:
+        prompt = _build_late_prompt([articles[idx - 1] for idx in pending], interests)
+        try:
+            raw = call_llm(
+                [
+                    {
+                        "role": "system",
+                        "content": (
+                            "你是一个毒舌、幽默、调皮的技术大V。只回复 JSON，并确保字段齐全。"
+                        ),
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=60 * len(pending) + 100,
+                operation="recommend",
+            )
+            llm_output = parse_json_response(raw)
+        except RuntimeError as exc:
+            logger.warning("LLM 未配置: %s", exc)
+            diagnostic = "LLM_API_KEY 未配置，已回退至热门推荐。"
+        except Exception as exc:
+            logger.error("LLM 调用失败: %s", exc)
+            diagnostic = "AI 辣评生成失败，暂时展示热门推荐。"
+
+    # 提示词中的 ID 是待生成子集内的序号，映射回候选列表中的位置
     llm_map: Dict[int, Dict] = {}
-    if llm_output:
-        for entry in llm_output:
-            idx = entry.get("index")
-            if not isinstance(idx, int):
-                continue
-            if idx < 1 or idx > len(articles):
-                continue
-            if idx in llm_map:
-                continue
-            llm_map[idx] = entry
+    for entry in llm_output:
+        if not isinstance(entry, dict):
+            continue
+        idx = entry.get("index")
+        if not isinstance(idx, int):
+            continue
+        if idx < 1 or idx > len(pending):
+            continue
+        position = pending[idx - 1]
+        if position in llm_map:
+            continue
+        llm_map[position] = entry
 
     results = []
     for idx, base in enumerate(articles, 1):
         entry = llm_map.get(idx)
-        ai_comment = ""
+        ai_comment = base.ai_comment
         tag_match = None
         if entry:
             ai_comment = entry.get("ai_comment") or ""
             tag_match = entry.get("tag_match")
         if not ai_comment:
-            ai_comment = f"来自{base.get('source','资讯')} 的热门推荐，别错过。"
+            ai_comment = f"来自{base.source or '资讯'} 的热门推荐，别错过。"
         if not tag_match:
             tag_match = _resolve_tag_match(base, interests)
         results.append(
             {
-                "title": base.get("title"),
-                "url": base.get("url"),
-                "top_image": base.get("top_image"),
+                "title": base.title,
+                "url": base.url,
+                "top_image": base.top_image,
                 "ai_comment": ai_comment,
                 "tag_match": tag_match,
             }
@@ -289,10 +260,9 @@ def recommend_articles(
     return results, diagnostic
 
 
-def _resolve_tag_match(article: Dict, interests: Optional[List[str]]) -> str:
-    tags = article.get("tags") or []
+def _resolve_tag_match(article: Article, interests: Optional[List[str]]) -> str:
     if interests:
-        for tag in tags:
+        for tag in article.tags:
             if tag in interests:
                 return tag
     return "热门推荐"
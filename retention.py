@@ -0,0 +1,123 @@
+"""
+文章冷热分层与保留策略。
+
+- 热集合 `articles`：只保留最近 ARTICLE_HOT_DAYS 天更新过的文章，推荐/早报查询只访问热集合。
+- 冷数据：按 `updated_at` 升序批量搬到 `articles_archive` 集合，或写入按日期分文件的 gzip JSONL，
+  写入成功后先标记 `archived_at` 再从热集合删除。TTL 索引只建在 `archived_at` 上，只会清理已归档、
+  但删除步骤被中断而残留的文章；未归档的文章不会被 TTL 删除，归档任务停摆时热集合会持续增长，
+  需要监控归档任务。
+
+用法：
+    python retention.py                 # 按配置归档一次
+    python retention.py --mode file     # 归档到 ARTICLE_ARCHIVE_DIR 下的 .jsonl.gz
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from bson import json_util
+from pymongo import ReplaceOne
+
+from config import (
+    ARTICLE_ARCHIVE_BATCH,
+    ARTICLE_ARCHIVE_DIR,
+    ARTICLE_ARCHIVE_MODE,
+    ARTICLE_HOT_DAYS,
+)
+from database import get_mongo_database
+from models import ARCHIVED_AT_FIELD
+from pool_meta import bump_pool_version
+
+logger = logging.getLogger(__name__)
+
+HOT_COLLECTION = "articles"
+ARCHIVE_COLLECTION = "articles_archive"
+TTL_INDEX_NAME = "ttl_archived_at"
+# 旧版本在 updated_at 上建的 TTL 索引，会删除尚未归档的文章
+LEGACY_TTL_INDEX_NAME = "ttl_updated_at"
+
+
+def _db():
+    return get_mongo_database("tech_crawler")
+
+
+def ensure_ttl_index():
+    """
+    创建热集合的归档相关索引：`updated_at` 普通索引服务排序与归档扫描，
+    `archived_at` 上的 TTL 索引只清理已归档的残留文章；同时移除旧版 `updated_at` TTL 索引。
+    """
+    hot = _db()[HOT_COLLECTION]
+    if LEGACY_TTL_INDEX_NAME in hot.index_information():
+        hot.drop_index(LEGACY_TTL_INDEX_NAME)
+    hot.create_index("updated_at")
+    hot.create_index(ARCHIVED_AT_FIELD, name=TTL_INDEX_NAME, expireAfterSeconds=0)
+
+
+def _archive_to_collection(docs: List[Dict]):
+    operations = []
+    for doc in docs:
+        archived = {key: value for key, value in doc.items() if key != "_id"}
+        operations.append(ReplaceOne({"url": doc["url"]}, archived, upsert=True))
+    _db()[ARCHIVE_COLLECTION].bulk_write(operations, ordered=False)
+
+
+def _archive_to_file(docs: List[Dict], directory: str):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"articles-{datetime.utcnow():%Y%m%d}.jsonl.gz")
+    # 以追加方式写入新的 gzip 成员，多次归档同一天的文件仍可被 gzip 整体解压
+    with gzip.open(path, "at", encoding="utf-8") as fh:
+        for doc in docs:
+            archived = {key: value for key, value in doc.items() if key != "_id"}
+            fh.write(json_util.dumps(archived, ensure_ascii=False) + "\n")
+
+
+def archive_cold_articles(
+    hot_days: int = ARTICLE_HOT_DAYS,
+    mode: str = ARTICLE_ARCHIVE_MODE,
+    batch_size: int = ARTICLE_ARCHIVE_BATCH,
+    directory: str = ARTICLE_ARCHIVE_DIR,
+) -> int:
+    """
+    把超过热窗口的文章批量移出热集合，返回归档条数。
+    """
+    if mode not in ("collection", "file"):
+        raise ValueError(f"未知归档模式: {mode}")
+    hot = _db()[HOT_COLLECTION]
+    cutoff = datetime.utcnow() - timedelta(days=hot_days)
+    archived = 0
+    while True:
+        docs = list(
+            hot.find({"updated_at": {"$lt": cutoff}}).sort("updated_at", 1).limit(batch_size)
+        )
+        if not docs:
+            break
+        if mode == "collection":
+            _archive_to_collection(docs)
+        else:
+            _archive_to_file(docs, directory)
+        # 归档期间被爬虫重新写入（updated_at 已刷新）的文章保留在热集合；
+        # 先打标记，删除中断时由 TTL 清理已归档的残留，爬虫重新写入会清除标记
+        still_cold = {"_id": {"$in": [doc["_id"] for doc in docs]}, "updated_at": {"$lt": cutoff}}
+        hot.update_many(still_cold, {"$set": {ARCHIVED_AT_FIELD: datetime.utcnow()}})
+        hot.delete_many({**still_cold, ARCHIVED_AT_FIELD: {"$exists": True}})
+        archived += len(docs)
+        if len(docs) < batch_size:
+            break
+    if archived:
+        bump_pool_version(removed=archived)
+        logger.info("已归档 %d 篇冷文章（%s）。", archived, mode)
+    return archived
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="文章冷热分层归档")
+    parser.add_argument("--hot-days", type=int, default=ARTICLE_HOT_DAYS)
+    parser.add_argument("--mode", choices=("collection", "file"), default=ARTICLE_ARCHIVE_MODE)
+    args = parser.parse_args()
+    archive_cold_articles(hot_days=args.hot_days, mode=args.mode)
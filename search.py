@@ -0,0 +1,347 @@
+"""
+文章全文检索：进程内 BM25 倒排索引。
+
+- 分词：英文/数字按词切分并转小写；连续的中日韩字符切成二元组（单字时保留单字），
+  文档侧另外索引每个单字，单字查询也能命中。
+- 召回：低频词的倒排表完整参与召回，不足 limit 时补充高频词的得分头部。
+- 存储：删除文章后空出的文档槽位由后续写入复用，各数组长度不超过历史最大文章数。
+- 字段：标题权重 2，摘要与标签权重 1；来源、标签另建过滤用的倒排集合。
+- 维护：首次查询时全量加载热集合；之后按文章池版本增量拉取服务端变更时间 `changed_at`
+  不早于已见最大值减 SEARCH_DELTA_OVERLAP 秒的文章（重叠部分按 URL 覆盖），
+  同进程内的爬虫写入时直接更新索引。只有文章被归档（`removed_total` 变化）、导入了快照
+  （`rebuild_total` 变化）或距上次全量超过 SEARCH_REBUILD_INTERVAL 时才整体重建，普通查询不会重建索引。
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from config import (
+    SEARCH_DELTA_OVERLAP,
+    SEARCH_MAX_LIMIT,
+    SEARCH_REBUILD_INTERVAL,
+    SEARCH_REFRESH_INTERVAL,
+)
+from database import get_mongo_database
+from metrics import REGISTRY
+from models import ARTICLE_PROJECTION, CHANGED_AT_FIELD, Article
+from pool_meta import get_pool_state
+
+logger = logging.getLogger(__name__)
+
+SEARCH_QUERY_SECONDS = REGISTRY.histogram(
+    "search_query_duration_seconds", "全文检索单次查询耗时（不含索引刷新）。"
+)
+SEARCH_INDEX_DOCS = REGISTRY.gauge("search_index_documents", "全文检索索引中的文章数。")
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[+#]+)?|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_CJK_START = "\u3400"
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 文档频率超过该比例的高频词不做全量倒排扫描，只取按得分贡献排序的前 COMMON_TERM_HEAD 篇作为候选
+COMMON_TERM_RATIO = 0.02
+COMMON_TERM_HEAD = 1000
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """
+    查询侧只切二元组；`unigrams=True`（文档侧）时多段中文再额外产出单字，供单字查询命中。
+    """
+    tokens: List[str] = []
+    for match in _WORD_RE.findall((text or "").lower()):
+        if match[0] < _CJK_START:
+            tokens.append(match)
+        elif len(match) == 1:
+            tokens.append(match)
+        else:
+            tokens.extend(match[i : i + 2] for i in range(len(match) - 1))
+            if unigrams:
+                tokens.extend(match)
+    return tokens
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._docs: List[Optional[Article]] = []
+        self._doc_terms: List[Optional[Counter]] = []
+        self._doc_len: List[int] = []
+        self._norms: List[float] = []
+        self._norms_dirty = False
+        self._heads: Dict[str, List[int]] = {}
+        self._free: List[int] = []
+        self._by_url: Dict[str, int] = {}
+        self._by_source: Dict[str, Set[int]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[int]] = defaultdict(set)
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._by_url)
+
+    def upsert(self, article: Article):
+        if not article.url:
+            return
+        terms = Counter(tokenize(article.title, unigrams=True) * TITLE_WEIGHT)
+        terms.update(tokenize(article.summary, unigrams=True))
+        terms.update(tokenize(article.ai_summary, unigrams=True))
+        for tag in article.tags:
+            terms.update(tokenize(tag, unigrams=True))
+        with self._lock:
+            self._remove(article.url)
+            length = sum(terms.values())
+            if self._free:
+                doc_id = self._free.pop()
+                self._docs[doc_id] = article
+                self._doc_terms[doc_id] = terms
+                self._doc_len[doc_id] = length
+            else:
+                doc_id = len(self._docs)
+                self._docs.append(article)
+                self._doc_terms.append(terms)
+                self._doc_len.append(length)
+                self._norms.append(0.0)
+            self._total_len += length
+            self._by_url[article.url] = doc_id
+            for term, tf in terms.items():
+                self._postings[term][doc_id] = tf
+            if article.source:
+                self._by_source[article.source].add(doc_id)
+            for tag in article.tags:
+                self._by_tag[tag].add(doc_id)
+            self._norms_dirty = True
+
+    def remove(self, url: str):
+        with self._lock:
+            self._remove(url)
+
+    def _remove(self, url: str):
+        doc_id = self._by_url.pop(url, None)
+        if doc_id is None:
+            return
+        article, terms = self._docs[doc_id], self._doc_terms[doc_id]
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._by_source.get(article.source, set()).discard(doc_id)
+        for tag in article.tags:
+            self._by_tag.get(tag, set()).discard(doc_id)
+        self._total_len -= self._doc_len[doc_id]
+        self._docs[doc_id] = None
+        self._doc_terms[doc_id] = None
+        self._doc_len[doc_id] = 0
+        self._free.append(doc_id)
+        self._norms_dirty = True
+
+    def _refresh_norms(self):
+        # 平均文档长度随写入变化，长度归一化因子在写入后的首次查询时统一重算
+        avg_len = self._total_len / max(len(self._by_url), 1)
+        scale = BM25_K1 * BM25_B / max(avg_len, 1e-9)
+        base = BM25_K1 * (1 - BM25_B)
+        self._norms = [base + scale * length for length in self._doc_len]
+        self._norms_dirty = False
+        self._heads.clear()
+
+    def _head(self, term: str, postings: Dict[int, int]) -> List[int]:
+        head = self._heads.get(term)
+        if head is None:
+            norms = self._norms
+            best = heapq.nlargest(
+                COMMON_TERM_HEAD,
+                postings.items(),
+                key=lambda item: item[1] / (item[1] + norms[item[0]]),
+            )
+            head = self._heads[term] = [doc_id for doc_id, _ in best]
+        return head
+
+    def _allowed(self, source: Optional[str], tags: Sequence[str]) -> Optional[Set[int]]:
+        allowed: Optional[Set[int]] = None
+        if source:
+            allowed = set(self._by_source.get(source, ()))
+        if tags:
+            tagged: Set[int] = set()
+            for tag in tags:
+                tagged |= self._by_tag.get(tag, set())
+            allowed = tagged if allowed is None else allowed & tagged
+        return allowed
+
+    def search(
+        self,
+        query: str,
+        source: Optional[str] = None,
+        tags: Sequence[str] = (),
+        limit: int = 20,
+    ) -> List[Tuple[Article, float]]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            if self._norms_dirty:
+                self._refresh_norms()
+            allowed = self._allowed(source, tags)
+            if allowed is not None and not allowed:
+                return []
+            total = len(self._by_url)
+            common_df = max(COMMON_TERM_HEAD, total * COMMON_TERM_RATIO)
+            matched = [(term, self._postings[term]) for term in terms if term in self._postings]
+            rare = [(term, postings) for term, postings in matched if len(postings) <= common_df]
+            common = [(term, postings) for term, postings in matched if len(postings) > common_df]
+            # 低频词的倒排表完整参与召回；不足 limit 时补充各高频词的得分头部，带过滤仍不足再扫描过滤集合
+            candidates: Set[int] = set()
+            for _, postings in rare:
+                candidates.update(postings)
+            if allowed is not None:
+                candidates &= allowed
+            if len(candidates) < limit and common:
+                for term, postings in common:
+                    head = self._head(term, postings)
+                    candidates.update(
+                        head if allowed is None else (doc_id for doc_id in head if doc_id in allowed)
+                    )
+                if allowed is not None and len(candidates) < limit:
+                    candidates = set(allowed)
+            scores = self._score(candidates, matched, total)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._docs[doc_id], score) for doc_id, score in best]
+
+    def _score(
+        self, candidates: Set[int], matched: List[Tuple[str, Dict[int, int]]], total: int
+    ) -> Dict[int, float]:
+        norms = self._norms
+        k1_plus = BM25_K1 + 1
+        scores: Dict[int, float] = defaultdict(float)
+        for _, postings in matched:
+            df = len(postings)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            if len(candidates) < df:
+                for doc_id in candidates:
+                    tf = postings.get(doc_id)
+                    if tf:
+                        scores[doc_id] += idf * tf * k1_plus / (tf + norms[doc_id])
+            else:
+                for doc_id, tf in postings.items():
+                    if doc_id in candidates:
+                        scores[doc_id] += idf * tf * k1_plus / (tf + norms[doc_id])
+        return scores
+
+
+class PoolSearch:
+    """
+    把 SearchIndex 与 Mongo 中的文章池保持同步。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.index: Optional[SearchIndex] = None
+        self._version = -1
+        self._removed_total = -1
+        self._rebuild_total = -1
+        self._max_changed_at: Optional[datetime] = None
+        self._built_at = 0.0
+
+    def _collection(self):
+        return get_mongo_database("tech_crawler")["articles"]
+
+    def _load(self, index: SearchIndex, query: Dict):
+        projection = {**ARTICLE_PROJECTION, CHANGED_AT_FIELD: 1}
+        for doc in self._collection().find(query, projection):
+            index.upsert(Article.from_doc(doc))
+            changed_at = doc.get(CHANGED_AT_FIELD)
+            if changed_at and (self._max_changed_at is None or changed_at > self._max_changed_at):
+                self._max_changed_at = changed_at
+
+    def _rebuild(self):
+        started = time.perf_counter()
+        self._max_changed_at = None
+        index = SearchIndex()
+        self._load(index, {})
+        self.index = index
+        self._built_at = time.monotonic()
+        SEARCH_INDEX_DOCS.set(len(index))
+        logger.info(
+            "搜索索引已重建：%d 篇文章，耗时 %.2fs", len(index), time.perf_counter() - started
+        )
+
+    def refresh(self) -> SearchIndex:
+        state = get_pool_state(SEARCH_REFRESH_INTERVAL)
+        index = self.index
+        if (
+            index is not None
+            and state.version == self._version
+            and time.monotonic() - self._built_at < SEARCH_REBUILD_INTERVAL
+        ):
+            return index
+        with self._lock:
+            if (
+                self.index is None
+                or state.removed_total != self._removed_total
+                or state.rebuild_total != self._rebuild_total
+                or time.monotonic() - self._built_at >= SEARCH_REBUILD_INTERVAL
+            ):
+                self._rebuild()
+            elif state.version != self._version:
+                query = {}
+                if self._max_changed_at is not None:
+                    since = self._max_changed_at - timedelta(seconds=SEARCH_DELTA_OVERLAP)
+                    query = {CHANGED_AT_FIELD: {"$gte": since}}
+                self._load(self.index, query)
+                SEARCH_INDEX_DOCS.set(len(self.index))
+            self._version = state.version
+            self._removed_total = state.removed_total
+            self._rebuild_total = state.rebuild_total
+            return self.index
+
+    def index_articles(self, articles: Iterable[Article]):
+        index = self.index
+        if index is None:
+            return
+        with self._lock:
+            # 本地写入拿不到服务端变更时间，不推进增量水位；下次增量拉取会按 URL 覆盖这些文章
+            for article in articles:
+                index.upsert(article)
+            SEARCH_INDEX_DOCS.set(len(index))
+
+
+_pool_search = PoolSearch()
+
+
+def index_articles(articles: Iterable[Article]):
+    """
+    爬虫写入路径调用：本进程已加载索引时直接增量更新，否则不做任何事。
+    """
+    _pool_search.index_articles(articles)
+
+
+def search_articles(
+    query: str,
+    source: Optional[str] = None,
+    tags: Sequence[str] = (),
+    limit: int = 20,
+) -> List[Dict]:
+    index = _pool_search.refresh()
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    with SEARCH_QUERY_SECONDS.time():
+        hits = index.search(query, source=source, tags=tags, limit=limit)
+    return [
+        {
+            "title": article.title,
+            "url": article.url,
+            "top_image": article.top_image,
+            "source": article.source,
+            "tags": list(article.tags),
+            "summary": (article.summary or article.ai_summary)[:160],
+            "score": round(score, 4),
+        }
+        for article, score in hits
+    ]
@@ -5,16 +5,42 @@ from __future__ import annotations
 
 import json
 import os
+from urllib.parse import urlsplit
 from typing import Dict, List, Tuple
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, redirect, render_template, request, send_file
 from sqlalchemy import text
 
-from crawler import JUEJIN_URLS
+from config import EVENTS_MAX_CONNECTIONS, IMAGE_FAILURE_TTL, STATIC_MAX_AGE
 from database import mysql_connection
-from recommender import generate_daily_flash, recommend_articles
+from affinity import get_affinity_version
+from events import get_event_hub, stream_events
+from http_cache import conditional_json, init_app as init_http_cache, make_etag
+from log_buffer import get_user_log_buffer, log_user_action
+from metrics import instrument_flask
+from pool_meta import get_pool_version
+from profiler import init_flask as init_profiler
+from recommender import (
+    DAILY_FLASH_LLM_FALLBACK,
+    generate_daily_flash,
+    load_user_interests,
+    recommend_articles,
+)
+from search import search_articles
+from sources import SOURCE_TAGS
+from thumbnails import (
+    ImageFetchError,
+    get_thumbnail,
+    placeholder_path,
+    placeholder_seed,
+    placeholder_svg,
+)
 
 app = Flask(__name__)
+# 指标钩子必须最先注册：after_request 逆序执行，计时才能覆盖压缩等后处理
+instrument_flask(app)
+init_http_cache(app)
+init_profiler(app)
 
 
 def _fetch_users() -> List[Dict]:
@@ -40,8 +66,7 @@ def _available_tags(users: List[Dict]) -> List[str]:
     tags = set()
     for user in users:
         tags.update(user.get("interests", []))
-    tags.update(JUEJIN_URLS.keys())
-    tags.update({"GitHub Trending", "Python", "Java", "Javascript", "Hacker News"})
+    tags.update(SOURCE_TAGS)
     return sorted(tag for tag in tags if tag)
 
 
@@ -61,22 +86,104 @@ def index():
 
 @app.get("/api/daily_flash")
 def api_daily_flash():
-    message = generate_daily_flash()
-    return jsonify({"message": message})
+    etag = make_etag("daily_flash", get_pool_version())
+    return conditional_json(
+        etag,
+        lambda: {"message": generate_daily_flash()},
+        cacheable=lambda payload: payload["message"] != DAILY_FLASH_LLM_FALLBACK,
+    )
 
 
 @app.post("/api/recommend")
 def api_recommend():
     payload = request.get_json(force=True) or {}
     user_id = payload.get("user_id")
-    interests = payload.get("interests") or []
     if not user_id:
         return jsonify({"message": "缺少 user_id"}), 400
-    items, diagnostic = recommend_articles(user_id, interests)
-    response = {"items": items}
-    if diagnostic:
-        response["message"] = diagnostic
-    return jsonify(response)
+    # 未携带兴趣时按库中兴趣推荐，ETag 也须随之变化；亲和度汇总推进后同样失效
+    interests = payload.get("interests") or load_user_interests(user_id)
+    etag = make_etag(
+        "recommend", get_pool_version(), get_affinity_version(), user_id, *sorted(interests)
+    )
+
+    def build() -> Dict:
+        items, diagnostic = recommend_articles(user_id, interests)
+        response = {"items": items}
+        if diagnostic:
+            response["message"] = diagnostic
+        return response
+
+    # 带诊断信息说明走了降级路径，不允许客户端复用
+    return conditional_json(etag, build, cacheable=lambda payload: "message" not in payload)
+
+
+@app.get("/api/search")
+def api_search():
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"message": "缺少查询词 q"}), 400
+    source = request.args.get("source") or None
+    tags = [tag.strip() for tag in (request.args.get("tags") or "").split(",") if tag.strip()]
+    limit = request.args.get("limit", 20, type=int)
+    etag = make_etag("search", get_pool_version(), query, source or "", limit, *sorted(tags))
+    return conditional_json(
+        etag,
+        lambda: {"query": query, "items": search_articles(query, source, tags, limit)},
+    )
+
+
+@app.get("/api/events")
+def api_events():
+    """
+    SSE 推送新文章；`tags` 为逗号分隔的兴趣标签，为空时推送全部新文章。
+    """
+    if get_event_hub().connections() >= EVENTS_MAX_CONNECTIONS:
+        response = jsonify({"message": "推送连接数已满，请稍后重试"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+    tags = [tag.strip() for tag in (request.args.get("tags") or "").split(",") if tag.strip()]
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    response = Response(stream_events(tags, last_event_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # 关闭 Nginx 等反向代理的响应缓冲，事件才能即时到达浏览器
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _immutable(response: Response, max_age: int = STATIC_MAX_AGE) -> Response:
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = max_age == STATIC_MAX_AGE
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+@app.get("/img/placeholder/<seed>.svg")
+def img_placeholder(seed: str):
+    return _immutable(Response(placeholder_svg(seed), mimetype="image/svg+xml"))
+
+
+@app.get("/img/thumb")
+def img_thumb():
+    url = (request.args.get("url") or "").strip()
+    if not url:
+        return jsonify({"message": "缺少图片地址 url"}), 400
+    seed = placeholder_seed(url)
+    if seed is not None:
+        return _immutable(redirect(placeholder_path(seed), code=301))
+    try:
+        path, mimetype = get_thumbnail(url, request.args.get("w", type=int))
+    except ImageFetchError as exc:
+        app.logger.warning("图片代理失败: %s", exc)
+        # 失败结果只短暂缓存（与进程内失败缓存同周期），源站恢复后可重新回源
+        seed = urlsplit(url).hostname or "tech"
+        fallback = Response(placeholder_svg(seed), mimetype="image/svg+xml")
+        return _immutable(fallback, max_age=int(IMAGE_FAILURE_TTL))
+    # 缓存文件名即内容键；命中时会刷新 mtime（LRU），不能用默认的 mtime 派生 ETag
+    etag = os.path.splitext(os.path.basename(path))[0]
+    return _immutable(send_file(path, mimetype=mimetype, conditional=True, etag=etag))
 
 
 @app.post("/api/log_action")
@@ -88,19 +195,15 @@ def api_log_action():
     action = payload.get("action", "like")
     if not all([user_id, url, title]):
         return jsonify({"message": "缺少必要字段"}), 400
-    with mysql_connection() as conn:
-        conn.execute(
-            text(
-                """
-                INSERT INTO user_logs (user_id, article_title, article_url, action_type)
-                VALUES (:user_id, :title, :url, :action)
-                """
-            ),
-            {"user_id": user_id, "title": title, "url": url, "action": action},
-        )
+    log_user_action(user_id, title, url, action)
     return jsonify({"status": "ok"})
 
 
+@app.get("/api/log_stats")
+def api_log_stats():
+    return jsonify(get_user_log_buffer().stats())
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8501"))
     app.run(host="0.0.0.0", port=port, debug=True)
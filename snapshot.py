@@ -0,0 +1,313 @@
+"""
+文章池快照：把 `articles` 集合导出为分片的 gzip JSONL + manifest，并可高吞吐地导回。
+
+- 导出：按 `_id` 顺序流式读取，每 SNAPSHOT_CHUNK_SIZE 篇一个 `articles-NNNNN.jsonl.gz` 分片
+  （bson json_util 编码，保留 datetime）；全部分片写完后才原子写入 `manifest.json`，
+  其中记录篇数、字段集合、最大 `updated_at` 与各分片的篇数/字节数/sha256，缺少 manifest 即为不完整快照。
+- 导入：先校验全部分片的 sha256，再按 `Article.to_upsert()`（与爬虫相同的按 url 幂等写入语义）
+  生成 UpdateOne，每 SNAPSHOT_BATCH_SIZE 篇一次无序 bulk_write，多个分片并行写入；
+  默认保留全部索引；`--defer-indexes` 时除 `_id` 与 `url` 唯一索引外的二级索引（含 TTL 索引）
+  在导入前删除、导入后按原定义重建。
+  导入不发布新文章事件、不触发富化，结束后递增池版本并标记整池重写（派生索引全量重建）。
+
+`--defer-indexes` 期间推荐查询会退化为全表扫描、TTL 清理暂停，只应用于空库（新部署/测试环境预热）。
+
+用法：
+    python snapshot.py export --dir data/snapshots/20240101
+    python snapshot.py import --dir data/snapshots/20240101 [--rebase-now] [--defer-indexes]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import json_util
+from pymongo import IndexModel, UpdateOne
+
+from config import (
+    SNAPSHOT_BATCH_SIZE,
+    SNAPSHOT_CHUNK_SIZE,
+    SNAPSHOT_DIR,
+    SNAPSHOT_IMPORT_WORKERS,
+)
+from database import get_mongo_database
+from models import Article
+from pool_meta import bump_pool_version, get_pool_version
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_FORMAT = "articles-jsonl-gzip"
+SNAPSHOT_VERSION = 1
+# --rebase-now 时除全部 datetime 字段（updated_at、enriched_at 等）外，一并平移的 ISO 字符串时间字段
+_ISO_TIME_FIELDS = ("publish_date",)
+
+
+def _collection():
+    return get_mongo_database("tech_crawler")["articles"]
+
+
+def _file_digest(path: str) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def _write_chunk(directory: str, index: int, docs: List[Dict]) -> Dict:
+    name = f"articles-{index:05d}.jsonl.gz"
+    path = os.path.join(directory, name)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as fh:
+        for doc in docs:
+            fh.write(json_util.dumps(doc, ensure_ascii=False) + "\n")
+    size, sha256 = _file_digest(path)
+    return {"file": name, "count": len(docs), "bytes": size, "sha256": sha256}
+
+
+def export_snapshot(directory: str, chunk_size: int = SNAPSHOT_CHUNK_SIZE) -> Dict:
+    """
+    把当前文章池导出到 `directory`（必须不存在或为空），返回写入的 manifest。
+
+    导出期间爬虫的并发写入可能部分可见；需要严格一致时请在爬虫停止时导出。
+    """
+    if os.path.isdir(directory) and os.listdir(directory):
+        raise FileExistsError(f"快照目录非空: {directory}")
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    pool_version = get_pool_version(max_age=0)
+    chunks: List[Dict] = []
+    fields = set()
+    max_updated_at: Optional[datetime] = None
+    buffer: List[Dict] = []
+    cursor = _collection().find({}, {"_id": 0}).sort("_id", 1).batch_size(1000)
+    for doc in cursor:
+        fields.update(doc)
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, datetime) and (
+            max_updated_at is None or updated_at > max_updated_at
+        ):
+            max_updated_at = updated_at
+        buffer.append(doc)
+        if len(buffer) >= chunk_size:
+            chunks.append(_write_chunk(directory, len(chunks), buffer))
+            buffer = []
+    if buffer:
+        chunks.append(_write_chunk(directory, len(chunks), buffer))
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "collection": "articles",
+        "created_at": datetime.utcnow().isoformat(),
+        "pool_version": pool_version,
+        "count": sum(chunk["count"] for chunk in chunks),
+        "fields": sorted(fields),
+        "max_updated_at": max_updated_at.isoformat() if max_updated_at else None,
+        "chunks": chunks,
+    }
+    # manifest 最后写入并原子替换：中途失败的导出没有 manifest，导入时会直接报错
+    tmp_path = os.path.join(directory, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+    logger.info(
+        "快照已导出：%d 篇文章，%d 个分片，耗时 %.2fs",
+        manifest["count"],
+        len(chunks),
+        time.perf_counter() - started,
+    )
+    return manifest
+
+
+def load_manifest(directory: str, verify: bool = True) -> Dict:
+    """
+    读取 manifest；`verify=True` 时逐个校验分片的字节数与 sha256。
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"缺少 {MANIFEST_NAME}，快照不完整: {directory}")
+    with open(path, encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"不支持的快照格式: {manifest.get('format')} v{manifest.get('version')}"
+        )
+    if verify:
+        for chunk in manifest["chunks"]:
+            size, sha256 = _file_digest(os.path.join(directory, chunk["file"]))
+            if size != chunk["bytes"] or sha256 != chunk["sha256"]:
+                raise ValueError(f"快照分片校验失败: {chunk['file']}")
+    return manifest
+
+
+def _read_chunk(directory: str, chunk: Dict) -> Iterable[Dict]:
+    with gzip.open(os.path.join(directory, chunk["file"]), "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json_util.loads(line)
+
+
+def _shift_times(doc: Dict, offset: timedelta):
+    """
+    整体平移文档中的时间，保持文章之间与字段之间（publish_date ≤ updated_at）的相对先后。
+    """
+    for field, value in doc.items():
+        if isinstance(value, datetime):
+            doc[field] = value + offset
+    for field in _ISO_TIME_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, str):
+            try:
+                doc[field] = (datetime.fromisoformat(value) + offset).isoformat()
+            except ValueError:
+                pass
+
+
+def _to_operation(doc: Dict, offset: timedelta) -> UpdateOne:
+    doc.pop("_id", None)
+    if offset:
+        _shift_times(doc, offset)
+    query, update = Article.from_doc(doc).to_upsert()
+    # Article 之外的字段（ai_tags、enriched_at 等）原样写回
+    update["$set"].update({key: value for key, value in doc.items() if key not in Article._fields})
+    return UpdateOne(query, update, upsert=True)
+
+
+def _import_chunk(
+    directory: str, chunk: Dict, batch_size: int, offset: timedelta
+) -> Tuple[int, int]:
+    collection = _collection()
+    inserted = updated = 0
+    operations: List[UpdateOne] = []
+
+    def flush():
+        nonlocal inserted, updated
+        result = collection.bulk_write(operations, ordered=False)
+        inserted += result.upserted_count
+        updated += result.matched_count
+        operations.clear()
+
+    for doc in _read_chunk(directory, chunk):
+        operations.append(_to_operation(doc, offset))
+        if len(operations) >= batch_size:
+            flush()
+    if operations:
+        flush()
+    return inserted, updated
+
+
+def _drop_secondary_indexes(collection) -> List[IndexModel]:
+    """
+    删除除 `_id` 与 `url` 唯一索引之外的索引，返回可原样重建的定义；
+    url 索引是逐条 upsert 的查找路径，必须保留。
+    """
+    deferred = []
+    for name, info in collection.index_information().items():
+        key = info["key"]
+        if name == "_id_" or list(key) == [("url", 1)]:
+            continue
+        options = {
+            option: value for option, value in info.items() if option not in ("key", "v", "ns")
+        }
+        deferred.append(IndexModel(key, name=name, **options))
+        collection.drop_index(name)
+    return deferred
+
+
+def import_snapshot(
+    directory: str,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+    workers: int = SNAPSHOT_IMPORT_WORKERS,
+    defer_indexes: bool = False,
+    rebase_now: bool = False,
+) -> Dict:
+    """
+    把快照按 url 幂等写回 `articles`，返回导入统计。
+
+    `rebase_now=True` 时把时间字段整体平移到「最新一篇 = 现在」，旧快照导入后不会立即被冷热归档或 TTL 清除。
+    `defer_indexes=True` 会删除包括 TTL 在内的二级索引直到导入结束，只应用于空库。
+    """
+    manifest = load_manifest(directory)
+    offset = timedelta(0)
+    if rebase_now and manifest.get("max_updated_at"):
+        offset = datetime.utcnow() - datetime.fromisoformat(manifest["max_updated_at"])
+    collection = _collection()
+    collection.create_index("url", unique=True)
+    started = time.perf_counter()
+    deferred = _drop_secondary_indexes(collection) if defer_indexes else []
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            results = list(
+                pool.map(
+                    lambda chunk: _import_chunk(directory, chunk, batch_size, offset),
+                    manifest["chunks"],
+                )
+            )
+        load_seconds = time.perf_counter() - started
+    finally:
+        # 导入失败也要恢复索引，否则查询会一直全表扫描
+        if deferred:
+            collection.create_indexes(deferred)
+    total_seconds = time.perf_counter() - started
+    inserted = sum(result[0] for result in results)
+    updated = sum(result[1] for result in results)
+    bump_pool_version(changed=inserted + updated, rebuild=True)
+    stats = {
+        "count": manifest["count"],
+        "inserted": inserted,
+        "updated": updated,
+        "deferred_indexes": [model.document["name"] for model in deferred],
+        "load_seconds": round(load_seconds, 3),
+        "index_seconds": round(total_seconds - load_seconds, 3),
+        "docs_per_second": round(manifest["count"] / max(total_seconds, 1e-9), 1),
+    }
+    logger.info(
+        "快照已导入：新增 %d 篇，更新 %d 篇，耗时 %.2fs（其中重建索引 %.2fs）",
+        inserted,
+        updated,
+        total_seconds,
+        stats["index_seconds"],
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="文章池快照导出/导入")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="导出文章池")
+    export_parser.add_argument(
+        "--dir", default=os.path.join(SNAPSHOT_DIR, f"{datetime.utcnow():%Y%m%d-%H%M%S}")
+    )
+    export_parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE)
+    import_parser = commands.add_parser("import", help="导入快照")
+    import_parser.add_argument("--dir", required=True)
+    import_parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE)
+    import_parser.add_argument("--workers", type=int, default=SNAPSHOT_IMPORT_WORKERS)
+    import_parser.add_argument(
+        "--defer-indexes", action="store_true", help="导入期间删除二级索引、结束后重建（仅限空库）"
+    )
+    import_parser.add_argument("--rebase-now", action="store_true", help="把时间字段平移到当前时间")
+    args = parser.parse_args()
+    if args.command == "export":
+        manifest = export_snapshot(args.dir, args.chunk_size)
+        print(f"快照已导出到 {args.dir}：{manifest['count']} 篇，{len(manifest['chunks'])} 个分片")
+    else:
+        stats = import_snapshot(
+            args.dir,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            defer_indexes=args.defer_indexes,
+            rebase_now=args.rebase_now,
+        )
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
@@ -0,0 +1,49 @@
+"""
+资讯源与标签注册表。
+
+只包含纯数据常量，不依赖任何爬虫组件，Web 进程可以直接导入而不会拉起 Selenium/Requests。
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+from config import GITHUB_BASE_URL, HACKER_NEWS_API
+
+# 掘金网页版分类地址
+JUEJIN_URLS = {
+    "后端": "https://juejin.cn/backend",
+    "前端": "https://juejin.cn/frontend",
+    "AI": "https://juejin.cn/ai",
+    "Android": "https://juejin.cn/android",
+}
+
+GITHUB_TRENDING_URLS = {
+    "all": f"{GITHUB_BASE_URL}/trending",
+    "python": f"{GITHUB_BASE_URL}/trending/python",
+    "java": f"{GITHUB_BASE_URL}/trending/java",
+    "javascript": f"{GITHUB_BASE_URL}/trending/javascript",
+}
+HACKER_NEWS_TOP = f"{HACKER_NEWS_API}/topstories.json"
+
+
+def hacker_news_item_url(story_id: int) -> str:
+    return f"{HACKER_NEWS_API}/item/{story_id}.json"
+
+
+def github_label_tag(label: str) -> str:
+    return label.capitalize()
+
+
+# 主题标签词表：文章富化时 LLM 只能从中选择，保证与用户兴趣标签可直接匹配
+TOPIC_TAGS: Tuple[str, ...] = (
+    *JUEJIN_URLS.keys(),
+    *(github_label_tag(label) for label in GITHUB_TRENDING_URLS if label != "all"),
+)
+
+# 爬虫会写入文章的全部标签，前端用它生成兴趣复选框
+SOURCE_TAGS: Tuple[str, ...] = (
+    *JUEJIN_URLS.keys(),
+    "GitHub Trending",
+    *(github_label_tag(label) for label in GITHUB_TRENDING_URLS if label != "all"),
+    "Hacker News",
+)
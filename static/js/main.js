@@ -1,9 +1,15 @@
 const users = window.APP_USERS || [];
+// 推荐结果按「用户 + 兴趣组合」缓存，配合服务端 ETag 做条件请求
+const recommendCache = new Map();
+// 新文章推送卡片数上限，超出后移除最旧的卡片
+const MAX_CARDS = 30;
+let eventSource = null;
 
 document.addEventListener("DOMContentLoaded", () => {
   syncUserInterests();
   bindEvents();
   fetchDailyFlash();
+  subscribeNewArticles();
 });
 
 function bindEvents() {
@@ -11,6 +17,12 @@ function bindEvents() {
   const recommendBtn = document.getElementById("recommendBtn");
   userSelect.addEventListener("change", () => {
     syncUserInterests();
+    subscribeNewArticles();
+  });
+  document.querySelectorAll(".interest-checkbox").forEach((checkbox) => {
+    checkbox.addEventListener("change", () => {
+      subscribeNewArticles();
+    });
   });
   recommendBtn.addEventListener("click", () => {
     requestRecommendations();
@@ -25,6 +37,12 @@ function syncUserInterests() {
   });
 }
 
+function getSelectedTags() {
+  return Array.from(document.querySelectorAll(".interest-checkbox:checked")).map(
+    (input) => input.value
+  );
+}
+
 function getCurrentUser() {
   const userSelect = document.getElementById("userSelect");
   if (!userSelect) return null;
@@ -72,15 +90,32 @@ function requestRecommendations() {
   const recommendBtn = document.getElementById("recommendBtn");
   recommendBtn.disabled = true;
   recommendBtn.textContent = "AI 正在思考...";
-  const selectedTags = Array.from(
-    document.querySelectorAll(".interest-checkbox:checked")
-  ).map((input) => input.value);
+  const selectedTags = getSelectedTags();
+  const cacheKey = `${user.user_id}|${[...selectedTags].sort().join(",")}`;
+  const cached = recommendCache.get(cacheKey);
+  const headers = { "Content-Type": "application/json" };
+  if (cached) {
+    headers["If-None-Match"] = cached.etag;
+  }
   fetch("/api/recommend", {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers,
     body: JSON.stringify({ user_id: user.user_id, interests: selectedTags }),
   })
-    .then((res) => res.json())
+    .then((res) => {
+      if (res.status === 304 && cached) {
+        return cached.data;
+      }
+      return res.json().then((data) => {
+        const etag = res.headers.get("ETag");
+        if (etag) {
+          recommendCache.set(cacheKey, { etag, data });
+        } else {
+          recommendCache.delete(cacheKey);
+        }
+        return data;
+      });
+    })
     .then((data) => {
       renderCards(data.items || []);
       if (data.message) {
@@ -114,9 +149,89 @@ function renderCards(items) {
   bindLikeButtons();
 }
 
+// 新文章由服务端 SSE 推送：按当前勾选的兴趣订阅，断线后浏览器携带 Last-Event-ID 自动重连补发
+function subscribeNewArticles() {
+  if (!window.EventSource) return;
+  if (eventSource) {
+    eventSource.close();
+  }
+  const tags = getSelectedTags().join(",");
+  eventSource = new EventSource(`/api/events?tags=${encodeURIComponent(tags)}`);
+  eventSource.addEventListener("article", (event) => {
+    prependCard(JSON.parse(event.data));
+  });
+  // 断线太久、错过的新文章无法完整补发时，服务端要求整体刷新列表
+  eventSource.addEventListener("reload", () => {
+    if (document.querySelector("#cardsRow .like-btn")) {
+      showToast("离线期间有较多新文章，已为你刷新列表", "info");
+      requestRecommendations();
+    }
+  });
+}
+
+function prependCard(item) {
+  const cardsRow = document.getElementById("cardsRow");
+  const exists = Array.from(cardsRow.querySelectorAll(".like-btn")).some(
+    (btn) => btn.dataset.url === item.url
+  );
+  if (exists) return;
+  document.getElementById("emptyState").classList.add("d-none");
+  const col = document.createElement("div");
+  col.className = "col-md-4";
+  col.innerHTML = createCardTemplate({
+    ...item,
+    ai_comment: item.summary || "刚抓到的新文章，AI 点评稍后送达",
+  });
+  cardsRow.prepend(col);
+  while (cardsRow.children.length > MAX_CARDS) {
+    cardsRow.lastElementChild.remove();
+  }
+  bindLikeButtons(col);
+}
+
+// 文章字段来自抓取结果与 SSE 推送，拼进 HTML 前一律转义
+function escapeHtml(value) {
+  return String(value ?? "").replace(/[&<>"']/g, (ch) => ({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;",
+  })[ch]);
+}
+
+// 只放行 http/https 绝对地址与本站路径，javascript: 等其他协议一律视为无效
+function safeUrl(url) {
+  if (!url) return "";
+  const value = String(url).trim();
+  if (value.startsWith("/") && !value.startsWith("//")) {
+    return value;
+  }
+  try {
+    const parsed = new URL(value);
+    return parsed.protocol === "http:" || parsed.protocol === "https:" ? parsed.href : "";
+  } catch (err) {
+    return "";
+  }
+}
+
+// 外链头图统一走本站缩略图代理：首次回源并缩放为卡片尺寸，之后由磁盘缓存 + 浏览器长缓存命中
+function thumbnailSrc(url, width) {
+  if (url.startsWith("/")) {
+    return url;
+  }
+  return `/img/thumb?url=${encodeURIComponent(url)}&w=${width}`;
+}
+
 function createCardTemplate(item) {
-  const imageBlock = item.top_image
-    ? `<img src="${item.top_image}" alt="${item.title}" />`
+  const title = escapeHtml(item.title);
+  const url = escapeHtml(item.url);
+  const href = escapeHtml(safeUrl(item.url) || "#");
+  const image = safeUrl(item.top_image);
+  const imageBlock = image
+    ? `<img src="${escapeHtml(thumbnailSrc(image, 400))}"
+        srcset="${escapeHtml(thumbnailSrc(image, 400))} 1x, ${escapeHtml(thumbnailSrc(image, 800))} 2x"
+        width="400" height="180" loading="lazy" alt="${title}" />`
     : `<div class="placeholder-image d-flex align-items-center justify-content-center bg-light text-secondary">
         <span>暂无头图</span>
       </div>`;
@@ -125,15 +240,15 @@ function createCardTemplate(item) {
       ${imageBlock}
       <div class="p-3 d-flex flex-column flex-grow-1">
         <div class="d-flex justify-content-between align-items-center mb-2">
-          <h3 class="h6 mb-0">${item.title}</h3>
+          <h3 class="h6 mb-0">${title}</h3>
         </div>
-        <blockquote class="mb-3">${item.ai_comment || "AI 已经被调侃笑翻，稍后补上"}</blockquote>
+        <blockquote class="mb-3">${escapeHtml(item.ai_comment || "AI 已经被调侃笑翻，稍后补上")}</blockquote>
         <div class="mt-auto">
           <div class="d-flex gap-2">
-            <a class="btn btn-link px-0" href="${item.url}" target="_blank" rel="noopener">
+            <a class="btn btn-link px-0" href="${href}" target="_blank" rel="noopener">
               🔗 原文
             </a>
-            <button class="btn btn-outline-danger btn-sm ms-auto like-btn" data-url="${item.url}" data-title="${item.title}">
+            <button class="btn btn-outline-danger btn-sm ms-auto like-btn" data-url="${url}" data-title="${title}">
               ❤️ 挺有意思
             </button>
           </div>
@@ -143,8 +258,8 @@ function createCardTemplate(item) {
   `;
 }
 
-function bindLikeButtons() {
-  document.querySelectorAll(".like-btn").forEach((btn) => {
+function bindLikeButtons(root = document) {
+  root.querySelectorAll(".like-btn").forEach((btn) => {
     btn.addEventListener("click", () => {
       const user = getCurrentUser();
       if (!user) return;
@@ -173,7 +288,7 @@ function showToast(message, type = "info") {
   wrapper.role = "alert";
   wrapper.innerHTML = `
     <div class="d-flex">
-      <div class="toast-body">${message}</div>
+      <div class="toast-body">${escapeHtml(message)}</div>
       <button type="button" class="btn-close btn-close-white me-2 m-auto" data-bs-dismiss="toast"></button>
     </div>
   `;
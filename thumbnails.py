@@ -0,0 +1,423 @@
+"""
+图片代理与缩略图磁盘缓存。
+
+- 代理：`/img/thumb?url=...&w=400` 首次请求时从源站抓取一次，按卡片尺寸居中裁剪缩放后写入磁盘缓存，
+  之后直接由本地文件响应并下发一年期 immutable 缓存头；并发请求同一图片只回源一次。
+- 只代理文章池中出现过的头图（`articles.top_image`），不能被当作任意地址的开放代理；
+  回源时连接经过校验的 IP，避免校验与连接之间 DNS 被改指内网；失败结果短暂缓存，不反复回源。
+- 缓存：按访问时间（mtime）淘汰的 LRU，总大小超过 IMAGE_CACHE_MAX_BYTES 时删到 90% 以下。
+- 占位图：`/img/placeholder/<seed>.svg` 由种子确定性生成渐变 SVG，取代外部 picsum 服务。
+
+缩放依赖可选的 Pillow；未安装时原图不做处理，仍然只回源一次并由本地缓存响应。
+"""
+from __future__ import annotations
+
+import hashlib
+import html
+import http.client
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.request
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from config import (
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_FAILURE_TTL,
+    IMAGE_FETCH_TIMEOUT,
+    IMAGE_MAX_SOURCE_BYTES,
+    IMAGE_PROXY_ALLOW_PRIVATE,
+    IMAGE_THUMB_QUALITY,
+    IMAGE_THUMB_RATIO,
+    IMAGE_THUMB_WIDTHS,
+    USER_AGENT,
+)
+from database import get_mongo_database
+from metrics import REGISTRY, record_cache
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FETCH_SECONDS = REGISTRY.histogram(
+    "image_fetch_duration_seconds", "缩略图未命中时回源抓取并缩放的耗时。"
+)
+IMAGE_CACHE_BYTES = REGISTRY.gauge("image_cache_bytes", "缩略图磁盘缓存当前占用字节数。")
+
+PLACEHOLDER_PREFIX = "/img/placeholder/"
+_LEGACY_PLACEHOLDER_HOST = "picsum.photos"
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/avif": "avif",
+}
+_MIMETYPES = {ext: mimetype for mimetype, ext in _EXTENSIONS.items()}
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def sanitize_seed(seed: str) -> str:
+    cleaned = "".join(ch if ch.isalnum() else "-" for ch in seed)
+    return cleaned[:64] or "tech"
+
+
+def placeholder_path(seed: str) -> str:
+    return f"{PLACEHOLDER_PREFIX}{sanitize_seed(seed)}.svg"
+
+
+def placeholder_seed(url: str) -> Optional[str]:
+    """
+    本地占位图路径或旧数据中的 picsum 占位图（`https://picsum.photos/seed/<seed>/800/400`）
+    返回其种子，其他地址返回 None。
+    """
+    if url.startswith(PLACEHOLDER_PREFIX) and url.endswith(".svg"):
+        return unquote(url[len(PLACEHOLDER_PREFIX) : -len(".svg")])
+    parts = urlsplit(url)
+    if parts.hostname != _LEGACY_PLACEHOLDER_HOST:
+        return None
+    segments = [unquote(segment) for segment in parts.path.split("/") if segment]
+    if len(segments) >= 2 and segments[0] == "seed":
+        return segments[1]
+    return "tech"
+
+
+def placeholder_svg(seed: str, width: int = 800, height: int = 360) -> str:
+    digest = hashlib.sha1(seed.encode("utf-8")).digest()
+    hue_a = digest[0] * 360 // 256
+    hue_b = (hue_a + 40 + digest[1] % 80) % 360
+    label = html.escape(seed.replace("-", " ").strip()[:24] or "Tech")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        '<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1">'
+        f'<stop offset="0" stop-color="hsl({hue_a},65%,55%)"/>'
+        f'<stop offset="1" stop-color="hsl({hue_b},65%,40%)"/>'
+        "</linearGradient></defs>"
+        f'<rect width="{width}" height="{height}" fill="url(#g)"/>'
+        f'<text x="50%" y="50%" fill="#fff" fill-opacity="0.85" font-size="{height // 8}" '
+        'font-family="sans-serif" text-anchor="middle" dominant-baseline="middle">'
+        f"{label}</text></svg>"
+    )
+
+
+_pillow_missing_logged = False
+
+
+def _pillow():
+    # Pillow 导入较慢，只在首次需要缩放时加载
+    global _pillow_missing_logged
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        if not _pillow_missing_logged:
+            _pillow_missing_logged = True
+            logger.warning("未安装 Pillow，图片代理不会缩放，将直接缓存并返回原图")
+        return None
+    return Image, ImageOps
+
+
+def _check_url(url: str):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ImageFetchError(f"不支持的图片地址: {url[:80]}")
+
+
+def _resolve_address(host: str, port: int) -> str:
+    """
+    解析域名并返回用于连接的地址；未允许内网时任一解析结果不是公网地址即拒绝。
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise ImageFetchError(f"域名解析失败: {host}") from exc
+    if not infos:
+        raise ImageFetchError(f"域名解析失败: {host}")
+    if not IMAGE_PROXY_ALLOW_PRIVATE:
+        for info in infos:
+            if not ipaddress.ip_address(info[4][0]).is_global:
+                raise ImageFetchError(f"拒绝代理内网地址: {host}")
+    return infos[0][4][0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    # 连接校验时解析出的 IP，而不是再解析一次域名；Host 头仍为原域名
+    def connect(self):
+        address = _resolve_address(self.host, self.port)
+        self.sock = socket.create_connection((address, self.port), self.timeout, self.source_address)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        address = _resolve_address(self.host, self.port)
+        sock = socket.create_connection((address, self.port), self.timeout, self.source_address)
+        # SNI 与证书校验仍按原域名进行
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+class _PinnedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PinnedHTTPConnection, req)
+
+
+class _PinnedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PinnedHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# 不走环境变量中的 HTTP 代理：经代理时由代理解析域名，上面的地址校验会失效
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}),
+    _PinnedHTTPHandler,
+    _PinnedHTTPSHandler,
+    _CheckedRedirectHandler,
+)
+
+
+def _is_article_image(url: str) -> bool:
+    collection = get_mongo_database("tech_crawler")["articles"]
+    return collection.find_one({"top_image": url}, {"_id": 1}) is not None
+
+
+def _fetch(url: str) -> Tuple[bytes, str]:
+    _check_url(url)
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    try:
+        with _opener.open(request, timeout=IMAGE_FETCH_TIMEOUT) as resp:
+            mimetype = (resp.headers.get_content_type() or "").lower()
+            # 源站 SVG 可携带脚本，从本站域名下发有 XSS 风险，只接受位图
+            if mimetype not in _EXTENSIONS:
+                raise ImageFetchError(f"源站返回的不是受支持的位图: {mimetype}")
+            data = resp.read(IMAGE_MAX_SOURCE_BYTES + 1)
+    except ImageFetchError:
+        raise
+    except Exception as exc:
+        raise ImageFetchError(f"抓取图片失败: {exc}") from exc
+    if len(data) > IMAGE_MAX_SOURCE_BYTES:
+        raise ImageFetchError("源图超过大小上限")
+    return data, mimetype
+
+
+def _resize(data: bytes, mimetype: str, width: int) -> Tuple[bytes, str]:
+    pillow = _pillow()
+    if pillow is None:
+        return data, mimetype
+    Image, ImageOps = pillow
+    height = max(1, round(width * IMAGE_THUMB_RATIO))
+    try:
+        with Image.open(BytesIO(data)) as img:
+            # JPEG 在解码阶段按 2 的幂缩小，大图可省去大部分解码开销
+            img.draft("RGB", (width * 2, height * 2))
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            thumb = ImageOps.fit(img, (width, height), Image.LANCZOS)
+            out = BytesIO()
+            thumb.save(out, "JPEG", quality=IMAGE_THUMB_QUALITY, optimize=True, progressive=True)
+    except Exception as exc:
+        raise ImageFetchError(f"图片解码失败: {exc}") from exc
+    return out.getvalue(), "image/jpeg"
+
+
+class ThumbnailCache:
+    """
+    两级目录分桶的磁盘缓存；命中时刷新 mtime，淘汰时按 mtime 从旧到新删除。
+    """
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return
+        for bucket in os.scandir(self.directory):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        yield entry
+
+    def _ensure_total(self):
+        if self._total is None:
+            self._total = sum(entry.stat().st_size for entry in self._files())
+            IMAGE_CACHE_BYTES.set(self._total)
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        bucket = os.path.join(self.directory, key[:2])
+        for ext, mimetype in _MIMETYPES.items():
+            path = os.path.join(bucket, f"{key}.{ext}")
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path, mimetype
+        return None
+
+    def put(self, key: str, data: bytes, mimetype: str) -> str:
+        # 先统计已有占用，避免首次扫描时把本次写入的文件重复计入
+        self.usage()
+        bucket = os.path.join(self.directory, key[:2])
+        os.makedirs(bucket, exist_ok=True)
+        path = os.path.join(bucket, f"{key}.{_EXTENSIONS[mimetype]}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._ensure_total()
+            self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict(protect=path)
+            IMAGE_CACHE_BYTES.set(self._total)
+        return path
+
+    def _evict(self, protect: str):
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for entry in self._files():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        self._total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._total <= target:
+                break
+            if path == protect:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total -= size
+
+    def usage(self) -> int:
+        with self._lock:
+            self._ensure_total()
+            return self._total
+
+
+class _Inflight:
+    """
+    同一缓存键的回源锁及等待者计数；计数归零时才从表中移除，保证并发请求拿到同一把锁。
+    """
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+_cache = ThumbnailCache()
+_inflight: Dict[str, _Inflight] = {}
+_inflight_lock = threading.Lock()
+_failures_lock = threading.Lock()
+# 缓存键 -> (过期时间, 失败原因)；只在进程内短暂保留，源站恢复后可重新回源
+_failures: Dict[str, Tuple[float, str]] = {}
+_FAILURES_MAX = 10000
+
+
+def _recent_failure(key: str) -> Optional[str]:
+    with _failures_lock:
+        failure = _failures.get(key)
+        if failure is None:
+            return None
+        if failure[0] <= time.monotonic():
+            _failures.pop(key, None)
+            return None
+        return failure[1]
+
+
+def _remember_failure(key: str, reason: str):
+    now = time.monotonic()
+    with _failures_lock:
+        if len(_failures) >= _FAILURES_MAX:
+            expired: List[str] = [k for k, (until, _) in _failures.items() if until <= now]
+            for stale in expired or list(_failures)[: _FAILURES_MAX // 10]:
+                _failures.pop(stale, None)
+        _failures[key] = (now + IMAGE_FAILURE_TTL, reason)
+
+
+def thumbnail_width(requested: Optional[int]) -> int:
+    if not requested:
+        return IMAGE_THUMB_WIDTHS[0]
+    # 只允许配置中的几档宽度，避免任意尺寸把缓存撑爆
+    return min(IMAGE_THUMB_WIDTHS, key=lambda width: abs(width - requested))
+
+
+def get_thumbnail(
+    url: str, width: Optional[int] = None, cache: Optional[ThumbnailCache] = None
+) -> Tuple[str, str]:
+    """
+    返回缩略图在磁盘上的路径与 MIME 类型；抓取或解码失败时抛出 ImageFetchError。
+    """
+    cache = cache or _cache
+    width = thumbnail_width(width)
+    key = hashlib.sha256(f"{width}|{url}".encode("utf-8")).hexdigest()[:40]
+    cached = cache.get(key)
+    if cached:
+        record_cache("thumbnail", True)
+        return cached
+    failure = _recent_failure(key)
+    if failure:
+        record_cache("thumbnail_failure", True)
+        raise ImageFetchError(failure)
+    with _inflight_lock:
+        entry = _inflight.get(key)
+        if entry is None:
+            entry = _inflight[key] = _Inflight()
+        entry.users += 1
+    try:
+        with entry.lock:
+            cached = cache.get(key)
+            if cached:
+                record_cache("thumbnail", True)
+                return cached
+            failure = _recent_failure(key)
+            if failure:
+                record_cache("thumbnail_failure", True)
+                raise ImageFetchError(failure)
+            record_cache("thumbnail", False)
+            started = time.perf_counter()
+            # 查库失败不记入失败缓存，Mongo 恢复后立即可用
+            try:
+                known = _is_article_image(url)
+            except Exception as exc:
+                raise ImageFetchError(f"查询文章头图失败: {exc}") from exc
+            try:
+                if not known:
+                    raise ImageFetchError(f"不是文章头图，拒绝代理: {url[:80]}")
+                data, mimetype = _fetch(url)
+                data, mimetype = _resize(data, mimetype, width)
+            except ImageFetchError as exc:
+                record_cache("thumbnail_failure", False)
+                _remember_failure(key, str(exc))
+                raise
+            path = cache.put(key, data, mimetype)
+            IMAGE_FETCH_SECONDS.observe(time.perf_counter() - started)
+            return path, mimetype
+    finally:
+        with _inflight_lock:
+            entry.users -= 1
+            if entry.users == 0:
+                _inflight.pop(key, None)